@@ -0,0 +1,181 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Cold Start Benchmark
+"""
+
+import getopt
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'cli.py')
+sys.path.insert(0, os.path.dirname(CLI))
+from cli import SUBCOMMANDS
+
+# Metrics compared with the baseline, lower is always better
+METRICS = ['wall_seconds', 'import_seconds']
+
+TOLERANCE = 0.25
+REPEAT = 5
+HEAVIEST = 5
+
+# Every script prints its usage and exits when it gets a positional
+# argument, after importing everything and before reading any file
+PROBE = 'usage'
+
+def parse_arguments(argument_list: list[str]) -> dict:
+    """
+    Parse the arguments
+        :param argv: list of arguments
+        :return: dictionary with the arguments
+    """
+    arguments = {
+        'subcommands': list(SUBCOMMANDS),
+        'repeat': REPEAT,
+        'output_filename': '',
+        'baseline_filename': '',
+        'save_baseline': False,
+        'tolerance': TOLERANCE,
+    }
+    usage = 'cold_start.py [-c <subcommand>] [-k <repeat>] [-o <resultsfile>] [-b <baselinefile>] [-s] [-r <tolerance>]'
+    options, rest = getopt.getopt(argument_list, 'c:k:o:b:sr:', ['subcommand=', 'repeat=', 'ofile=', 'baseline=', 'save', 'tolerance='])
+    if len(rest) != 0:
+        print(usage)
+        sys.exit(2)
+    chosen = []
+    for option, argument in options:
+        if option in ('-c', '--subcommand'):
+            if argument not in SUBCOMMANDS:
+                print(f'Unknown subcommand {argument}')
+                print(usage)
+                sys.exit(2)
+            chosen.append(argument)
+        elif option in ('-k', '--repeat'):
+            arguments['repeat'] = int(argument)
+        elif option in ('-o', '--ofile'):
+            arguments['output_filename'] = argument
+        elif option in ('-b', '--baseline'):
+            arguments['baseline_filename'] = argument
+        elif option in ('-s', '--save'):
+            arguments['save_baseline'] = True
+        elif option in ('-r', '--tolerance'):
+            arguments['tolerance'] = float(argument)
+    if chosen:
+        arguments['subcommands'] = chosen
+    if arguments['save_baseline'] and not arguments['baseline_filename']:
+        print('-s needs a baseline file')
+        print(usage)
+        sys.exit(2)
+    return arguments
+
+def parse_import_times(report: str) -> tuple:
+    """
+    Read the report of python -X importtime
+        :param report: standard error of the process
+        :return: seconds importing, number of modules and cumulative seconds of every top level module
+    """
+    modules = 0
+    top_level = {}
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules += 1
+        # Nested imports are indented under the module that imported them
+        if not name.startswith('  ', 1):
+            top_level[name.strip()] = int(cumulative) / 1e6
+    return sum(top_level.values()), modules, top_level
+
+def measure(command: list[str]) -> dict:
+    """
+    Run a command in a new interpreter and measure its cold start
+        :param command: arguments after python
+        :return: wall seconds, import seconds, number of modules and heaviest modules
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + command, capture_output=True, text=True, cwd=os.path.dirname(CLI))
+    wall = time.perf_counter() - start
+    import_seconds, modules, top_level = parse_import_times(process.stderr)
+    heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:HEAVIEST]
+    return {'wall_seconds': wall, 'import_seconds': import_seconds, 'modules': modules, 'heaviest': dict(heaviest)}
+
+def best_of(repeat: int, command: list[str]) -> dict:
+    """
+    Measure a command several times, the median is kept so a slow disk
+    read of the first run does not decide the result
+        :param repeat: number of runs
+        :param command: arguments after python
+        :return: median of the metrics and heaviest modules of the median run
+    """
+    runs = sorted((measure(command) for _ in range(repeat)), key=lambda run: run['wall_seconds'])
+    result = runs[len(runs) // 2]
+    for metric in METRICS:
+        result[metric] = statistics.median(run[metric] for run in runs)
+    return result
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Find the subcommands that start slower than the baseline
+        :param results: results of this run by subcommand
+        :param baseline: results of the baseline by subcommand
+        :param tolerance: relative change allowed, 0.25 is 25%
+        :return: list of regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in METRICS:
+            before, after = baseline[name].get(metric), result[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            if change > tolerance:
+                regressions.append(f'{name} {metric}: {before:.4g} -> {after:.4g} ({change:+.0%})')
+    return regressions
+
+def main() -> None:
+    """
+    Main function
+    - Measure the start of a bare interpreter
+    - Measure the start of every subcommand until it parses its arguments
+    - Write the results and compare them with the baseline
+    """
+    arguments = parse_arguments(sys.argv[1:])
+    print(f'{"subcommand":<12}{"wall s":>9}{"import s":>10}{"modules":>9}  heaviest imports')
+    results = {}
+    commands = {'python': ['-c', 'pass']}
+    commands.update({name: [CLI, name, PROBE] for name in arguments['subcommands']})
+    for name, command in commands.items():
+        result = best_of(arguments['repeat'], command)
+        results[name] = result
+        heaviest = ', '.join(f'{module} {seconds:.3f}' for module, seconds in result['heaviest'].items())
+        print(f'{name:<12}{result["wall_seconds"]:>9.3f}{result["import_seconds"]:>10.3f}{result["modules"]:>9}  {heaviest}')
+    report = {'python': sys.version.split()[0], 'repeat': arguments['repeat'], 'results': results}
+    if arguments['output_filename']:
+        with open(arguments['output_filename'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+    if arguments['save_baseline']:
+        with open(arguments['baseline_filename'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+        print(f'Baseline saved in {arguments["baseline_filename"]}')
+    elif arguments['baseline_filename']:
+        with open(arguments['baseline_filename'], 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline['results'], arguments['tolerance'])
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions.')
+
+if __name__ == '__main__':
+    main()
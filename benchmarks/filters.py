@@ -0,0 +1,81 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Filters Benchmark
+"""
+
+import getopt
+import os
+import re
+import sys
+import time
+import pandas
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from vocabulary import PUNCTUATION_MARKS, STOP_WORDS, STOP_WORDS_SET, has_number, remove_punctuation_marks, remove_url_html_hashtags
+
+BEFORE = {
+    'numbers': lambda token: re.match(r'.*\d.*', token) is None,
+    'punctuation_marks': lambda token: re.sub(rf"[{'|'.join(PUNCTUATION_MARKS)}]", '', token),
+    'stopwords': lambda token: token not in STOP_WORDS,
+    'url_html_hashtags': lambda token: re.sub(r'http.*|#.*|<.*>|@.*', '', token),
+}
+
+AFTER = {
+    'numbers': lambda token: not has_number(token),
+    'punctuation_marks': remove_punctuation_marks,
+    'stopwords': lambda token: token not in STOP_WORDS_SET,
+    'url_html_hashtags': remove_url_html_hashtags,
+}
+
+def parse_arguments(argument_list: list[str]) -> tuple:
+    """
+    Parse the arguments
+        :param argv: list of arguments
+        :return: input file and number of tokens
+    """
+    input_filename = 'data/COV_train.xlsx'
+    number_tokens = 200000
+    options, arguments = getopt.getopt(argument_list, 'i:n:', ['ifile=', 'tokens='])
+    if len(arguments) != 0:
+        print('filters.py [-i <inputfile>] [-n <tokens>]')
+        sys.exit(2)
+    for option, argument in options:
+        if option in ('-i', '--ifile'):
+            input_filename = argument
+        elif option in ('-n', '--tokens'):
+            number_tokens = int(argument)
+    return input_filename, number_tokens
+
+def time_filter(function, tokens: list[str]) -> float:
+    """
+    Time a filter over the tokens
+        :param function: filter to time
+        :param tokens: tokens to filter
+        :return: nanoseconds per token
+    """
+    start = time.perf_counter()
+    for token in tokens:
+        function(token)
+    return (time.perf_counter() - start) / len(tokens) * 1e9
+
+def main() -> None:
+    """
+    Main function
+    - Read the tokens of the corpus
+    - Time every filter before and after the lookup tables
+    """
+    input_filename, number_tokens = parse_arguments(sys.argv[1:])
+    data_frame = pandas.read_excel(input_filename, header=None)
+    tokens = data_frame.iloc[:, 0].astype(str).str.cat(sep=' ').lower().split()[:number_tokens]
+    print(f'{"filter":<20}{"before ns/token":>18}{"after ns/token":>18}{"speedup":>10}')
+    for name, before in BEFORE.items():
+        before_time = time_filter(before, tokens)
+        after_time = time_filter(AFTER[name], tokens)
+        print(f'{name:<20}{before_time:>18.1f}{after_time:>18.1f}{before_time / after_time:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
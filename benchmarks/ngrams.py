@@ -0,0 +1,186 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+N-gram Scoring Benchmark
+"""
+
+import getopt
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from vocabulary import Vocabulary, VocabularyIndex, TokenizedCorpus, load_caches, load_profile, read_frame, tokenize_texts, tokenize_sequences
+from language_model import class_label, class_models, ngram_model
+from batch_classifier import BatchClassifier
+from ngram_model import MAX_ORDER
+
+# Most times slower than the unigram models that the scoring of an order can be
+MAX_SLOWDOWN = 2.0
+REPEAT = 5
+
+def parse_arguments(argument_list: list[str]) -> dict:
+    """
+    Parse the arguments
+        :param argv: list of arguments
+        :return: dictionary with the arguments
+    """
+    arguments = {
+        'train_filename': 'data/test/COV_train.xlsx',
+        'test_filename': 'data/test/COV_test_2.xlsx',
+        'parameters_filename': 'out/parameters.json',
+        'order': MAX_ORDER,
+        'repeat': REPEAT,
+        'cache_filename': '',
+        'output_filename': '',
+        'max_slowdown': MAX_SLOWDOWN,
+    }
+    usage = 'ngrams.py [-i <trainfile>] [-t <testfile>] [-p <parametersfile>] [-n <order>] [-k <repeat>] [-c <tokencache>] [-o <resultsfile>] [-r <maxslowdown>]'
+    options, rest = getopt.getopt(argument_list, 'i:t:p:n:k:c:o:r:', ['ifile=', 'tfile=', 'parameters=', 'order=', 'repeat=', 'cache=', 'ofile=', 'slowdown='])
+    if len(rest) != 0:
+        print(usage)
+        sys.exit(2)
+    for option, argument in options:
+        if option in ('-i', '--ifile'):
+            arguments['train_filename'] = argument
+        elif option in ('-t', '--tfile'):
+            arguments['test_filename'] = argument
+        elif option in ('-p', '--parameters'):
+            arguments['parameters_filename'] = argument
+        elif option in ('-n', '--order'):
+            arguments['order'] = int(argument)
+        elif option in ('-k', '--repeat'):
+            arguments['repeat'] = int(argument)
+        elif option in ('-c', '--cache'):
+            arguments['cache_filename'] = argument
+        elif option in ('-o', '--ofile'):
+            arguments['output_filename'] = argument
+        elif option in ('-r', '--slowdown'):
+            arguments['max_slowdown'] = float(argument)
+    if not 2 <= arguments['order'] <= MAX_ORDER:
+        print(f'The order must be between 2 and {MAX_ORDER}')
+        print(usage)
+        sys.exit(2)
+    return arguments
+
+def tokenize_corpora(arguments: dict) -> tuple:
+    """
+    Read and tokenize the corpora, the vocabulary is the one of the training corpus.
+    The tokens keep the order of the text, the unigram models get the test
+    documents in alphabetic order like the classifier gives them
+        :param arguments: parsed arguments
+        :return: index of the vocabulary, training corpus with its classes, test documents
+        in alphabetic order and in the order of the text, with their classes
+    """
+    if arguments['cache_filename']:
+        load_caches(arguments['cache_filename'])
+    vocabulary = Vocabulary('')
+    vocabulary.parameters = load_profile(arguments['parameters_filename'])
+    train = read_frame(arguments['train_filename'])
+    test = read_frame(arguments['test_filename'])
+    texts = train.iloc[:, 0].tolist()
+    words = {word for text in texts if isinstance(text, str) for word in text.split()}
+    for _ in vocabulary.tokenize(words, compiled=True):
+        pass
+    index = VocabularyIndex(vocabulary.tokens)
+    corpus = TokenizedCorpus.from_documents(tokenize_sequences(vocabulary, texts))
+    labels = [class_label(value) for value in train.iloc[:, 1].tolist()]
+    test_texts = test.iloc[:, 0].tolist()
+    test_labels = [class_label(value) for value in test.iloc[:, 1].tolist()] if len(test.columns) > 1 else [None] * len(test)
+    documents = tokenize_texts(vocabulary, test_texts)
+    sequences = tokenize_sequences(vocabulary, test_texts)
+    return index, corpus, labels, documents, sequences, test_labels
+
+def measure(classifier, documents: list[list[str]], repeat: int) -> tuple:
+    """
+    Score the documents several times and keep the median
+        :param classifier: classifier with a score method
+        :param documents: tokens of every document
+        :param repeat: number of runs
+        :return: median seconds and the scores of the last run
+    """
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        scores = classifier.score(documents)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), scores
+
+def accuracy(scores, classes: list[str], labels: list[str]) -> float:
+    """
+    Part of the documents with a class that get it, a tie goes to the last class
+        :param scores: array (documents, classes) with the log-probabilities
+        :param classes: class of every column
+        :param labels: class of every document, None for the ones without class
+        :return: accuracy, None if no document has a class
+    """
+    best = (scores.shape[1] - 1 - scores[:, ::-1].argmax(axis=1)).tolist()
+    pairs = [(classes[column], label) for column, label in zip(best, labels) if label is not None]
+    if not pairs:
+        return None
+    return sum(predicted == label for predicted, label in pairs) / len(pairs)
+
+def main() -> None:
+    """
+    Main function
+    - Tokenize the corpora and train the unigram models of every class
+    - Train the n-gram models of every order up to the one asked
+    - Score the test documents with every order and compare the time with the unigram models
+    """
+    arguments = parse_arguments(sys.argv[1:])
+    index, corpus, labels, documents, sequences, test_labels = tokenize_corpora(arguments)
+    classes = list(dict.fromkeys(label for label in labels if label is not None))
+    positions = {class_doc: position for position, class_doc in enumerate(classes)}
+    groups = [positions.get(label, -1) for label in labels]
+    counts = dict(zip(classes, index.count_table(corpus.table, corpus.group_counts(groups, len(classes)))))
+    documents_by_class = {class_doc: groups.count(position) for class_doc, position in positions.items()}
+    models = class_models(index, counts)
+    total_documents = sum(documents_by_class.values())
+    number_tokens = sum(len(tokens) for tokens in documents)
+    print(f'{len(corpus)} training documents, {len(documents)} test documents, {number_tokens} test tokens')
+    print(f'{"order":<8}{"score s":>9}{"tokens/s":>12}{"slowdown":>10}{"accuracy":>10}{"n-grams":>10}{"file MB":>9}')
+
+    unigram = BatchClassifier([
+        {'probability': math.log(documents_by_class[class_doc] / total_documents), 'words': models[class_doc]}
+        for class_doc in classes
+    ])
+    seconds, scores = measure(unigram, documents, arguments['repeat'])
+    results = {'1': {'score_seconds': seconds, 'tokens_per_second': number_tokens / seconds, 'slowdown': 1.0, 'accuracy': accuracy(scores, classes, test_labels)}}
+    with tempfile.TemporaryDirectory() as folder:
+        for order in range(2, arguments['order'] + 1):
+            model = ngram_model(index, corpus, labels, documents_by_class, models, order)
+            filename = os.path.join(folder, f'ngrams_{order}.npz')
+            model.save(filename)
+            seconds, scores = measure(model, sequences, arguments['repeat'])
+            results[str(order)] = {
+                'score_seconds': seconds,
+                'tokens_per_second': number_tokens / seconds,
+                'slowdown': seconds / results['1']['score_seconds'],
+                'accuracy': accuracy(scores, model.classes, test_labels),
+                'ngrams': sum(len(keys) for keys in model.keys),
+                'file_mb': os.path.getsize(filename) / (1 << 20),
+            }
+    for order, result in results.items():
+        score = '' if result['accuracy'] is None else f'{result["accuracy"]:.4f}'
+        sizes = f'{result["ngrams"]:>10}{result["file_mb"]:>9.1f}' if 'ngrams' in result else ''
+        print(f'{order:<8}{result["score_seconds"]:>9.3f}{result["tokens_per_second"]:>12.0f}{result["slowdown"]:>9.2f}x{score:>10}{sizes}')
+    if arguments['output_filename']:
+        report = {'corpus': [arguments['train_filename'], arguments['test_filename']], 'repeat': arguments['repeat'], 'results': results}
+        with open(arguments['output_filename'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+    slow = [order for order, result in results.items() if result['slowdown'] > arguments['max_slowdown']]
+    for order in slow:
+        print(f'SLOW order {order}: {results[order]["slowdown"]:.2f}x the unigram scoring, the limit is {arguments["max_slowdown"]:.2f}x')
+    if slow:
+        sys.exit(1)
+    print(f'Every order is within {arguments["max_slowdown"]:.2f}x the unigram scoring.')
+
+if __name__ == '__main__':
+    main()
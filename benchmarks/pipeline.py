@@ -0,0 +1,341 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Pipeline Benchmark
+"""
+
+import getopt
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from vocabulary import PARAMETERS, STOP_WORDS, Profile, Vocabulary, VocabularyIndex, TokenizedCorpus, load_caches, read_frame, stage_error, tokenize_texts
+from language_model import token_probabilities
+from model_file import write_text_model
+from batch_classifier import BatchClassifier
+from clasificator import process_language_models, tokenize_document
+
+# Options of every parameter, in the order vocabulary.py asks for them
+OPTIONS = {name: list(options) for name, (_, options) in PARAMETERS.items()}
+
+# Metrics compared with the baseline, True when a higher value is better
+METRICS = {
+    'vocabulary_seconds': False,
+    'train_seconds': False,
+    'load_seconds': False,
+    'classify_seconds': False,
+    'train_documents_per_second': True,
+    'train_tokens_per_second': True,
+    'classify_documents_per_second': True,
+    'classify_tokens_per_second': True,
+    'peak_rss_mb': False,
+}
+
+TOLERANCE = 0.25
+SEED = 0
+
+# Pieces of a tweet that go through the filters besides the words
+EXTRAS = ['#covid19', '#stayhome', '@user', 'https://t.co/x1y2z3', '<br>', '2020', '19', 'amp;', '😷', '🙏', '!!', '...', 'Covid-19', 'coronavirus']
+
+def parse_arguments(argument_list: list[str]) -> dict:
+    """
+    Parse the arguments
+        :param argv: list of arguments
+        :return: dictionary with the arguments
+    """
+    arguments = {
+        'train_filename': 'data/COV_train.xlsx',
+        'test_filename': 'data/COV_test_g2.xlsx',
+        'documents': 0,
+        'seed': SEED,
+        'fixed': {},
+        'limit': 0,
+        'cache_filename': '',
+        'output_filename': '',
+        'baseline_filename': '',
+        'save_baseline': False,
+        'tolerance': TOLERANCE,
+        'repeat': 1,
+    }
+    usage = 'pipeline.py [-i <trainfile>] [-t <testfile>] [-n <documents>] [--seed <seed>] [-p <parameter>=<option>] [-l <limit>] [-c <tokencache>] [-o <resultsfile>] [-b <baselinefile>] [-s] [-r <tolerance>] [-k <repeat>]'
+    options, rest = getopt.getopt(argument_list, 'i:t:n:p:l:c:o:b:sr:k:', ['ifile=', 'tfile=', 'documents=', 'seed=', 'parameter=', 'limit=', 'cache=', 'ofile=', 'baseline=', 'save', 'tolerance=', 'repeat='])
+    if len(rest) != 0:
+        print(usage)
+        sys.exit(2)
+    for option, argument in options:
+        if option in ('-i', '--ifile'):
+            arguments['train_filename'] = argument
+        elif option in ('-t', '--tfile'):
+            arguments['test_filename'] = argument
+        elif option in ('-n', '--documents'):
+            arguments['documents'] = int(argument)
+        elif option == '--seed':
+            arguments['seed'] = int(argument)
+        elif option in ('-p', '--parameter'):
+            name, _, value = argument.partition('=')
+            if name not in OPTIONS or value not in OPTIONS[name]:
+                print(f'Unknown parameter option {argument}')
+                print(usage)
+                sys.exit(2)
+            arguments['fixed'][name] = value
+        elif option in ('-l', '--limit'):
+            arguments['limit'] = int(argument)
+        elif option in ('-c', '--cache'):
+            arguments['cache_filename'] = argument
+        elif option in ('-o', '--ofile'):
+            arguments['output_filename'] = argument
+        elif option in ('-b', '--baseline'):
+            arguments['baseline_filename'] = argument
+        elif option in ('-s', '--save'):
+            arguments['save_baseline'] = True
+        elif option in ('-r', '--tolerance'):
+            arguments['tolerance'] = float(argument)
+        elif option in ('-k', '--repeat'):
+            arguments['repeat'] = int(argument)
+    if arguments['save_baseline'] and not arguments['baseline_filename']:
+        print('-s needs a baseline file')
+        print(usage)
+        sys.exit(2)
+    return arguments
+
+def combinations(fixed: dict) -> list[Profile]:
+    """
+    Every combination of the parameters
+        :param fixed: parameters with a fixed option
+        :return: list of profiles
+    """
+    names = list(OPTIONS)
+    choices = [[fixed[name]] if name in fixed else OPTIONS[name] for name in names]
+    result = []
+    for values in itertools.product(*choices):
+        # Stemming and lemmatization are never enabled together
+        if values[names.index('stemming')] == 'y' and values[names.index('lemmatization')] == 'y':
+            continue
+        result.append(Profile(dict(zip(names, values))))
+    return result
+
+def combination_key(parameters: Profile) -> str:
+    """
+    Short name of a combination, one letter per parameter
+        :param parameters: preprocessing parameters
+        :return: key like nnyynnyyyn
+    """
+    return ''.join(parameters[name] for name in OPTIONS)
+
+def synthetic_corpus(number_documents: int, seed: int) -> pandas.DataFrame:
+    """
+    Generate tweets with a zipfian distribution of words, mixed with
+    hashtags, users, urls, numbers and emojis
+        :param number_documents: number of documents
+        :param seed: seed of the generator, the same seed gives the same corpus
+        :return: data frame with the text and the class
+    """
+    generator = random.Random(seed)
+    letters = 'etaoinshrdlcumwfgypbvkjxqz'
+    words = sorted({''.join(generator.choices(letters, k=generator.randint(2, 10))) for _ in range(5000)})
+    population = STOP_WORDS + words + EXTRAS
+    weights = [1 / (rank + 1) for rank in range(len(population))]
+    generator.shuffle(weights)
+    rows = []
+    for _ in range(number_documents):
+        tokens = generator.choices(population, weights, k=generator.randint(5, 30))
+        tokens = [token.capitalize() if generator.random() < 0.1 else token for token in tokens]
+        rows.append((' '.join(tokens), generator.choice(['Positive', 'Negative'])))
+    return pandas.DataFrame(rows)
+
+def load_corpora(arguments: dict) -> tuple:
+    """
+    Read the bundled corpora or generate synthetic ones
+        :param arguments: parsed arguments
+        :return: texts and classes of the training corpus and texts of the test corpus
+    """
+    if arguments['documents'] > 0:
+        train = synthetic_corpus(arguments['documents'], arguments['seed'])
+        test = synthetic_corpus(max(1, arguments['documents'] // 10), arguments['seed'] + 1)
+    else:
+        train = read_frame(arguments['train_filename'])
+        test = read_frame(arguments['test_filename'])
+    return train.iloc[:, 0].tolist(), train.iloc[:, 1].tolist(), test.iloc[:, 0].tolist()
+
+def run_combination(parameters: Profile, texts: list, classes: list, test_texts: list, cache_filename: str) -> dict:
+    """
+    Time every phase of the pipeline with some parameters, it runs in its
+    own process so the peak memory and the caches belong to this run
+        :param parameters: preprocessing parameters
+        :param texts: texts of the training corpus
+        :param classes: classes of the training corpus
+        :param test_texts: texts of the test corpus
+        :param cache_filename: token cache to load first, empty to start cold
+        :return: dictionary with the metrics
+    """
+    if cache_filename:
+        # Parsed now so the time of the file does not go to the first phase
+        load_caches(cache_filename, lazy=False)
+    vocabulary = Vocabulary('')
+    vocabulary.parameters = parameters
+    result = {'parameters': dict(parameters)}
+
+    start = time.perf_counter()
+    words = {word for text in texts if isinstance(text, str) for word in text.split()}
+    for _ in vocabulary.tokenize(words, compiled=True):
+        pass
+    result['vocabulary_seconds'] = time.perf_counter() - start
+    result['vocabulary_size'] = len(vocabulary.tokens)
+
+    start = time.perf_counter()
+    corpus = TokenizedCorpus.from_documents(tokenize_texts(vocabulary, texts))
+    index = VocabularyIndex(vocabulary.tokens)
+    models = []
+    for class_doc in ('Positive', 'Negative'):
+        indices = [position for position, current in enumerate(classes) if current == class_doc]
+        *_, model = token_probabilities(index, index.count(corpus.counts(indices)))
+        models.append((len(indices), model))
+    result['train_seconds'] = time.perf_counter() - start
+    result['train_documents_per_second'] = len(texts) / result['train_seconds']
+    result['train_tokens_per_second'] = len(corpus.ids) / result['train_seconds']
+
+    with tempfile.TemporaryDirectory() as folder:
+        filenames = [os.path.join(folder, f'language_model_{class_doc}.txt') for class_doc in ('positive', 'negative')]
+        for filename, (number_documents, model) in zip(filenames, models):
+            write_text_model(filename, number_documents, model)
+        start = time.perf_counter()
+        files = []
+        for filename in filenames:
+            with open(filename, 'r', encoding='utf-8') as file:
+                files.append(file.readlines())
+        batch_classifier = BatchClassifier(process_language_models(files))
+        result['load_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    documents = []
+    for text in test_texts:
+        tokenized = tokenize_document(vocabulary, text)
+        if tokenized is not None:
+            documents.append(tokenized[1])
+    batch_classifier.score(documents)
+    result['classify_seconds'] = time.perf_counter() - start
+    result['classify_documents_per_second'] = len(documents) / result['classify_seconds']
+    result['classify_tokens_per_second'] = sum(len(tokens) for tokens in documents) / result['classify_seconds']
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result['peak_rss_mb'] = peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+    return result
+
+def best_of(repeat: int, context, parameters: Profile, texts: list, classes: list, test_texts: list, cache_filename: str) -> dict:
+    """
+    Run a combination several times, every time in a new process, and keep
+    the best value of every metric so the noise of a single run does not
+    look like a regression
+        :param repeat: number of runs
+        :param context: multiprocessing context of the processes
+        :param parameters: preprocessing parameters
+        :param texts: texts of the training corpus
+        :param classes: classes of the training corpus
+        :param test_texts: texts of the test corpus
+        :param cache_filename: token cache to load first, empty to start cold
+        :return: dictionary with the best metrics
+    """
+    best = None
+    for _ in range(max(1, repeat)):
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            result = executor.submit(run_combination, parameters, texts, classes, test_texts, cache_filename).result()
+        if best is None:
+            best = result
+            continue
+        for metric, higher_is_better in METRICS.items():
+            best[metric] = max(best[metric], result[metric]) if higher_is_better else min(best[metric], result[metric])
+    return best
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Find the metrics that got worse than the baseline
+        :param results: results of this run by combination
+        :param baseline: results of the baseline by combination
+        :param tolerance: relative change allowed, 0.25 is 25%
+        :return: list of regressions
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before, after = baseline[key].get(metric), result[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f'{key} {metric}: {before:.4g} -> {after:.4g} ({change:+.0%})')
+    return regressions
+
+def main() -> None:
+    """
+    Main function
+    - Read or generate the corpora
+    - Run every combination of the parameters in a new process
+    - Write the results and compare them with the baseline
+    """
+    arguments = parse_arguments(sys.argv[1:])
+    texts, classes, test_texts = load_corpora(arguments)
+    parameters_list = combinations(arguments['fixed'])
+    if arguments['limit'] > 0:
+        parameters_list = parameters_list[:arguments['limit']]
+    print(f'{len(texts)} training documents, {len(test_texts)} test documents, {len(parameters_list)} combinations')
+    print(f'{"parameters":<12}{"vocab s":>9}{"train s":>9}{"load s":>9}{"class s":>9}{"train tok/s":>13}{"class doc/s":>13}{"rss MB":>9}')
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for parameters in parameters_list:
+        key = combination_key(parameters)
+        try:
+            result = best_of(arguments['repeat'], context, parameters, texts, classes, test_texts, arguments['cache_filename'])
+        except Exception as error:
+            print(f'{key:<12}failed: {stage_error(error)}')
+            continue
+        results[key] = result
+        print(
+            f'{key:<12}{result["vocabulary_seconds"]:>9.2f}{result["train_seconds"]:>9.2f}{result["load_seconds"]:>9.3f}'
+            f'{result["classify_seconds"]:>9.2f}{result["train_tokens_per_second"]:>13.0f}'
+            f'{result["classify_documents_per_second"]:>13.0f}{result["peak_rss_mb"]:>9.0f}'
+        )
+    report = {
+        'corpus': 'synthetic' if arguments['documents'] > 0 else [arguments['train_filename'], arguments['test_filename']],
+        'documents': arguments['documents'],
+        'seed': arguments['seed'],
+        'repeat': arguments['repeat'],
+        'warm_cache': bool(arguments['cache_filename']),
+        'results': results,
+    }
+    if arguments['output_filename']:
+        with open(arguments['output_filename'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+    if arguments['save_baseline']:
+        with open(arguments['baseline_filename'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+        print(f'Baseline saved in {arguments["baseline_filename"]}')
+    elif arguments['baseline_filename']:
+        with open(arguments['baseline_filename'], 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        keys = ('corpus', 'documents', 'seed', 'warm_cache')
+        if {key: baseline.get(key) for key in keys} != {key: report[key] for key in keys}:
+            print('The baseline was measured with another corpus or cache, the numbers are not comparable')
+            sys.exit(2)
+        regressions = compare(results, baseline['results'], arguments['tolerance'])
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions.')
+
+if __name__ == '__main__':
+    main()
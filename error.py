@@ -1,7 +1,10 @@
 #!/usr/bin/python
-import pandas as pd
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from vocabulary.corpus import read_frame
 
-real = pd.read_excel('data/test/COV_test_2.xlsx', header=None).iloc[:, 1].values
+real = read_frame('data/test/COV_test_2.xlsx').iloc[:, 1].values
 pred = open('out/resumen_alu0101331720.txt').read().split('\n')
 
 acierto = 0
@@ -1,7 +1,10 @@
 #!/usr/bin/python
-import pandas as pd
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from vocabulary.corpus import read_frame
 
-real = pd.read_excel('data/COV_test_g2_debug.xlsx', header=None).iloc[:, 2].values
+real = read_frame('data/COV_test_g2_debug.xlsx').iloc[:, 2].values
 pred = open('out/resumen_alu0101331720.txt').read().split('\n')
 
 acierto = 0
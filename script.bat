@@ -1,4 +1,4 @@
-.\src\vocabulary\vocabulary.py -i .\data\COV_train.xlsx -o .\out\vocabulary.txt
-.\src\language_model.py -i .\data\COV_train.xlsx -o .\out\language_model
-.\src\clasificator.py -i data\COV_test_g2.xlsx -o out
+.\src\cli.py vocab -i .\data\COV_train.xlsx -o .\out\vocabulary.txt
+.\src\cli.py train -i .\data\COV_train.xlsx -o .\out\language_model
+.\src\cli.py classify -i data\COV_test_g2.xlsx -o out
 .\error2.py
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Batch Classifier
+"""
+
+import numpy
+from vocabulary.index import VocabularyIndex
+from vocabulary.profiler import PROFILER
+
+UNKNOWN = '<UNK>'
+
+class BatchClassifier:
+    """
+    class BatchClassifier:
+    Scores many documents at once against a dense matrix of log-probabilities
+    """
+    index = None
+    log_probs = None
+    priors = None
+
+    def __init__(self, language_models: list):
+        """
+        Constructor
+            :param language_models: models returned by process_language_models,
+            their words have the log-probabilities in a parallel log_probs array
+        """
+        models_words = [list(model['words']) for model in language_models]
+        self.index = VocabularyIndex(sorted({word for words in models_words for word in words if word != UNKNOWN}))
+        self.log_probs = numpy.empty((len(language_models), len(self.index) + 1), dtype=numpy.float64)
+        for row, (model, words) in enumerate(zip(language_models, models_words)):
+            log_probs = numpy.asarray(model['words'].log_probs, dtype=numpy.float64)
+            # <UNK> is encoded as the last column, so it is filled with the rest
+            self.log_probs[row] = log_probs[words.index(UNKNOWN)]
+            self.log_probs[row, self.index.encode(words)] = log_probs
+        self.priors = numpy.array([model['probability'] for model in language_models], dtype=numpy.float64)
+
+    def encode(self, tokens: list[str]) -> list[int]:
+        """
+        Map the tokens to their ids
+            :param tokens: tokens of a document
+            :return: list of ids, unknown tokens get the <UNK> id
+        """
+        return self.index.encode(tokens)
+
+    def score(self, documents: list[list[str]]) -> numpy.ndarray:
+        """
+        Score the documents with every model
+            :param documents: list of tokenized documents
+            :return: array (documents, models) with the log-probabilities
+        """
+        # Every document is laid out as [prior, token_1, ..., token_n] so
+        # bincount adds them in the same order as the per-document loop and
+        # the results are bit for bit the same
+        lengths = numpy.fromiter((len(tokens) + 1 for tokens in documents), dtype=numpy.int64, count=len(documents))
+        with PROFILER.stage('score', int(lengths.sum()) - len(documents)) as record:
+            starts = numpy.zeros(len(documents), dtype=numpy.int64)
+            numpy.cumsum(lengths[:-1], out=starts[1:])
+            ids = numpy.zeros(int(lengths.sum()), dtype=numpy.int64)
+            for start, tokens in zip(starts, documents):
+                ids[start + 1:start + 1 + len(tokens)] = self.encode(tokens)
+            document_index = numpy.repeat(numpy.arange(len(documents)), lengths)
+            result = numpy.empty((len(documents), len(self.priors)), dtype=numpy.float64)
+            for row, prior in enumerate(self.priors):
+                weights = self.log_probs[row, ids]
+                weights[starts] = prior
+                result[:, row] = numpy.bincount(document_index, weights=weights, minlength=len(documents))
+            record['documents'] = len(documents)
+        return result
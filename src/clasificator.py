@@ -10,13 +10,24 @@ Clasificator
 
 import getopt
 import sys
-import json
-import pandas
 import math
 import os
-from alive_progress import alive_bar
+from concurrent.futures import ProcessPoolExecutor
 
 from vocabulary.vocabulary import Vocabulary
+from vocabulary.cache import CACHE_NAME, load_caches
+from vocabulary.corpus import read_frame
+from vocabulary.tokenized import TokenizedCorpus, load_tokenized, save_tokenized
+from vocabulary.profiler import PROFILE_OPTIONS, PROFILER
+from vocabulary.preprocessing import PREPROCESSING_OPTIONS, Profile, load_profile, profile_from_options
+from vocabulary.output import COMPRESS_OPTIONS, MODEL_FOLDER, compression_suffix, find_output, open_text, write_lines
+from vocabulary.spell import SNAPSHOT_NAME
+from batch_classifier import BatchClassifier
+from model_file import BinaryModel, parse_model_lines
+from ngram_model import NgramModel
+
+# Class of every model, in the order of the models
+CLASSES = ['positive', 'negative']
 
 def parse_arguments(argument_list: list[str]) -> dict:
     """
@@ -26,40 +37,57 @@ def parse_arguments(argument_list: list[str]) -> dict:
     """
     test_filename = ''
     output_folder = ''
-    options, arguments = getopt.getopt(argument_list, 'i:o:', ['ifile=', 'ofile='])
-    if len(arguments) != 0 or len(options) != 2:
-        print('clasificator.py -i <testfile> -o <outputfolder>')
-        sys.exit(2)
+    workers = 1
+    binary = False
+    compression = ''
+    ngrams = False
+    folder = MODEL_FOLDER
+    options, arguments = getopt.getopt(argument_list, 'i:o:d:w:bgp:x:z:', ['ifile=', 'ofile=', 'models=', 'workers=', 'binary', 'ngrams'] + PREPROCESSING_OPTIONS + PROFILE_OPTIONS + COMPRESS_OPTIONS)
     for option, argument in options:
         if option in ('-i'):
             test_filename = argument
         elif option in ('-o'):
             output_folder = argument
-    return test_filename, output_folder
+        elif option in ('-d', '--models'):
+            folder = argument
+        elif option in ('-w', '--workers'):
+            workers = int(argument)
+        elif option in ('-b', '--binary'):
+            binary = True
+        elif option in ('-z', '--compress'):
+            compression = argument
+        elif option in ('-g', '--ngrams'):
+            ngrams = True
+    if len(arguments) != 0 or not test_filename or not output_folder:
+        print('clasificator.py -i <testfile> -o <outputfolder> [-d <modelfolder>] [-w <workers>] [-b] [-g] [-z <gz|zst>] [-p <profile>] [-x <parameter>=<option>] [--profile <jsonfile>] [--trace <tracefile>] [--cprofile <statsfile>] [--tracemalloc]')
+        sys.exit(2)
+    PROFILER.configure(options)
+    return test_filename, output_folder, folder, workers, binary, ngrams, compression_suffix(compression), profile_from_options(options)
 
-def search_parameters_json() -> dict:
+def search_parameters_json(folder: str = MODEL_FOLDER) -> Profile:
     """
     Search the parameters file
-        :return: dictionary with the parameters
+        :param folder: folder of the models
+        :return: validated profile with the parameters
     """
-    for filename in os.listdir('./out'):
+    for filename in os.listdir(folder):
         if filename == 'parameters.json':
-            with open('./out/' + filename, 'r', encoding='utf-8') as file:
-                return json.load(file)
+            return load_profile(os.path.join(folder, filename))
     raise Exception('No parameters file found')
 
-def search_language_model() -> list:
+def search_language_model(folder: str = MODEL_FOLDER) -> list:
     """
     Search the language model files
+        :param folder: folder of the models
         :return: list with the language model files
     """
     files = []
-    with open('./out/language_model_positive.txt', 'r', encoding='utf-8') as file:
-        files.append(file.readlines())
-    with open('./out/language_model_negative.txt', 'r', encoding='utf-8') as file:
-        files.append(file.readlines())
-    if len(files) != 2:
-        raise Exception('No language model files found')
+    for class_doc in CLASSES:
+        filename = find_output(os.path.join(folder, f'language_model_{class_doc}.txt'))
+        if filename is None:
+            raise Exception('No language model files found')
+        with open_text(filename) as file:
+            files.append(file.readlines())
     return files
 
 def process_language_models(files: list) -> list:
@@ -75,85 +103,240 @@ def process_language_models(files: list) -> list:
     total_documents = positive_documents + negative_documents
     positive_model['probability'] = math.log(positive_documents / total_documents)
     negative_model['probability'] = math.log(negative_documents / total_documents)
-    positive_model['words'] = {}
-    negative_model['words'] = {}
-    positive_lines = files[0][2:]
-    negative_lines = files[1][2:]
-    for line in positive_lines:
-        [[_, word], _, [_, prob]] = list(map(lambda x : x.split(':', 1), line.split(' ')))
-        positive_model['words'][word] = float(prob)
-    for line in negative_lines:
-        [[_, word], _, [_, prob]] = list(map(lambda x : x.split(':', 1), line.split(' ')))
-        negative_model['words'][word] = float(prob)
+    positive_model['words'] = parse_model_lines(files[0][2:])
+    negative_model['words'] = parse_model_lines(files[1][2:])
     return [positive_model, negative_model]
 
-def process_documents(dataframe: pandas.DataFrame, language_models: list, output_folder: str) -> None:
-    results = []
-    parameters = search_parameters_json()
-    yield 'Parameters found.'
+def open_binary_models(folder: str = MODEL_FOLDER) -> list:
+    """
+    Map the binary language model files, nothing is parsed
+        :param folder: folder of the models
+        :return: list with the language models, the words are BinaryModel
+    """
+    positive_words = BinaryModel(os.path.join(folder, 'language_model_positive.bin'))
+    negative_words = BinaryModel(os.path.join(folder, 'language_model_negative.bin'))
+    total_documents = positive_words.number_documents + negative_words.number_documents
+    return [
+        {'probability': math.log(positive_words.number_documents / total_documents), 'words': positive_words},
+        {'probability': math.log(negative_words.number_documents / total_documents), 'words': negative_words},
+    ]
+
+def open_ngram_model(folder: str = MODEL_FOLDER) -> NgramModel:
+    """
+    Read the n-gram models written by language_model.py -n
+        :param folder: folder of the models
+        :return: n-gram model with the classes in the order of the models
+    """
+    return NgramModel.load(os.path.join(folder, 'language_model_ngrams.npz')).select(CLASSES)
+
+def build_classifier(language_models):
+    """
+    Classifier of the language models
+        :param language_models: list with the language models, or the n-gram model
+        :return: classifier with a score method
+    """
+    if isinstance(language_models, NgramModel):
+        return language_models
+    return BatchClassifier(language_models)
+
+def token_kind(language_models) -> str:
+    """
+    Order of the tokens that the language models score
+        :param language_models: list with the language models, or the n-gram model
+        :return: 'sequences' for the order of the text, 'documents' for the alphabetic order
+    """
+    return 'sequences' if isinstance(language_models, NgramModel) else 'documents'
+
+def tokenize_document(vocabulary: Vocabulary, text: str, ordered: bool = False) -> tuple:
+    """
+    Tokenize a test document
+        :param vocabulary: vocabulary with the parameters
+        :param text: text of the document
+        :param ordered: keep the tokens in the order of the text instead of the alphabetic order
+        :return: result without probabilities and the tokens, None if the document is not a text
+    """
+    try: current_result = {'text': text[:10].replace('\n', ' ')}
+    except: return None
+    if ordered:
+        return current_result, list(vocabulary.compile().stream(text.split()))
+    for _ in vocabulary.tokenize(text.split(), use_set=False, compiled=True):
+        pass
+    return current_result, vocabulary.tokens
+
+def best_class(probabilities: list) -> str:
+    """
+    Class of the model with the highest log-probability
+        :param probabilities: log-probability of every model
+        :return: class name, a tie goes to the negative class
+    """
+    return CLASSES[0] if probabilities[0] > probabilities[1] else CLASSES[1]
+
+def classify(results: list, scores: list) -> None:
+    """
+    Add the probabilities and the class to the results
+        :param results: list with the results
+        :param scores: log-probabilities of every result for every model
+    """
+    for current_result, probabilities in zip(results, scores):
+        for count, probability in enumerate(probabilities):
+            current_result[f'prob_model_{count}'] = probability
+        current_result['class'] = best_class(probabilities)
+
+def model_vocabulary(parameters: dict, folder: str) -> Vocabulary:
+    """
+    Vocabulary with the spell checker snapshot of the models
+        :param parameters: preprocessing parameters
+        :param folder: folder of the models
+        :return: vocabulary ready to tokenize
+    """
     vocabulary = Vocabulary('')
     vocabulary.parameters = parameters
-    size = len(dataframe)
-    for i in range(size):
-        text = dataframe.values[i, 0]
-        try: current_result = {'text': text[:10].replace('\n', ' ')}
-        except: continue
-        for _ in vocabulary.tokenize(text.split(), use_set=False):
-            pass
-        count = 0
-        for model in language_models:
-            probability = model['probability']
-            for word in vocabulary.tokens:
-                if word in model['words']:
-                    probability += model['words'][word]
-                else:
-                    probability += model['words']['<UNK>']
-            current_result[f'prob_model_{count}'] = probability
-            count += 1
-        current_result['class'] = 'positive' if current_result['prob_model_0'] > current_result['prob_model_1'] else 'negative'
-        results.append(current_result)
-        yield 'NO PRINT'
-    yield 'Documents processed.'
-    export_files(results, output_folder)
+    vocabulary.spell_snapshot = os.path.join(folder, SNAPSHOT_NAME)
+    return vocabulary
+
+WORKER = {}
+
+def init_worker(parameters: dict, language_models: list, folder: str = MODEL_FOLDER) -> None:
+    """
+    Load the parameters and the models once in every worker process
+        :param parameters: preprocessing parameters
+        :param language_models: list with the language models, or the n-gram model
+        :param folder: folder of the models and their token cache
+    """
+    load_caches(os.path.join(folder, CACHE_NAME))
+    WORKER['vocabulary'] = model_vocabulary(parameters, folder)
+    WORKER['classifier'] = build_classifier(language_models)
+    WORKER['ordered'] = token_kind(language_models) == 'sequences'
+
+def process_shard(texts: list) -> list:
+    """
+    Tokenize and score a shard of documents in a worker process
+        :param texts: texts of the documents
+        :return: list with the results
+    """
+    results = []
+    documents = []
+    for text in texts:
+        tokenized = tokenize_document(WORKER['vocabulary'], text, WORKER['ordered'])
+        if tokenized is not None:
+            results.append(tokenized[0])
+            documents.append(tokenized[1])
+    classify(results, WORKER['classifier'].score(documents).tolist())
+    return results
+
+def process_documents(dataframe: 'pandas.DataFrame', language_models: list, output_folder: str, workers: int = 1, test_filename: str = '', parameters: Profile = None, suffix: str = '', folder: str = MODEL_FOLDER) -> None:
+    """
+    Tokenize the documents and score them all at once
+        :param dataframe: test documents
+        :param language_models: list with the language models, or the n-gram model
+        :param output_folder: folder to export the files
+        :param workers: number of processes, the documents are split in shards
+        :param test_filename: input file, the tokens of its documents are cached
+        :param parameters: preprocessing profile, the one in parameters.json if it is not given
+        :param suffix: compression suffix of the files, empty to not compress them
+        :param folder: folder of the models, the parameters and the token cache
+    """
+    results = []
+    documents = []
+    parameters = parameters or search_parameters_json(folder)
+    yield 'Parameters found.'
+    texts = dataframe.values[:, 0]
+    kind = token_kind(language_models)
+    corpus = load_tokenized(test_filename, kind, parameters) if test_filename else None
+    if workers > 1 and corpus is None:
+        size = max(1, math.ceil(len(texts) / (workers * 4)))
+        shards = [texts[i:i + size] for i in range(0, len(texts), size)]
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(parameters, language_models, folder)) as executor:
+            for shard_results in executor.map(process_shard, shards):
+                results.extend(shard_results)
+                for _ in shard_results:
+                    yield 'NO PRINT'
+        yield 'Documents processed.'
+        yield 'Documents scored.'
+    else:
+        if corpus is None:
+            load_caches(os.path.join(folder, CACHE_NAME))
+            vocabulary = model_vocabulary(parameters, folder)
+            rows = []
+        for index, text in enumerate(texts):
+            if corpus is None:
+                tokenized = tokenize_document(vocabulary, text, kind == 'sequences')
+                rows.append([] if tokenized is None else tokenized[1])
+            elif isinstance(text, str):
+                tokenized = {'text': text[:10].replace('\n', ' ')}, corpus.document(index)
+            else:
+                tokenized = None
+            if tokenized is None:
+                continue
+            results.append(tokenized[0])
+            documents.append(tokenized[1])
+            yield 'NO PRINT'
+        if corpus is None and test_filename:
+            save_tokenized(TokenizedCorpus.from_documents(rows), test_filename, kind, parameters)
+        yield 'Documents processed.'
+        with PROFILER.stage('build_classifier'):
+            batch_classifier = build_classifier(language_models)
+        classify(results, batch_classifier.score(documents).tolist())
+        yield 'Documents scored.'
+    with PROFILER.stage('export_files', len(results)):
+        export_files(results, output_folder, suffix)
     yield 'Files exported.'
 
-def export_files(results: list, output_folder: str) -> None:
+def export_files(results: list, output_folder: str, suffix: str = '') -> None:
     """
-    Export the files
+    Export the files, both are built in one pass over the results and
+    every file is written at once
         :param results: list with the results
         :param output_folder: folder to export the files
+        :param suffix: compression suffix of the files, empty to not compress them
     """
     os.makedirs(output_folder, exist_ok=True)
-    with open(output_folder + '/clasification_alu0101331720.txt', 'w', encoding='utf-8') as file:
-        for result in results:
-            file.write(
-                f"{result['text']}, {round(result['prob_model_0'], 2)}, " +
-                f"{round(result['prob_model_1'], 2)}, {result['class']}\n"
-            )
-    with open(output_folder + '/resumen_alu0101331720.txt', 'w', encoding='utf-8') as file:
-        for result in results:
-            file.write(result['class'] + '\n')
+    clasification = []
+    summary = []
+    for result in results:
+        clasification.append(
+            f"{result['text']}, {round(result['prob_model_0'], 2)}, " +
+            f"{round(result['prob_model_1'], 2)}, {result['class']}"
+        )
+        summary.append(result['class'])
+    write_lines(output_folder + '/clasification_alu0101331720.txt' + suffix, clasification)
+    write_lines(output_folder + '/resumen_alu0101331720.txt' + suffix, summary)
     
 def main():
     """
     Main function
     """
-    test_filename, output_folder = parse_arguments(sys.argv[1:])
+    test_filename, output_folder, folder, workers, binary, ngrams, suffix, profile = parse_arguments(sys.argv[1:])
     yield 'Arguments parsed.'
-    language_models = search_language_model()
-    yield 'Language models found.'
-    models = process_language_models(language_models)
+    if ngrams:
+        with PROFILER.stage('load_models'):
+            models = open_ngram_model(folder)
+        yield 'Language models found.'
+    elif binary:
+        with PROFILER.stage('load_models'):
+            models = open_binary_models(folder)
+        yield 'Language models found.'
+    else:
+        with PROFILER.stage('read_models'):
+            language_models = search_language_model(folder)
+        yield 'Language models found.'
+        with PROFILER.stage('load_models'):
+            models = process_language_models(language_models)
     yield 'Language models processed.'
-    test_data = pandas.read_excel(test_filename, header=None)
+    with PROFILER.stage('read_test_data') as record:
+        test_data = read_frame(test_filename)
+        record['documents'] = len(test_data)
     yield 'Test data loaded.'
-    for message in process_documents(test_data, models, output_folder):
+    for message in process_documents(test_data, models, output_folder, workers, test_filename, profile, suffix, folder):
         yield message
+    PROFILER.export()
 
 if __name__ == '__main__':
+    from alive_progress import alive_bar
     YELLOW = '\033[33m'
     GREEN = '\033[32m'
     RESET = '\033[0m'
-    MAX = 7 + 3186
+    MAX = 8 + 3186
     print(YELLOW, end='')
     with alive_bar(MAX) as bar:
         count = 1
@@ -0,0 +1,63 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Command Line Interface
+"""
+
+import os
+import runpy
+import sys
+
+FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# Script of every subcommand. Only the script of the subcommand is loaded,
+# so every subcommand imports just the libraries it uses
+SUBCOMMANDS = {
+    'vocab': ('vocabulary/vocabulary.py', 'Build the vocabulary of a corpus'),
+    'train': ('language_model.py', 'Train the language model of every class'),
+    'classify': ('clasificator.py', 'Classify the documents of a file'),
+    'serve': ('server.py', 'Serve the classifier over a socket'),
+}
+
+def usage() -> str:
+    """
+    Help of the command line
+        :return: text with every subcommand
+    """
+    lines = ['cli.py <subcommand> [options]', '']
+    for name, (_, description) in SUBCOMMANDS.items():
+        lines.append(f'    {name:<10}{description}')
+    lines.append('')
+    lines.append('cli.py <subcommand> without options shows the options of the subcommand')
+    return '\n'.join(lines)
+
+def run(subcommand: str, argument_list: list[str]) -> None:
+    """
+    Run the script of a subcommand as if it was called from the shell
+        :param subcommand: name of the subcommand
+        :param argument_list: options of the subcommand
+    """
+    if subcommand not in SUBCOMMANDS:
+        raise Exception(f'Unknown subcommand {subcommand}, use one of {", ".join(SUBCOMMANDS)}')
+    script = os.path.join(FOLDER, SUBCOMMANDS[subcommand][0])
+    sys.argv = [script] + argument_list
+    sys.path.insert(0, os.path.dirname(script))
+    runpy.run_path(script, run_name='__main__')
+
+def main() -> None:
+    """
+    Main function
+    - Take the subcommand from the first argument
+    - Run its script with the rest of the arguments
+    """
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print(usage())
+        sys.exit(0 if len(sys.argv) > 1 else 2)
+    run(sys.argv[1], sys.argv[2:])
+
+if __name__ == '__main__':
+    main()
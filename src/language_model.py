@@ -9,13 +9,19 @@ Language Model
 """
 
 import getopt
+import hashlib
 import json
 import sys
 import os
 import math
-import pandas
-from vocabulary import Vocabulary
-from alive_progress import alive_bar
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+from vocabulary import CACHE_NAME, MODEL_FOLDER, Vocabulary, VocabularyIndex, TokenizedCorpus, Profile, PROFILE_OPTIONS, PREPROCESSING_OPTIONS, PROFILER, load_profile, profile_from_options, iter_documents, read_frame, load_caches, save_caches, load_tokenized, save_tokenized, tokenize_texts, tokenize_sequences, COMPRESS_OPTIONS, compression_suffix, find_output, open_text, write_text
+from model_file import LanguageModel, write_binary_model, write_text_model
+from ngram_model import MAX_ORDER, NgramModel
+
+UNKNOWN = '<UNK>'
 
 def parse_arguments(argument_list: list[str]) -> dict:
     """
@@ -25,26 +31,69 @@ def parse_arguments(argument_list: list[str]) -> dict:
     """
     input_filename = ''
     output_filename = ''
-    options, arguments = getopt.getopt(argument_list, 'i:o:', ['ifile=', 'ofile='])
-    if len(arguments) != 0 or len(options) != 2:
-        print('language_model.py -i <inputfile> -o <outputfile>')
-        sys.exit(2)
+    workers = 1
+    chunk_size = 0
+    binary = False
+    update = False
+    compression = ''
+    order = 1
+    options, arguments = getopt.getopt(argument_list, 'i:o:w:s:bun:p:x:z:', ['ifile=', 'ofile=', 'workers=', 'stream=', 'binary', 'update', 'order='] + PREPROCESSING_OPTIONS + PROFILE_OPTIONS + COMPRESS_OPTIONS)
     for option, argument in options:
         if option in ('-i'):
             input_filename = argument
         elif option in ('-o'):
             output_filename = argument
-    return input_filename, output_filename
+        elif option in ('-w', '--workers'):
+            workers = int(argument)
+        elif option in ('-s', '--stream'):
+            chunk_size = int(argument)
+        elif option in ('-b', '--binary'):
+            binary = True
+        elif option in ('-u', '--update'):
+            update = True
+        elif option in ('-z', '--compress'):
+            compression = argument
+        elif option in ('-n', '--order'):
+            order = int(argument)
+    if len(arguments) != 0 or not input_filename or not output_filename:
+        print('language_model.py -i <inputfile> -o <outputfile> [-w <workers>] [-s <chunksize>] [-b] [-u] [-n <order>] [-z <gz|zst>] [-p <profile>] [-x <parameter>=<option>] [--profile <jsonfile>] [--trace <tracefile>] [--cprofile <statsfile>] [--tracemalloc]')
+        sys.exit(2)
+    if not 1 <= order <= MAX_ORDER:
+        raise Exception(f'The order of the n-grams must be between 1 and {MAX_ORDER}')
+    if order > 1 and (chunk_size > 0 or update):
+        raise Exception('The n-gram models need the tokens of every document, they can not be trained with -s or -u')
+    PROFILER.configure(options)
+    return input_filename, output_filename, workers, chunk_size, binary, update, order, compression_suffix(compression), profile_from_options(options)
+
+def number_messages(number_classes: int, order: int) -> int:
+    """
+    Number of messages of the main function for the progress bar, every
+    class writes its model file and the n-gram models write one more
+        :param number_classes: number of classes of the models
+        :param order: number of tokens of the longest n-grams
+        :return: number of messages
+    """
+    return 6 + number_classes + (order > 1)
+
+def check_classes(classes: list[str]) -> None:
+    """
+    Check that every class gets its own model file, the name of the file
+    has the class in lowercase
+        :param classes: classes of the models
+    """
+    names = Counter(class_doc.lower() for class_doc in classes)
+    repeated = sorted(class_doc for class_doc in classes if names[class_doc.lower()] > 1)
+    if repeated:
+        raise Exception(f'The classes {", ".join(repeated)} only differ in case, their model files would have the same name')
 
-def search_parameters_json() -> dict:
+def search_parameters_json() -> Profile:
     """
     Search the parameters file
-        :return: dictionary with the parameters
+        :return: validated profile with the parameters
     """
-    for filename in os.listdir('./out'):
+    for filename in os.listdir(MODEL_FOLDER):
         if filename == 'parameters.json':
-            with open('./out/' + filename, 'r', encoding='utf-8') as file:
-                return json.load(file)
+            return load_profile(os.path.join(MODEL_FOLDER, filename))
     raise Exception('No parameters file found')
 
 def search_vocabulary() -> list[str]:
@@ -52,125 +101,365 @@ def search_vocabulary() -> list[str]:
     Search the vocabulary file
         :return: dictionary with the vocabulary
     """
-    for filename in os.listdir('./out'):
-        if filename == 'vocabulary.txt':
-            with open('./out/' + filename, 'r', encoding='utf-8') as file:
-                return file.read().split()
-    raise Exception('No vocabulary file found')
+    filename = find_output(os.path.join(MODEL_FOLDER, 'vocabulary.txt'))
+    if filename is None:
+        raise Exception('No vocabulary file found')
+    with open_text(filename) as file:
+        return file.read().split()
 
-def token_probabilities(vocabulary: list[str], tokens: list[str]) -> dict:
+def token_probabilities(vocabulary: VocabularyIndex, counts: numpy.ndarray) -> LanguageModel:
     """
     Create the language model
-        :param vocabulary: list with the vocabulary
-        :param tokens: list of tokens
-        :return: dictionary with the probabilities
-    """
-    auxiliar = {i: 0 for i in vocabulary}
-    unknown = '<UNK>'
-    auxiliar[unknown] = 0
-    for token in tokens:
-        if token in auxiliar:
-            auxiliar[token] += 1
-        else:
-            auxiliar[unknown] += 1
+        :param vocabulary: index of the vocabulary
+        :param counts: frequency of every id of the vocabulary, the last one is <UNK>
+        :return: words with their frequencies and log-probabilities
+    """
+    number_tokens = int(counts.sum())
     yield 'Words counted.'
-    result = auxiliar.copy()
-    for token in auxiliar:
-        if auxiliar[token] < 2 and token != unknown:
-            result[unknown] += 1
-            del result[token]
+    known = counts[:-1] >= 2
+    frecs = numpy.append(counts[:-1][known], counts[-1] + numpy.count_nonzero(~known))
+    words = [vocabulary.tokens[index] for index in numpy.flatnonzero(known).tolist()] + [UNKNOWN]
     yield 'Filtered one-aparition words.'
-    for token in result:
-        probability = (result[token] + 1) / (len(tokens) + len(vocabulary))
-        result[token] = {
-            'frec': result[token],
-            'log_prob': math.log(probability),
-        }
+    # math.log over the distinct frequencies keeps the values bit for bit
+    # the same as computing them word by word
+    distinct, inverse = numpy.unique(frecs, return_inverse=True)
+    logs = numpy.array([math.log((frequency + 1) / (number_tokens + vocabulary.size)) for frequency in distinct.tolist()])
     yield 'Words probabilities done.'
-    yield result
+    yield LanguageModel(words, frecs, logs[inverse])
+
+def class_label(value) -> str:
+    """
+    Label of the class of a document
+        :param value: value of the class column
+        :return: label, None if the document has no class
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return str(value)
+
+def count_stream(vocabulary: Vocabulary, index: VocabularyIndex, filename: str, chunk_size: int) -> tuple:
+    """
+    Read the corpus in chunks and count the tokens of every class by id as
+    they leave the pipeline, so the memory depends on the vocabulary and
+    not on the corpus
+        :param vocabulary: vocabulary with the parameters
+        :param index: index of the vocabulary file
+        :param filename: file with the corpus
+        :param chunk_size: number of documents of every chunk
+        :return: counts of the ids and number of documents of every class
+    """
+    stream = vocabulary.compile().stream
+    ids = index.ids
+    unknown = index.unknown
+    counts = {}
+    documents = {}
+    for chunk in iter_documents(filename, chunk_size):
+        for text, class_doc in chunk:
+            class_doc = class_label(class_doc)
+            if class_doc is None:
+                continue
+            if class_doc not in counts:
+                counts[class_doc] = [0] * (unknown + 1)
+                documents[class_doc] = 0
+            documents[class_doc] += 1
+            if not isinstance(text, str):
+                continue
+            class_counts = counts[class_doc]
+            for token in stream(text.split()):
+                class_counts[ids.get(token, unknown)] += 1
+    return {class_doc: numpy.array(class_counts, dtype=numpy.int64) for class_doc, class_counts in counts.items()}, documents
+
+WORKER = {}
+
+def init_worker(parameters: dict) -> None:
+    """
+    Load the parameters once in every worker process
+        :param parameters: preprocessing parameters
+    """
+    load_caches(os.path.join(MODEL_FOLDER, CACHE_NAME))
+    WORKER['vocabulary'] = Vocabulary('')
+    WORKER['vocabulary'].parameters = parameters
+
+def count_chunk(rows: list[tuple]) -> dict:
+    """
+    Tokenize a chunk of documents in a worker process
+        :param rows: text and class of every document
+        :return: counts of the tokens of every class
+    """
+    pipeline = WORKER['vocabulary'].compile()
+    counts = {}
+    for text, class_doc in rows:
+        class_counts = counts.setdefault(class_doc, Counter())
+        if isinstance(text, str):
+            class_counts.update(pipeline.stream(text.split()))
+    return counts
+
+def count_parallel(executor: ProcessPoolExecutor, rows: list[tuple], workers: int) -> dict:
+    """
+    Split the corpus in chunks and merge the counts of every chunk
+        :param executor: pool of workers
+        :param rows: text and class of every document with a class
+        :param workers: number of workers
+        :return: counts of the tokens of every class
+    """
+    size = max(1, math.ceil(len(rows) / (workers * 4)))
+    counts = {}
+    for chunk_counts in executor.map(count_chunk, [rows[i:i + size] for i in range(0, len(rows), size)]):
+        for class_doc, class_counts in chunk_counts.items():
+            counts.setdefault(class_doc, Counter()).update(class_counts)
+    return counts
+
+def tokenize_corpus(vocabulary: Vocabulary, parameters: dict, texts: list, filename: str, kind: str = 'documents') -> TokenizedCorpus:
+    """
+    Tokenize the corpus in memory and cache its tokens
+        :param vocabulary: vocabulary with the parameters
+        :param parameters: preprocessing parameters
+        :param texts: texts of the documents
+        :param filename: input file, it is the key of the cache
+        :param kind: 'documents' for the tokens in alphabetic order, 'sequences' for the order of the text
+        :return: tokenized corpus
+    """
+    tokenize = tokenize_sequences if kind == 'sequences' else tokenize_texts
+    with PROFILER.stage('tokenize', len(texts)) as record:
+        corpus = TokenizedCorpus.from_documents(tokenize(vocabulary, texts))
+        record['tokens_out'] = len(corpus.ids)
+    save_tokenized(corpus, filename, kind, parameters)
+    return corpus
+
+def count_tokens(vocabulary: Vocabulary, parameters: dict, texts: list, labels: list[str], filename: str, workers: int, index: VocabularyIndex):
+    """
+    Tokenize the corpus in memory and count the tokens of all the classes
+    in one pass. The tokens of every document are cached so a run over the
+    same file and parameters does not tokenize it again
+        :param vocabulary: vocabulary with the parameters
+        :param parameters: preprocessing parameters
+        :param texts: texts of the documents
+        :param labels: class of every document, None for the ones without class
+        :param filename: input file, it is the key of the cache
+        :param workers: number of processes, the corpus is split in chunks and not cached
+        :param index: index of the vocabulary file
+        :return: generator of messages, the last one is the counts of the ids of every class
+    """
+    classes = list(dict.fromkeys(label for label in labels if label is not None))
+    corpus = load_tokenized(filename, 'documents', parameters)
+    if corpus is None and workers > 1:
+        rows = [(text, label) for text, label in zip(texts, labels) if label is not None]
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(parameters,)) as executor:
+            yield 'Workers started.'
+            counts = count_parallel(executor, rows, workers)
+        yield 'Tokens of every class counted.'
+        yield {class_doc: index.count(counts.get(class_doc, Counter())) for class_doc in classes}
+        return
+    if corpus is None:
+        corpus = tokenize_corpus(vocabulary, parameters, texts, filename)
+        yield 'Corpus tokenized.'
+    else:
+        yield 'Tokenized corpus found.'
+    with PROFILER.stage('count', len(corpus.ids)):
+        positions = {class_doc: position for position, class_doc in enumerate(classes)}
+        groups = numpy.array([positions.get(label, -1) for label in labels], dtype=numpy.int64)
+        counts = index.count_table(corpus.table, corpus.group_counts(groups, len(classes)))
+    yield 'Tokens of every class counted.'
+    yield dict(zip(classes, counts))
 
-def write_model(filename: str, number_documents: int, number_words: int, tokens: dict) -> None:
+def class_models(index: VocabularyIndex, counts: dict) -> dict:
+    """
+    Create the language model of every class
+        :param index: index of the vocabulary
+        :param counts: counts of the ids of every class
+        :return: dictionary class -> language model
+    """
+    models = {}
+    for class_doc, class_counts in counts.items():
+        *_, models[class_doc] = token_probabilities(index, class_counts)
+    return models
+
+def ngram_model(index: VocabularyIndex, corpus: TokenizedCorpus, labels: list[str], documents: dict, models: dict, order: int) -> NgramModel:
+    """
+    Create the n-gram model of every class, the language model of the
+    class is its lowest order
+        :param index: index of the vocabulary
+        :param corpus: tokenized corpus with the tokens in the order of the text
+        :param labels: class of every document, None for the ones without class
+        :param documents: number of documents of every class
+        :param models: language model of every class
+        :param order: number of tokens of the longest n-grams
+        :return: n-gram model
+    """
+    classes = list(models)
+    positions = {class_doc: position for position, class_doc in enumerate(classes)}
+    groups = numpy.array([positions.get(label, -1) for label in labels], dtype=numpy.int64)
+    ids = numpy.array(index.encode(corpus.table), dtype=numpy.int64)[corpus.ids]
+    # Words out of a model get its <UNK> probability, like the classifier does
+    unigram = numpy.empty((len(classes), index.unknown + 2), dtype=numpy.float64)
+    for row, model in enumerate(models.values()):
+        unigram[row] = model.log_probs[model.words.index(UNKNOWN)]
+        known = [position for position, word in enumerate(model.words) if word != UNKNOWN]
+        unigram[row, index.encode([model.words[position] for position in known])] = model.log_probs[known]
+    total_documents = sum(documents[class_doc] for class_doc in classes)
+    priors = [math.log(documents[class_doc] / total_documents) for class_doc in classes]
+    return NgramModel.train(order, classes, index.tokens, priors, unigram, ids, corpus.starts, groups)
+
+def write_models(output_filename: str, documents: dict, models: dict, binary: bool, suffix: str = '') -> list[str]:
+    """
+    Write the language model of every class
+        :param output_filename: prefix of the files, the class in lowercase is added
+        :param documents: number of documents of every class
+        :param models: language model of every class
+        :param binary: write the binary format too
+        :param suffix: compression suffix of the text files, empty to not compress them
+        :return: names of the text files
     """
-    Write the file
+    filenames = []
+    for class_doc, model in models.items():
+        filename = f'{output_filename}_{class_doc.lower()}'
+        text_filename = filename + '.txt' + suffix
+        write_text_model(text_filename, documents[class_doc], model)
+        if binary:
+            write_binary_model(filename + '.bin', documents[class_doc], model)
+        filenames.append(text_filename)
+    return filenames
+
+def vocabulary_digest(vocabulary: list[str]) -> str:
+    """
+    Fingerprint of the vocabulary file
+        :param vocabulary: list with the vocabulary
+        :return: hexadecimal digest
+    """
+    return hashlib.sha256('\n'.join(vocabulary).encode('utf-8')).hexdigest()
+
+def read_counts(filename: str, parameters: dict, vocabulary: list[str], index: VocabularyIndex) -> tuple:
+    """
+    Read the counts of a previous training
+        :param filename: json file written by write_counts
+        :param parameters: current preprocessing parameters
+        :param vocabulary: current vocabulary
+        :param index: index of the vocabulary
+        :return: counts of the ids and number of documents of every class
+    """
+    if not os.path.isfile(filename):
+        raise Exception(f'No counts file {filename} found, train the model without -u first')
+    with open(filename, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    if data['parameters'] != dict(parameters) or data['vocabulary'] != vocabulary_digest(vocabulary):
+        raise Exception('The parameters or the vocabulary changed since the last training, train the model without -u')
+    counts = {}
+    for class_doc, class_counts in data['counts'].items():
+        # Files of older versions keep the counts by token
+        if isinstance(class_counts, dict):
+            counts[class_doc] = index.count(Counter(class_counts))
+        else:
+            counts[class_doc] = numpy.array(class_counts, dtype=numpy.int64)
+    return counts, data['documents']
+
+def write_counts(filename: str, parameters: dict, vocabulary: list[str], counts: dict, documents: dict) -> None:
+    """
+    Write the raw counts of every class so the model can be updated later
         :param filename: name of the file
-        :param data: data to write
+        :param parameters: preprocessing parameters
+        :param vocabulary: list with the vocabulary
+        :param counts: counts of the ids of every class, in the order of the vocabulary
+        :param documents: number of documents of every class
     """
-    with open(filename, 'w', encoding='utf-8') as file:
-        file.write(f'Number_of_documents: {number_documents}\n')
-        file.write(f'Number_of_words: {number_words}\n')
-        for token in tokens:
-            prob = tokens[token]
-            file.write(f'Word:{token} Frec:{prob["frec"]} LogProb:{prob["log_prob"]}\n')
+    write_text(filename, json.dumps({
+        'parameters': dict(parameters),
+        'vocabulary': vocabulary_digest(vocabulary),
+        'documents': documents,
+        'counts': {class_doc: class_counts.tolist() for class_doc, class_counts in counts.items()},
+    }))
 
 def main() -> None:
     """
     Main function
         - Parse the arguments
-        - Search the parameters file
-        - Read the corpus
-        - Tokenize the corpus
-        - Create the language model
-        - Save the language model
-    """
-    input_filename, output_filename = parse_arguments(sys.argv[1:])
-    parameters = search_parameters_json()
+        - Search the parameters file, unless a profile is given
+        - Read the counts of the previous training in the update mode
+        - Read the corpus, in chunks in the streaming mode
+        - Yield the number of messages once the classes are known
+        - Tokenize the corpus and count the tokens of every class in one pass
+        - Add the counts of the previous training in the update mode
+        - Create the language model of every class
+        - Save the language models, also in the binary format if asked
+        - Create and save the n-gram models if an order above 1 is asked
+    """
+    input_filename, output_filename, workers, chunk_size, binary, update, order, suffix, profile = parse_arguments(sys.argv[1:])
+    parameters = profile or search_parameters_json()
     yield 'Parameters file found'
     vocabulary_file = search_vocabulary()[2:]
+    index = VocabularyIndex(vocabulary_file)
     yield 'Vocabulary file found'
+    load_caches(os.path.join(MODEL_FOLDER, CACHE_NAME))
     vocabulary = Vocabulary('')
     vocabulary.parameters = parameters
-    column_names = ['text', 'class_doc']
-    train_file = pandas.read_excel(input_filename, header=None, names=column_names)
-    positive_tweets = train_file[train_file.class_doc == 'Positive'].iloc[:, 0]
-    negative_tweets = train_file[train_file.class_doc == 'Negative'].iloc[:, 0]
-    positive = positive_tweets.str.cat(sep=' ').split()
-    negative = negative_tweets.str.cat(sep=' ').split()
-    for message in vocabulary.tokenize(positive, use_set=False):
-        yield message
-    positive_tokens = vocabulary.tokens
-    for message in vocabulary.tokenize(negative, use_set=False):
-        yield message
-    negative_tokens = vocabulary.tokens
-    count = 0
-    iterator_pos = token_probabilities(vocabulary_file, positive_tokens)
-    iterator_neg = token_probabilities(vocabulary_file, negative_tokens)
-    for message in iterator_pos:
-        if (count > 0): break
-        count += 1
-        yield message
-    yield next(iterator_pos)
-    positive_probabilities = next(iterator_pos)
-    count = 0
-    for message in iterator_neg:
-        if (count > 0): break
-        count += 1
-        yield message
-    yield next(iterator_neg)
-    negative_probabilities = next(iterator_neg)
-    write_model(
-        output_filename + '_positive.txt',
-        len(positive_tweets),
-        len(positive_probabilities),
-        positive_probabilities,
-    )
-    yield f'File {output_filename}_positive.txt written.'
-    write_model(
-        output_filename + '_negative.txt',
-        len(negative_tweets),
-        len(negative_probabilities),
-        negative_probabilities,
-    )
-    yield f'File {output_filename}_negative.txt written.'
+    previous_counts, previous_documents = read_counts(output_filename + '_counts.json', parameters, vocabulary_file, index) if update else ({}, {})
+    if chunk_size > 0:
+        yield 'Streaming the corpus.'
+        with PROFILER.stage('count_stream'):
+            counts, documents = count_stream(vocabulary, index, input_filename, chunk_size)
+        yield 'Tokens of every class counted.'
+        classes = list(dict.fromkeys([*documents, *previous_documents]))
+        check_classes(classes)
+        yield number_messages(len(classes), order)
+    else:
+        with PROFILER.stage('read_corpus'):
+            train_file = read_frame(input_filename)
+        labels = [class_label(value) for value in train_file.iloc[:, 1].tolist()] if len(train_file.columns) > 1 else [None] * len(train_file)
+        documents = dict(Counter(label for label in labels if label is not None))
+        classes = list(dict.fromkeys([*documents, *previous_documents]))
+        check_classes(classes)
+        yield number_messages(len(classes), order)
+        for message in count_tokens(vocabulary, parameters, train_file.iloc[:, 0], labels, input_filename, workers, index):
+            if isinstance(message, dict):
+                counts = message
+            else:
+                yield message
+    if update:
+        for class_doc in previous_counts:
+            counts[class_doc] = counts[class_doc] + previous_counts[class_doc] if class_doc in counts else previous_counts[class_doc]
+            documents[class_doc] = documents.get(class_doc, 0) + previous_documents[class_doc]
+    if not counts:
+        raise Exception(f'No documents with a class found in {input_filename}')
+    write_counts(output_filename + '_counts.json', parameters, vocabulary_file, counts, documents)
+    save_caches(os.path.join(MODEL_FOLDER, CACHE_NAME))
+    yield 'Token cache saved.'
+    models = class_models(index, counts)
+    yield 'Words probabilities done.'
+    with PROFILER.stage('write_models', sum(len(model) for model in models.values())):
+        filenames = write_models(output_filename, documents, models, binary, suffix)
+    for filename in filenames:
+        yield f'File {filename} written.'
+    if order > 1:
+        # The n-grams need the tokens in the order of the text, the counts
+        # of the unigrams use them in alphabetic order
+        corpus = load_tokenized(input_filename, 'sequences', parameters)
+        if corpus is None:
+            corpus = tokenize_corpus(vocabulary, parameters, train_file.iloc[:, 0], input_filename, 'sequences')
+        with PROFILER.stage('ngrams', len(corpus.ids)):
+            model = ngram_model(index, corpus, labels, documents, models, order)
+            model.save(output_filename + '_ngrams.npz')
+        yield f'File {output_filename}_ngrams.npz written.'
+    PROFILER.export()
 
 if __name__ == '__main__':
+    from alive_progress import alive_bar
     YELLOW = '\033[33m'
     GREEN = '\033[32m'
     RESET = '\033[0m'
-    MAX = 28
+    # The number of messages depends on the classes, the bar starts once
+    # main knows them and counts the messages printed before
+    messages = main()
+    printed = 0
     print(YELLOW, end='')
+    for message in messages:
+        if isinstance(message, int):
+            MAX = message
+            break
+        print(RESET + message + YELLOW)
+        printed += 1
     with alive_bar(MAX) as bar:
-        count = 1
-        for message in main():
+        bar(printed)
+        count = printed + 1
+        for message in messages:
             if message == 'NO PRINT': pass
             elif (count < MAX): print(RESET + message + YELLOW)
             else: print(RESET + message + GREEN)
@@ -0,0 +1,275 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Model File
+"""
+
+import getopt
+import mmap
+import os
+import struct
+import sys
+import numpy
+from vocabulary.output import open_text, replace_file, write_lines
+
+UNKNOWN = '<UNK>'
+
+# Layout of a binary model, every section is aligned to 8 bytes:
+#   header   magic, number of documents, number of words, size of the strings
+#   offsets  int64[words + 1], start of every word in the strings
+#   log_prob float64[words]
+#   frec     int64[words]
+#   strings  utf-8 words in sorted order, utf-8 keeps the order of the code points
+MAGIC = b'NLPLM001'
+HEADER = struct.Struct('<8sqqq')
+
+class LanguageModel:
+    """
+    class LanguageModel:
+    Words of a model with their frequencies and log-probabilities in
+    parallel arrays, in the order of the text format
+    """
+    words = []
+    frecs = None
+    log_probs = None
+
+    def __init__(self, words: list[str], frecs: numpy.ndarray, log_probs: numpy.ndarray):
+        """
+        Constructor
+            :param words: words of the model
+            :param frecs: frequency of every word
+            :param log_probs: log-probability of every word
+        """
+        self.words = words
+        self.frecs = numpy.asarray(frecs, dtype=numpy.int64)
+        self.log_probs = numpy.asarray(log_probs, dtype=numpy.float64)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+def write_binary_model(filename: str, number_documents: int, model: LanguageModel) -> None:
+    """
+    Write a model in the binary format
+        :param filename: name of the file
+        :param number_documents: number of documents of the class
+        :param model: words with their frequencies and log-probabilities
+    """
+    order = sorted(range(len(model.words)), key=model.words.__getitem__)
+    encoded = [model.words[index].encode('utf-8') for index in order]
+    offsets = numpy.zeros(len(encoded) + 1, dtype='<i8')
+    numpy.cumsum([len(word) for word in encoded], out=offsets[1:])
+    log_probs = model.log_probs[order].astype('<f8')
+    frecs = model.frecs[order].astype('<i8')
+    # The file is replaced at once, a process that has the old file mapped
+    # keeps reading the old content
+    with replace_file(filename) as file:
+        file.write(HEADER.pack(MAGIC, number_documents, len(encoded), int(offsets[-1])))
+        file.write(offsets.tobytes())
+        file.write(log_probs.tobytes())
+        file.write(frecs.tobytes())
+        file.write(b''.join(encoded))
+
+class BinaryModel:
+    """
+    class BinaryModel:
+    Read-only, memory-mapped view of a binary model, it behaves like the
+    dictionary word -> log-probability of process_language_models
+    """
+    filename = ''
+    number_documents = 0
+    number_words = 0
+
+    def __init__(self, filename: str):
+        """
+        Constructor, only the header is read, the rest is mapped on demand
+            :param filename: name of the file
+        """
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.number_documents, self.number_words, strings_size = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise Exception(f'{filename} is not a binary language model')
+        start = HEADER.size
+        self.offsets = numpy.frombuffer(self.buffer, dtype='<i8', count=self.number_words + 1, offset=start)
+        start += self.offsets.nbytes
+        self.log_probs = numpy.frombuffer(self.buffer, dtype='<f8', count=self.number_words, offset=start)
+        start += self.log_probs.nbytes
+        self.frecs = numpy.frombuffer(self.buffer, dtype='<i8', count=self.number_words, offset=start)
+        self.strings = start + self.frecs.nbytes
+        if self.strings + strings_size > len(self.buffer):
+            raise Exception(f'{filename} is truncated')
+
+    def __reduce__(self):
+        # Worker processes map the file again instead of receiving a copy
+        return (BinaryModel, (self.filename,))
+
+    def __len__(self) -> int:
+        return self.number_words
+
+    def word(self, index: int) -> str:
+        """
+        Word stored at a position
+            :param index: position in the string table
+            :return: the word
+        """
+        start = self.strings + int(self.offsets[index])
+        end = self.strings + int(self.offsets[index + 1])
+        return self.buffer[start:end].decode('utf-8')
+
+    def index(self, word: str) -> int:
+        """
+        Binary search of a word in the string table
+            :param word: word to look up
+            :return: position of the word, -1 if it is not in the model
+        """
+        key = word.encode('utf-8')
+        buffer = self.buffer
+        offsets = self.offsets
+        low, high = 0, self.number_words
+        while low < high:
+            middle = (low + high) // 2
+            current = buffer[self.strings + int(offsets[middle]):self.strings + int(offsets[middle + 1])]
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def __iter__(self):
+        return (self.word(index) for index in range(self.number_words))
+
+    def __contains__(self, word: str) -> bool:
+        return self.index(word) >= 0
+
+    def __getitem__(self, word: str) -> float:
+        index = self.index(word)
+        if index < 0:
+            raise KeyError(word)
+        return float(self.log_probs[index])
+
+    def get(self, word: str, default: float = None) -> float:
+        """
+        Log-probability of a word
+            :param word: word to look up
+            :param default: value for the words that are not in the model
+            :return: log-probability of the word
+        """
+        index = self.index(word)
+        return default if index < 0 else float(self.log_probs[index])
+
+    def model(self) -> LanguageModel:
+        """
+        Content of the model in the order of the text format, <UNK> last
+            :return: words with their frequencies and log-probabilities
+        """
+        order = list(range(self.number_words))
+        unknown = self.index(UNKNOWN)
+        if unknown >= 0:
+            order.remove(unknown)
+            order.append(unknown)
+        return LanguageModel([self.word(index) for index in order], self.frecs[order], self.log_probs[order])
+
+    def close(self) -> None:
+        """
+        Release the mapping
+        """
+        self.offsets = self.log_probs = self.frecs = None
+        self.buffer.close()
+
+def parse_model_line(line: str) -> tuple:
+    """
+    Parse a line of the text format, the word can contain spaces and colons
+        :param line: line like 'Word:<word> Frec:<frec> LogProb:<log_prob>'
+        :return: word, frequency and log-probability
+    """
+    word, frec, log_prob = line.rstrip('\n').rsplit(' ', 2)
+    return word[len('Word:'):], int(frec[len('Frec:'):]), float(log_prob[len('LogProb:'):])
+
+def parse_model_lines(lines) -> LanguageModel:
+    """
+    Parse the word lines of the text format
+        :param lines: lines after the header
+        :return: words with their frequencies and log-probabilities
+    """
+    words = []
+    frecs = []
+    log_probs = []
+    for line in lines:
+        word, frec, log_prob = parse_model_line(line)
+        words.append(word)
+        frecs.append(frec)
+        log_probs.append(log_prob)
+    return LanguageModel(words, frecs, log_probs)
+
+def read_text_model(filename: str) -> tuple:
+    """
+    Read a model in the text format
+        :param filename: name of the file, .gz and .zst are decompressed
+        :return: number of documents and the model
+    """
+    with open_text(filename) as file:
+        number_documents = int(file.readline().split(' ')[1])
+        file.readline()
+        return number_documents, parse_model_lines(file)
+
+def write_text_model(filename: str, number_documents: int, model: LanguageModel) -> None:
+    """
+    Write a model in the text format, all the lines are formatted in one
+    pass and the file is replaced at once
+        :param filename: name of the file, .gz and .zst are compressed
+        :param number_documents: number of documents of the class
+        :param model: words with their frequencies and log-probabilities
+    """
+    # The words share few distinct frequencies and log-probabilities, every
+    # distinct value is formatted once
+    frecs, frec_index = numpy.unique(model.frecs, return_inverse=True)
+    log_probs, log_prob_index = numpy.unique(model.log_probs, return_inverse=True)
+    frecs = [f' Frec:{frec}' for frec in frecs.tolist()]
+    log_probs = [f' LogProb:{log_prob}' for log_prob in log_probs.tolist()]
+    lines = [f'Number_of_documents: {number_documents}', f'Number_of_words: {len(model)}']
+    lines.extend(f'Word:{word}{frecs[frec]}{log_probs[log_prob]}' for word, frec, log_prob in zip(model.words, frec_index.tolist(), log_prob_index.tolist()))
+    write_lines(filename, lines)
+
+def convert(input_filename: str, output_filename: str) -> None:
+    """
+    Convert a model between the text and the binary formats, the format is
+    chosen by the .bin extension
+        :param input_filename: model to read
+        :param output_filename: model to write
+    """
+    if input_filename.endswith('.bin'):
+        binary_model = BinaryModel(input_filename)
+        number_documents, model = binary_model.number_documents, binary_model.model()
+        binary_model.close()
+    else:
+        number_documents, model = read_text_model(input_filename)
+    if output_filename.endswith('.bin'):
+        write_binary_model(output_filename, number_documents, model)
+    else:
+        write_text_model(output_filename, number_documents, model)
+
+def main() -> None:
+    """
+    Main function
+    """
+    options, arguments = getopt.getopt(sys.argv[1:], 'i:o:', ['ifile=', 'ofile='])
+    options = dict(options)
+    input_filename = options.get('-i', options.get('--ifile'))
+    output_filename = options.get('-o', options.get('--ofile'))
+    if len(arguments) != 0 or not input_filename or not output_filename:
+        print('model_file.py -i <inputmodel> -o <outputmodel>')
+        sys.exit(2)
+    convert(input_filename, output_filename)
+
+if __name__ == '__main__':
+    main()
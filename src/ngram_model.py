@@ -0,0 +1,422 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+N-gram Model
+"""
+
+import os
+import numpy
+from vocabulary.index import VocabularyIndex
+from vocabulary.output import replace_file
+from vocabulary.profiler import PROFILER
+
+# An n-gram is packed in one integer key, ID_BITS bits for every id with
+# the last token in the lowest bits. A trigram takes 63 bits, so the keys
+# of every order fit in a signed 64 bit integer and sort like numbers
+ID_BITS = 21
+MAX_ORDER = 3
+
+# Discount of the orders without n-grams seen once or twice to estimate it
+DISCOUNT = 0.75
+
+# Type of the log-probabilities above the unigrams, the rounding of
+# float32 is far below the differences between the classes
+LEVEL_TYPE = numpy.float32
+
+# Multiplier of the Fibonacci hashing, 2^64 divided by the golden ratio
+HASH_MULTIPLIER = numpy.uint64(0x9E3779B97F4A7C15)
+EMPTY = -1
+
+def id_mask(order: int) -> int:
+    """
+    Mask of the last tokens of a key
+        :param order: number of tokens kept
+        :return: mask of their bits
+    """
+    return (1 << (ID_BITS * order)) - 1
+
+def ngram_keys(ids: numpy.ndarray, starts: numpy.ndarray, order: int, start_id: int) -> numpy.ndarray:
+    """
+    Key of the n-gram that ends in every token
+        :param ids: ids of the tokens of all the documents, one after another
+        :param starts: start of every document in ids, plus the end of the last one
+        :param order: number of tokens of the n-grams
+        :param start_id: id of the positions before the first token of a document
+        :return: array with the key of every token
+    """
+    ids = numpy.asarray(ids, dtype=numpy.int64)
+    positions = numpy.arange(len(ids)) - numpy.repeat(starts[:-1], numpy.diff(starts))
+    keys = ids.copy()
+    for distance in range(1, order):
+        previous = numpy.full(len(ids), start_id, dtype=numpy.int64)
+        inside = numpy.flatnonzero(positions >= distance)
+        previous[inside] = ids[inside - distance]
+        keys |= previous << (ID_BITS * distance)
+    return keys
+
+def lookup(sorted_keys: numpy.ndarray, keys: numpy.ndarray) -> tuple:
+    """
+    Find some keys in a sorted array with a binary search
+        :param sorted_keys: sorted distinct keys
+        :param keys: keys to look up
+        :return: position of every key and the mask of the ones that were found
+    """
+    if not len(sorted_keys):
+        return numpy.zeros(len(keys), dtype=numpy.int64), numpy.zeros(len(keys), dtype=bool)
+    positions = numpy.minimum(numpy.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return positions, sorted_keys[positions] == keys
+
+class KeyTable:
+    """
+    class KeyTable:
+    Hash table with open addressing of some sorted keys, it gives the
+    position of a key in a few random reads instead of the ones of a
+    binary search. Half of the slots are free, so a key is found on the
+    first or the second slot most of the times
+    """
+    bits = 1
+    slots = None
+    positions = None
+
+    def __init__(self, sorted_keys: numpy.ndarray):
+        """
+        Constructor
+            :param sorted_keys: sorted distinct keys, never negative
+        """
+        self.bits = max(1, (2 * len(sorted_keys) - 1).bit_length())
+        self.slots = numpy.full(1 << self.bits, EMPTY, dtype=numpy.int64)
+        self.positions = numpy.zeros(1 << self.bits, dtype=numpy.int32)
+        mask = (1 << self.bits) - 1
+        pending = numpy.arange(len(sorted_keys))
+        slots = self.hash(numpy.asarray(sorted_keys, dtype=numpy.int64))
+        while pending.size:
+            free = numpy.flatnonzero(self.slots[slots] == EMPTY)
+            # Only the last of the keys that want the same free slot takes it,
+            # the rest go on with the next slot like the ones that found it taken
+            self.positions[slots[free]] = pending[free]
+            placed = free[self.positions[slots[free]] == pending[free]]
+            self.slots[slots[placed]] = sorted_keys[pending[placed]]
+            left = numpy.ones(len(pending), dtype=bool)
+            left[placed] = False
+            pending = pending[left]
+            slots = (slots[left] + 1) & mask
+
+    def hash(self, keys: numpy.ndarray) -> numpy.ndarray:
+        """
+        First slot of some keys
+            :param keys: keys to hash
+            :return: slot of every key
+        """
+        return ((keys.view(numpy.uint64) * HASH_MULTIPLIER) >> numpy.uint64(64 - self.bits)).view(numpy.int64)
+
+    def find(self, keys: numpy.ndarray) -> tuple:
+        """
+        Find some keys
+            :param keys: keys to look up
+            :return: position of every key in the sorted keys and the mask of the ones that were found
+        """
+        mask = (1 << self.bits) - 1
+        slots = self.hash(keys)
+        stored = self.slots[slots]
+        found = stored == keys
+        positions = numpy.zeros(len(keys), dtype=numpy.int64)
+        hits = numpy.flatnonzero(found)
+        positions[hits] = self.positions[slots[hits]]
+        # Most keys end on their first slot, only the rest probe the next
+        # ones. A free slot ends the search of a key that is not stored
+        pending = numpy.flatnonzero(~found & (stored != EMPTY))
+        slots = slots[pending]
+        while pending.size:
+            slots = (slots + 1) & mask
+            stored = self.slots[slots]
+            hit = stored == keys[pending]
+            positions[pending[hit]] = self.positions[slots[hit]]
+            found[pending[hit]] = True
+            left = ~hit & (stored != EMPTY)
+            pending = pending[left]
+            slots = slots[left]
+        return positions, found
+
+class NgramCounts:
+    """
+    class NgramCounts:
+    Counts of the n-grams of one order of a class in sorted arrays, with
+    the number of tokens and of distinct tokens that follow every history
+    """
+    keys = None
+    counts = None
+    histories = None
+    totals = None
+    types = None
+    discount = DISCOUNT
+
+    def __init__(self, keys: numpy.ndarray):
+        """
+        Constructor
+            :param keys: key of every n-gram of the class, once for every time it appears
+        """
+        self.keys, self.counts = numpy.unique(keys, return_counts=True)
+        # The keys are sorted, so the n-grams of a history are together
+        self.histories, first, self.types = numpy.unique(self.keys >> ID_BITS, return_index=True, return_counts=True)
+        self.totals = numpy.add.reduceat(self.counts, first) if len(first) else numpy.zeros(0, dtype=numpy.int64)
+        # Estimate of Ney, Essen and Kneser from the n-grams seen once and twice
+        once = numpy.count_nonzero(self.counts == 1)
+        twice = numpy.count_nonzero(self.counts == 2)
+        self.discount = once / (once + 2 * twice) if once and twice else DISCOUNT
+
+    def probabilities(self, keys: numpy.ndarray, lower: numpy.ndarray) -> numpy.ndarray:
+        """
+        Interpolated absolute discounting. Every n-gram seen gives the
+        discount to the lower order, so a history that was followed by many
+        distinct tokens leaves more weight to it
+            :param keys: keys of the n-grams
+            :param lower: probability of every n-gram in the lower order
+            :return: probability of every n-gram
+        """
+        positions, found = lookup(self.keys, keys)
+        counts = numpy.zeros(len(keys), dtype=numpy.int64)
+        counts[found] = self.counts[positions[found]]
+        positions, seen = lookup(self.histories, keys >> ID_BITS)
+        result = lower.copy()
+        totals = self.totals[positions[seen]]
+        types = self.types[positions[seen]]
+        result[seen] = (numpy.maximum(counts[seen] - self.discount, 0) + self.discount * types * lower[seen]) / totals
+        return result
+
+    def backoffs(self) -> numpy.ndarray:
+        """
+        Weight of the lower order for every history
+            :return: log of the weight of every history
+        """
+        return numpy.log(self.discount * self.types / self.totals)
+
+class NgramModel:
+    """
+    class NgramModel:
+    Interpolated n-gram models of every class. Every order keeps the sorted
+    keys of the n-grams seen in any class with a matrix (classes, n-grams) of
+    log-probabilities, and the sorted histories with the log of the weight
+    left to the lower order. An n-gram that is not stored gets the weight of
+    its history plus its log-probability in the lower order, like a backoff.
+    The keys are looked up in hash tables built when the model is loaded
+    """
+    order = 1
+    classes = []
+    index = None
+    start_id = 0
+    priors = None
+    unigram = None
+    keys = []
+    log_probs = []
+    histories = []
+    backoffs = []
+    tables = []
+
+    def __init__(self, order: int, classes: list[str], tokens: list[str], priors: numpy.ndarray, unigram: numpy.ndarray):
+        """
+        Constructor
+            :param order: number of tokens of the longest n-grams
+            :param classes: class of every model
+            :param tokens: distinct tokens of the vocabulary
+            :param priors: log-probability of every class
+            :param unigram: array (classes, ids) with the log-probability of every id, <UNK> and the start of a document
+        """
+        if not 1 <= order <= MAX_ORDER:
+            raise Exception(f'The order of the n-grams must be between 1 and {MAX_ORDER}')
+        self.order = order
+        self.classes = list(classes)
+        self.index = VocabularyIndex(tokens)
+        if self.index.unknown + 2 > 1 << ID_BITS:
+            raise Exception(f'The n-gram models take at most {(1 << ID_BITS) - 2} tokens')
+        # <UNK> is the id after the last token and the start of a document the next one
+        self.start_id = self.index.unknown + 1
+        self.priors = numpy.asarray(priors, dtype=numpy.float64)
+        self.unigram = numpy.asarray(unigram, dtype=numpy.float64)
+        self.keys = []
+        self.log_probs = []
+        self.histories = []
+        self.backoffs = []
+        self.tables = []
+
+    @staticmethod
+    def train(order: int, classes: list[str], tokens: list[str], priors: numpy.ndarray, unigram: numpy.ndarray, ids: numpy.ndarray, starts: numpy.ndarray, groups: numpy.ndarray):
+        """
+        Count the n-grams of every class and interpolate them with the lower orders
+            :param order: number of tokens of the longest n-grams
+            :param classes: class of every model
+            :param tokens: distinct tokens of the vocabulary
+            :param priors: log-probability of every class
+            :param unigram: array (classes, ids) with the log-probability of every id, <UNK> and the start of a document
+            :param ids: ids of the tokens of all the documents in the vocabulary, one after another
+            :param starts: start of every document in ids, plus the end of the last one
+            :param groups: class of every document, -1 for the ones without class
+            :return: n-gram model
+        """
+        model = NgramModel(order, classes, tokens, priors, unigram)
+        token_groups = numpy.repeat(numpy.asarray(groups, dtype=numpy.int64), numpy.diff(starts))
+        counts = [[] for _ in classes]
+        for current in range(2, order + 1):
+            keys = ngram_keys(ids, starts, current, model.start_id)
+            for row in range(len(classes)):
+                counts[row].append(NgramCounts(keys[token_groups == row]))
+            model.keys.append(numpy.unique(numpy.concatenate([class_counts[-1].keys for class_counts in counts])))
+            model.histories.append(numpy.unique(numpy.concatenate([class_counts[-1].histories for class_counts in counts])))
+            log_probs = numpy.empty((len(classes), len(model.keys[-1])), dtype=LEVEL_TYPE)
+            backoffs = numpy.zeros((len(classes), len(model.histories[-1])), dtype=LEVEL_TYPE)
+            for row, class_counts in enumerate(counts):
+                log_probs[row] = numpy.log(model.interpolate(class_counts, row, model.keys[-1], current))
+                backoffs[row, numpy.searchsorted(model.histories[-1], class_counts[-1].histories)] = class_counts[-1].backoffs()
+            model.log_probs.append(log_probs)
+            model.backoffs.append(backoffs)
+        model.build_tables()
+        return model
+
+    def __getstate__(self) -> dict:
+        # The hash tables are bigger than the model, every process builds them again
+        state = self.__dict__.copy()
+        state['tables'] = []
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.build_tables()
+
+    def build_tables(self) -> None:
+        """
+        Build the hash tables of the n-grams and the histories of every order,
+        the files only keep the sorted keys
+        """
+        self.tables = [(KeyTable(keys), KeyTable(histories)) for keys, histories in zip(self.keys, self.histories)]
+
+    def interpolate(self, class_counts: list[NgramCounts], row: int, keys: numpy.ndarray, order: int) -> numpy.ndarray:
+        """
+        Probabilities of some n-grams in a class from its counts
+            :param class_counts: counts of every order of the class, from the bigrams
+            :param row: position of the class
+            :param keys: keys of the n-grams
+            :param order: number of tokens of the n-grams
+            :return: probability of every n-gram
+        """
+        if order == 1:
+            return numpy.exp(self.unigram[row, keys & id_mask(1)])
+        lower = self.interpolate(class_counts, row, keys & id_mask(order - 1), order - 1)
+        return class_counts[order - 2].probabilities(keys, lower)
+
+    def token_log_probs(self, keys: numpy.ndarray, order: int) -> numpy.ndarray:
+        """
+        Log-probability of the last token of some n-grams in every class
+            :param keys: keys of the n-grams
+            :param order: number of tokens of the n-grams
+            :return: array (classes, n-grams)
+        """
+        result = numpy.empty((len(self.priors), len(keys)), dtype=numpy.float64)
+        if order == 1:
+            ids = keys & id_mask(1)
+            for row, unigram in enumerate(self.unigram):
+                result[row] = unigram[ids]
+            return result
+        ngrams, histories = self.tables[order - 2]
+        positions, found = ngrams.find(keys)
+        hits = numpy.flatnonzero(found)
+        positions = positions[hits]
+        # Only the n-grams that are not stored go down to the lower order
+        missing = numpy.flatnonzero(~found)
+        missing_keys = keys[missing]
+        lower = self.token_log_probs(missing_keys & id_mask(order - 1), order - 1)
+        history_positions, seen = histories.find(missing_keys >> ID_BITS)
+        seen = numpy.flatnonzero(seen)
+        history_positions = history_positions[seen]
+        # Row by row every gather reads one contiguous array
+        for row in range(len(self.priors)):
+            result[row, hits] = self.log_probs[order - 2][row, positions]
+            lower[row, seen] += self.backoffs[order - 2][row, history_positions]
+            result[row, missing] = lower[row]
+        return result
+
+    def score(self, documents: list[list[str]]) -> numpy.ndarray:
+        """
+        Score the documents with every model
+            :param documents: list of tokenized documents
+            :return: array (documents, models) with the log-probabilities
+        """
+        lengths = numpy.fromiter((len(tokens) for tokens in documents), dtype=numpy.int64, count=len(documents))
+        with PROFILER.stage('score', int(lengths.sum())) as record:
+            starts = numpy.zeros(len(documents) + 1, dtype=numpy.int64)
+            numpy.cumsum(lengths, out=starts[1:])
+            ids = numpy.array(self.index.encode([token for tokens in documents for token in tokens]), dtype=numpy.int64)
+            token_scores = self.token_log_probs(ngram_keys(ids, starts, self.order, self.start_id), self.order)
+            document_index = numpy.repeat(numpy.arange(len(documents)), lengths)
+            result = numpy.empty((len(documents), len(self.priors)), dtype=numpy.float64)
+            for row, prior in enumerate(self.priors):
+                result[:, row] = prior + numpy.bincount(document_index, weights=token_scores[row], minlength=len(documents))
+            record['documents'] = len(documents)
+        return result
+
+    def select(self, classes: list[str]):
+        """
+        Keep the models of some classes, in their order
+            :param classes: classes to keep, the case does not matter
+            :return: the model itself
+        """
+        names = [class_doc.lower() for class_doc in self.classes]
+        missing = [class_doc for class_doc in classes if class_doc.lower() not in names]
+        if missing:
+            raise Exception(f'No n-gram model of the classes {", ".join(missing)} found')
+        rows = [names.index(class_doc.lower()) for class_doc in classes]
+        self.classes = [self.classes[row] for row in rows]
+        self.priors = self.priors[rows]
+        self.unigram = self.unigram[rows]
+        self.log_probs = [log_probs[rows] for log_probs in self.log_probs]
+        self.backoffs = [backoffs[rows] for backoffs in self.backoffs]
+        return self
+
+    def save(self, filename: str) -> None:
+        """
+        Write the model in a npz file
+            :param filename: name of the file
+        """
+        encoded = [token.encode('utf-8') for token in self.index.tokens]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(token) for token in encoded], out=offsets[1:])
+        arrays = {}
+        for current in range(2, self.order + 1):
+            arrays[f'keys_{current}'] = self.keys[current - 2]
+            arrays[f'log_probs_{current}'] = self.log_probs[current - 2]
+            arrays[f'histories_{current}'] = self.histories[current - 2]
+            arrays[f'backoffs_{current}'] = self.backoffs[current - 2]
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with replace_file(filename) as file:
+            numpy.savez(
+                file,
+                order=numpy.array(self.order),
+                classes=numpy.array(self.classes, dtype=str),
+                strings=numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8),
+                offsets=offsets,
+                priors=self.priors,
+                unigram=self.unigram,
+                **arrays,
+            )
+
+    @staticmethod
+    def load(filename: str):
+        """
+        Read a model written by save
+            :param filename: name of the file
+            :return: n-gram model
+        """
+        if not os.path.isfile(filename):
+            raise Exception(f'No n-gram model file {filename} found, train the models with -n first')
+        with numpy.load(filename) as data:
+            strings = data['strings'].tobytes()
+            offsets = data['offsets'].tolist()
+            tokens = [strings[offsets[index]:offsets[index + 1]].decode('utf-8') for index in range(len(offsets) - 1)]
+            model = NgramModel(int(data['order']), data['classes'].tolist(), tokens, data['priors'], data['unigram'])
+            for current in range(2, model.order + 1):
+                model.keys.append(data[f'keys_{current}'])
+                model.log_probs.append(data[f'log_probs_{current}'])
+                model.histories.append(data[f'histories_{current}'])
+                model.backoffs.append(data[f'backoffs_{current}'])
+        model.build_tables()
+        return model
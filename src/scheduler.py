@@ -0,0 +1,152 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Batch Scheduler
+"""
+
+import asyncio
+import time
+from collections import deque
+
+MAX_BATCH_SIZE = 64
+MAX_WAIT = 0.005
+WINDOW = 10000
+MAX_IN_FLIGHT = 2
+
+class BatchScheduler:
+    """
+    class BatchScheduler:
+    Groups the texts of concurrent requests in batches of at most
+    max_batch_size texts. A batch is dispatched when it is full, when the
+    oldest request waited max_wait seconds, or right away if the previous
+    batch had a single request, so a lone client never waits. At most
+    max_in_flight batches are scored at the same time, the next batch is
+    collected while the previous ones are scored.
+    """
+    max_batch_size = MAX_BATCH_SIZE
+    max_wait = MAX_WAIT
+    max_in_flight = MAX_IN_FLIGHT
+
+    def __init__(self, function, max_batch_size: int = MAX_BATCH_SIZE, max_wait: float = MAX_WAIT, window: int = WINDOW, max_in_flight: int = MAX_IN_FLIGHT):
+        """
+        Constructor
+            :param function: scores a list of texts and returns one result per text
+            :param max_batch_size: maximum number of texts of a batch
+            :param max_wait: maximum seconds a request waits for other requests
+            :param window: number of recent requests used for the latency percentiles
+            :param max_in_flight: maximum number of batches scored at the same time
+        """
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.tasks = set()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.failed_requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.last_batch_requests = 0
+        self.latencies = deque(maxlen=window)
+
+    async def submit(self, texts: list[str]) -> list:
+        """
+        Queue the texts of a request and wait for their results
+            :param texts: texts of the request
+            :return: one result per text
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue_depth += len(texts)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self.queue.put_nowait((texts, future, time.perf_counter()))
+        return await future
+
+    async def run(self) -> None:
+        """
+        Dispatch the batches until it is cancelled, the function runs in a
+        thread so new requests keep arriving while a batch is scored. A batch
+        is only collected when there is a free slot, the requests that arrive
+        while every slot is busy go together in the next batch
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                elif self.last_batch_requests > 1 and loop.time() < deadline:
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    break
+                size += len(batch[-1][0])
+            self.queue_depth -= size
+            self.last_batch_requests = len(batch)
+            self.batches += 1
+            self.batched_texts += size
+            task = asyncio.create_task(self.dispatch(loop, batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def dispatch(self, loop: asyncio.AbstractEventLoop, batch: list) -> None:
+        """
+        Score a batch and hand every request its own results, the requests
+        and their latencies are counted even if the function fails
+            :param loop: running event loop
+            :param batch: list of (texts, future, arrival time)
+        """
+        texts = [text for request_texts, _, _ in batch for text in request_texts]
+        try:
+            results = await loop.run_in_executor(None, self.function, texts)
+            start = 0
+            for request_texts, future, _ in batch:
+                if not future.done():
+                    future.set_result(results[start:start + len(request_texts)])
+                start += len(request_texts)
+        except Exception as error:
+            self.failed_requests += len(batch)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            now = time.perf_counter()
+            for _, future, arrival in batch:
+                # Cancelled while scoring, the client must not wait forever
+                if not future.done():
+                    future.cancel()
+                self.requests += 1
+                self.latencies.append(now - arrival)
+            self.slots.release()
+
+    def metrics(self) -> dict:
+        """
+        Counters of the scheduler
+            :return: dictionary with the knobs, queue depth, batch sizes and latencies
+        """
+        latencies = sorted(self.latencies)
+        percentile = lambda value: latencies[min(len(latencies) - 1, int(value * len(latencies)))] * 1000 if latencies else 0.0
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'max_in_flight': self.max_in_flight,
+            'in_flight': len(self.tasks),
+            'requests': self.requests,
+            'failed_requests': self.failed_requests,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_texts / self.batches if self.batches else 0.0,
+            'mean_requests_per_batch': self.requests / self.batches if self.batches else 0.0,
+            'latency_p50_ms': percentile(0.5),
+            'latency_p99_ms': percentile(0.99),
+        }
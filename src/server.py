@@ -0,0 +1,260 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Classification Server
+"""
+
+import asyncio
+import getopt
+import json
+import os
+import sys
+import threading
+
+from vocabulary.cache import CACHE_NAME, load_caches
+from vocabulary.output import MODEL_FOLDER, find_output
+from vocabulary.tokenized import tokenize_texts
+from batch_classifier import BatchClassifier
+from scheduler import MAX_BATCH_SIZE, MAX_WAIT, BatchScheduler
+from clasificator import CLASSES, search_parameters_json, search_language_model, process_language_models, open_binary_models, model_vocabulary, best_class
+
+PARAMETERS_FILE = 'parameters.json'
+TEXT_MODEL_FILES = [f'language_model_{class_doc}.txt' for class_doc in CLASSES]
+BINARY_MODEL_FILES = [f'language_model_{class_doc}.bin' for class_doc in CLASSES]
+RELOAD_INTERVAL = 1.0
+
+class Classifier:
+    """
+    class Classifier:
+    Keeps the vocabulary pipeline and the language models loaded, they are
+    loaded again when the files in the model folder change. They are loaded in a thread,
+    the lock keeps a batch from getting the parameters of one load and the
+    models of another. The token caches are shared, so two batches are
+    never tokenized at the same time, but one can be scored meanwhile
+    """
+    binary = False
+    folder = MODEL_FOLDER
+    vocabulary = None
+    batch_classifier = None
+    versions = {}
+    reloads = 0
+    lock = None
+    tokenize_lock = None
+
+    def __init__(self, binary: bool = False, folder: str = MODEL_FOLDER):
+        """
+        Constructor
+            :param binary: use the binary language models
+            :param folder: folder of the parameters, the models and their caches
+        """
+        self.binary = binary
+        self.folder = folder
+        self.versions = {}
+        self.reloads = 0
+        self.lock = threading.Lock()
+        self.tokenize_lock = threading.Lock()
+        load_caches(os.path.join(folder, CACHE_NAME))
+        self.load()
+
+    def files(self) -> list[str]:
+        """
+        Files the classifier depends on, the text models can be compressed
+            :return: list of paths
+        """
+        path = lambda name: os.path.join(self.folder, name)
+        if self.binary:
+            return [path(PARAMETERS_FILE)] + [path(name) for name in BINARY_MODEL_FILES]
+        return [path(PARAMETERS_FILE)] + [find_output(path(name)) or path(name) for name in TEXT_MODEL_FILES]
+
+    def current_versions(self) -> dict:
+        """
+        Modification time of every file
+            :return: dictionary path -> modification time, None if it is missing
+        """
+        return {filename: os.stat(filename).st_mtime_ns if os.path.isfile(filename) else None for filename in self.files()}
+
+    def load(self) -> None:
+        """
+        Load the parameters and the language models
+        """
+        versions = self.current_versions()
+        vocabulary = model_vocabulary(search_parameters_json(self.folder), self.folder)
+        vocabulary.compile()
+        models = open_binary_models(self.folder) if self.binary else process_language_models(search_language_model(self.folder))
+        batch_classifier = BatchClassifier(models)
+        with self.lock:
+            self.vocabulary = vocabulary
+            self.batch_classifier = batch_classifier
+            self.versions = versions
+            self.reloads += 1
+
+    def reload_if_changed(self) -> bool:
+        """
+        Load the files again if any of them changed, a file that can not be
+        loaded keeps the previous models until the next check
+            :return: True if the models were reloaded
+        """
+        if self.current_versions() == self.versions:
+            return False
+        try:
+            self.load()
+        except Exception as error:
+            print(f'Reload failed, keeping the previous models: {error}', file=sys.stderr)
+            return False
+        return True
+
+    def classify(self, texts: list[str]) -> list[dict]:
+        """
+        Classify a batch of texts
+            :param texts: texts of the documents
+            :return: list with the class and the log-probability of every class
+        """
+        with self.lock:
+            vocabulary, batch_classifier = self.vocabulary, self.batch_classifier
+        with self.tokenize_lock:
+            documents = tokenize_texts(vocabulary, texts)
+        return [
+            {'class': best_class(probabilities), 'log_probabilities': dict(zip(CLASSES, probabilities))}
+            for probabilities in batch_classifier.score(documents).tolist()
+        ]
+
+async def handle_request(scheduler: BatchScheduler, line: bytes) -> dict:
+    """
+    Answer one request
+        :param scheduler: scheduler in front of the classifier
+        :param line: json object with a 'text', a list of 'texts' or 'metrics'
+        :return: json object with the results or the error, also when the
+        batch of the request failed
+    """
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            return {'error': 'The request must be a json object'}
+        if request.get('metrics'):
+            return {'metrics': scheduler.metrics()}
+        if 'texts' in request:
+            texts = request['texts']
+        elif 'text' in request:
+            texts = [request['text']]
+        else:
+            return {'error': "The request needs a 'text' or a list of 'texts'"}
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            return {'error': 'Every text must be a string'}
+        if not texts:
+            return {'results': []}
+        results = await scheduler.submit(texts)
+        return {'results': results} if 'texts' in request else {'result': results[0]}
+    except Exception as error:
+        return {'error': str(error)}
+
+async def serve_client(scheduler: BatchScheduler, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Answer the requests of a connection, one json object per line
+        :param scheduler: scheduler in front of the classifier
+        :param reader: stream of the requests
+        :param writer: stream of the responses
+    """
+    try:
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            response = await handle_request(scheduler, line)
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            await writer.drain()
+    finally:
+        writer.close()
+
+async def watch_models(classifier: Classifier, interval: float) -> None:
+    """
+    Check the files of the models periodically, they are parsed in a
+    thread so the requests are still answered meanwhile
+        :param classifier: loaded classifier
+        :param interval: seconds between checks
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        if await loop.run_in_executor(None, classifier.reload_if_changed):
+            print('Models reloaded.')
+
+async def run_server(classifier: Classifier, host: str, port: int, socket_path: str = '', interval: float = RELOAD_INTERVAL, max_batch_size: int = MAX_BATCH_SIZE, max_wait: float = MAX_WAIT) -> None:
+    """
+    Run the server until it is cancelled
+        :param classifier: loaded classifier
+        :param host: address to listen on
+        :param port: port to listen on
+        :param socket_path: unix socket to listen on instead of the port
+        :param interval: seconds between checks of the model files
+        :param max_batch_size: maximum number of texts scored together
+        :param max_wait: maximum seconds a request waits to be batched
+    """
+    scheduler = BatchScheduler(classifier.classify, max_batch_size, max_wait)
+    handler = lambda reader, writer: serve_client(scheduler, reader, writer)
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    watcher = asyncio.create_task(watch_models(classifier, interval))
+    dispatcher = asyncio.create_task(scheduler.run())
+    print(f'Listening on {socket_path or f"{host}:{port}"}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+        dispatcher.cancel()
+
+def parse_arguments(argument_list: list[str]) -> tuple:
+    """
+    Parse the arguments
+        :param argv: list of arguments
+        :return: host, port, unix socket, model folder, binary models option, maximum batch size and wait
+    """
+    host = '127.0.0.1'
+    port = 8000
+    socket_path = ''
+    folder = MODEL_FOLDER
+    binary = False
+    max_batch_size = MAX_BATCH_SIZE
+    max_wait = MAX_WAIT
+    options, arguments = getopt.getopt(argument_list, 'h:p:s:d:bm:t:', ['host=', 'port=', 'socket=', 'models=', 'binary', 'batch=', 'wait='])
+    if len(arguments) != 0:
+        print('server.py [-h <host>] [-p <port>] [-s <unixsocket>] [-d <modelfolder>] [-b] [-m <maxbatch>] [-t <maxwaitms>]')
+        sys.exit(2)
+    for option, argument in options:
+        if option in ('-h', '--host'):
+            host = argument
+        elif option in ('-p', '--port'):
+            port = int(argument)
+        elif option in ('-s', '--socket'):
+            socket_path = argument
+        elif option in ('-d', '--models'):
+            folder = argument
+        elif option in ('-b', '--binary'):
+            binary = True
+        elif option in ('-m', '--batch'):
+            max_batch_size = int(argument)
+        elif option in ('-t', '--wait'):
+            max_wait = float(argument) / 1000
+    return host, port, socket_path, folder, binary, max_batch_size, max_wait
+
+def main() -> None:
+    """
+    Main function
+        - Parse the arguments
+        - Load the parameters and the language models
+        - Answer requests until it is interrupted
+    """
+    host, port, socket_path, folder, binary, max_batch_size, max_wait = parse_arguments(sys.argv[1:])
+    classifier = Classifier(binary, folder)
+    try:
+        asyncio.run(run_server(classifier, host, port, socket_path, RELOAD_INTERVAL, max_batch_size, max_wait))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
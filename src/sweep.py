@@ -0,0 +1,336 @@
+#!/usr/bin/python
+
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Parameter Sweep
+"""
+
+import getopt
+import itertools
+import json
+import math
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+from alive_progress import alive_bar
+from vocabulary import CACHE_NAME, MODEL_FOLDER, PARAMETERS, STAGES, Pipeline, Profile, Vocabulary, VocabularyIndex, load_caches, read_frame, save_caches, stage_error
+from language_model import token_probabilities
+from batch_classifier import BatchClassifier
+
+CLASSES = ('Positive', 'Negative')
+
+class State:
+    """
+    class State:
+    Output of a prefix of the stages. It keeps what the vocabulary, the
+    training and the evaluation need instead of the tokens of every document
+    """
+    words = set()
+    vocabulary = []
+    counts = {}
+    mapping = {}
+
+    def __init__(self, words: set, vocabulary: list, counts: dict, mapping: dict):
+        """
+        Constructor
+            :param words: distinct tokens of the vocabulary in the set mode
+            :param vocabulary: tokens of the vocabulary file, with the repeated ones
+            :param counts: counts of the training tokens of every class
+            :param mapping: tokens that every raw token of the test corpus becomes
+        """
+        self.words = words
+        self.vocabulary = vocabulary
+        self.counts = counts
+        self.mapping = mapping
+
+    def apply(self, stage, repeat: bool):
+        """
+        Run a stage over the output of this prefix, every distinct token
+        goes through the stage once
+            :param stage: function token -> tuple of tokens
+            :param repeat: the set mode applies the stage twice
+            :return: state of the longer prefix
+        """
+        images = {}
+        def image(token: str) -> tuple:
+            result = images.get(token)
+            if result is None:
+                result = images[token] = stage(token)
+            return result
+        seen = {new for token in self.words for new in image(token)}
+        # Like Pipeline._run_set, a repeated stage can give the same token
+        # twice and the vocabulary file keeps both
+        vocabulary = [other for new in seen for other in image(new)] if repeat else list(seen)
+        counts = {}
+        for class_doc, class_counts in self.counts.items():
+            counts[class_doc] = new_counts = Counter()
+            for token, frequency in class_counts.items():
+                for new in image(token):
+                    new_counts[new] += frequency
+        mapping = {raw: tuple(new for token in tokens for new in image(token)) for raw, tokens in self.mapping.items()}
+        return State(set(vocabulary), vocabulary, counts, mapping)
+
+def parse_arguments(argument_list: list[str]) -> tuple:
+    """
+    Parse the arguments
+        :param argv: list of arguments
+        :return: training file, test file, fixed options, workers, output file and number of results shown
+    """
+    train_filename = 'data/COV_train.xlsx'
+    test_filename = 'data/test/COV_test_2.xlsx'
+    fixed = {}
+    workers = 1
+    output_filename = ''
+    top = 10
+    usage = 'sweep.py [-i <trainfile>] [-t <labeledtestfile>] [-x <parameter>=<option>] [-w <workers>] [-o <resultsfile>] [-n <top>]'
+    options, arguments = getopt.getopt(argument_list, 'i:t:x:w:o:n:', ['ifile=', 'tfile=', 'set=', 'workers=', 'ofile=', 'top='])
+    if len(arguments) != 0:
+        print(usage)
+        sys.exit(2)
+    for option, argument in options:
+        if option in ('-i', '--ifile'):
+            train_filename = argument
+        elif option in ('-t', '--tfile'):
+            test_filename = argument
+        elif option in ('-x', '--set'):
+            name, _, value = argument.partition('=')
+            if name not in PARAMETERS or value not in PARAMETERS[name][1]:
+                print(f'Unknown parameter option {argument}')
+                print(usage)
+                sys.exit(2)
+            fixed[name] = value
+        elif option in ('-w', '--workers'):
+            workers = int(argument)
+        elif option in ('-o', '--ofile'):
+            output_filename = argument
+        elif option in ('-n', '--top'):
+            top = int(argument)
+    return train_filename, test_filename, fixed, workers, output_filename, top
+
+def choices(fixed: dict) -> list[list[str]]:
+    """
+    Options swept for every stage
+        :param fixed: parameters with a fixed option
+        :return: list with the options of every stage, in the order of STAGES
+    """
+    return [[fixed[name]] if name in fixed else list(PARAMETERS[name][1]) for name in STAGES]
+
+def test_corpus(test_texts: list, test_classes: list) -> tuple:
+    """
+    Raw tokens of the test corpus as positions in the table of distinct raw
+    tokens, every leaf only has to score that table
+        :param test_texts: texts of the test corpus
+        :param test_classes: classes of the test corpus
+        :return: distinct raw tokens, their positions, document of every position and classes of the documents
+    """
+    positions = {}
+    ids = []
+    document_index = []
+    classes = []
+    for text, class_doc in zip(test_texts, test_classes):
+        if not isinstance(text, str):
+            continue
+        for raw in text.split():
+            ids.append(positions.setdefault(raw, len(positions)))
+            document_index.append(len(classes))
+        classes.append(str(class_doc).lower())
+    return list(positions), numpy.array(ids, dtype=numpy.int64), numpy.array(document_index, dtype=numpy.int64), numpy.array(classes)
+
+def root_state(train_texts: list, train_classes: list, raw_tokens: list) -> tuple:
+    """
+    State before any stage
+        :param train_texts: texts of the training corpus
+        :param train_classes: classes of the training corpus
+        :param raw_tokens: distinct raw tokens of the test corpus
+        :return: state and number of documents of every class
+    """
+    counts = {class_doc: Counter() for class_doc in CLASSES}
+    documents = dict.fromkeys(CLASSES, 0)
+    words = set()
+    for text, class_doc in zip(train_texts, train_classes):
+        tokens = text.split() if isinstance(text, str) else []
+        # The vocabulary is built from every document, like vocabulary.py
+        words.update(tokens)
+        if class_doc in counts:
+            documents[class_doc] += 1
+            counts[class_doc].update(tokens)
+    return State(words, list(words), counts, {raw: (raw,) for raw in raw_tokens}), documents
+
+def evaluate(state: State, documents: dict, test: tuple) -> dict:
+    """
+    Train the language models of a leaf and classify the test corpus
+        :param state: state after all the stages
+        :param documents: number of training documents of every class
+        :param test: test corpus returned by test_corpus
+        :return: size of the vocabulary and accuracy
+    """
+    index = VocabularyIndex(sorted(state.vocabulary))
+    total_documents = sum(documents.values())
+    language_models = []
+    for class_doc in CLASSES:
+        *_, model = token_probabilities(index, index.count(state.counts[class_doc]))
+        language_models.append({'probability': math.log(documents[class_doc] / total_documents), 'words': model})
+    raw_tokens, ids, document_index, classes = test
+    if not len(classes):
+        return {'vocabulary_size': index.size, 'accuracy': 0.0}
+    # Every distinct raw token is scored once, then the documents add the
+    # scores of their raw tokens
+    batch_classifier = BatchClassifier(language_models)
+    outputs = [state.mapping[raw] for raw in raw_tokens]
+    owner = numpy.repeat(numpy.arange(len(outputs)), [len(tokens) for tokens in outputs])
+    encoded = batch_classifier.encode([token for tokens in outputs for token in tokens])
+    scores = []
+    for row, prior in enumerate(batch_classifier.priors):
+        raw_scores = numpy.bincount(owner, weights=batch_classifier.log_probs[row, encoded], minlength=len(outputs))
+        scores.append(prior + numpy.bincount(document_index, weights=raw_scores[ids], minlength=len(classes)))
+    predicted = numpy.where(scores[0] > scores[1], 'positive', 'negative')
+    return {'vocabulary_size': index.size, 'accuracy': float(numpy.mean(predicted == classes))}
+
+WORKER = {}
+
+def init_worker(train_texts: list, train_classes: list, test_texts: list, test_classes: list) -> None:
+    """
+    Load the corpora and the caches once in every worker process
+        :param train_texts: texts of the training corpus
+        :param train_classes: classes of the training corpus
+        :param test_texts: texts of the test corpus
+        :param test_classes: classes of the test corpus
+    """
+    load_caches(os.path.join(MODEL_FOLDER, CACHE_NAME))
+    WORKER['vocabulary'] = Vocabulary('')
+    WORKER['test'] = test_corpus(test_texts, test_classes)
+    WORKER['root'], WORKER['documents'] = root_state(train_texts, train_classes, WORKER['test'][0])
+
+def sweep(vocabulary: Vocabulary, state: State, options: list, stages: list[list[str]], documents: dict, test: tuple, counter: Counter):
+    """
+    Walk the tree of the combinations depth first, the output of every
+    prefix is computed once and shared by all the combinations under it
+        :param vocabulary: vocabulary with the caches of the stages
+        :param state: state of the current prefix
+        :param options: options of the current prefix
+        :param stages: options of the remaining stages
+        :param documents: number of training documents of every class
+        :param test: test corpus returned by test_corpus
+        :param counter: number of stages run, it is updated
+        :return: generator of results, one per combination
+    """
+    depth = len(options)
+    if depth == len(STAGES):
+        parameters = Profile(dict(zip(STAGES, options)))
+        yield dict(evaluate(state, documents, test), parameters=parameters.to_dict())
+        return
+    name = STAGES[depth]
+    for option in stages[0]:
+        if name == 'lemmatization' and option == 'y' and options[STAGES.index('stemming')] == 'y':
+            continue
+        stage = Pipeline.stage(vocabulary, name, option)
+        if stage is None:
+            child = state
+        else:
+            try:
+                child = state.apply(stage, Pipeline.repeats(name))
+            except Exception as error:
+                print(f'{name}={option} failed, its combinations are skipped: {stage_error(error)}')
+                counter['failed'] += 1
+                continue
+            counter['stages'] += 1
+        yield from sweep(vocabulary, child, options + [option], stages[1:], documents, test, counter)
+
+def sweep_prefix(prefix: list[str], stages: list[list[str]]) -> tuple:
+    """
+    Sweep the combinations that start with a prefix in a worker process
+        :param prefix: options of the first stages
+        :param stages: options of the stages after the prefix
+        :return: results and number of stages run
+    """
+    counter = Counter()
+    state = WORKER['root']
+    vocabulary = WORKER['vocabulary']
+    if len(prefix) > STAGES.index('lemmatization') and prefix[STAGES.index('stemming')] == prefix[STAGES.index('lemmatization')] == 'y':
+        return [], 0
+    for name, option in zip(STAGES, prefix):
+        stage = Pipeline.stage(vocabulary, name, option)
+        if stage is not None:
+            try:
+                state = state.apply(stage, Pipeline.repeats(name))
+            except Exception as error:
+                print(f'{name}={option} failed, its combinations are skipped: {stage_error(error)}')
+                return [], counter['stages']
+            counter['stages'] += 1
+    results = list(sweep(vocabulary, state, list(prefix), stages, WORKER['documents'], WORKER['test'], counter))
+    return results, counter['stages']
+
+def count_leaves(stages: list[list[str]]) -> tuple:
+    """
+    Count the combinations and the stages a run per combination would need
+        :param stages: options of every stage
+        :return: number of combinations and number of enabled stages in all of them
+    """
+    leaves = 0
+    enabled = 0
+    for options in itertools.product(*stages):
+        parameters = dict(zip(STAGES, options))
+        if parameters['stemming'] == 'y' and parameters['lemmatization'] == 'y':
+            continue
+        leaves += 1
+        enabled += sum(option != 'n' for option in options)
+    return leaves, enabled
+
+def main() -> None:
+    """
+    Main function
+    - Read the training and the labeled test corpus
+    - Walk the tree of the combinations, training and evaluating a model per leaf
+    - Show the best combinations and write the results
+    """
+    train_filename, test_filename, fixed, workers, output_filename, top = parse_arguments(sys.argv[1:])
+    train = read_frame(train_filename)
+    test = read_frame(test_filename)
+    train_texts, train_classes = train.iloc[:, 0].tolist(), train.iloc[:, 1].tolist()
+    test_texts, test_classes = test.iloc[:, 0].tolist(), test.iloc[:, 1].tolist()
+    stages = choices(fixed)
+    leaves, naive = count_leaves(stages)
+    results = []
+    computed = 0
+    with alive_bar(leaves) as bar:
+        if workers > 1:
+            # The first stages with more than one option are split between
+            # the workers, every worker computes the prefix of its subtrees
+            split = 0
+            while split < len(stages) and math.prod(len(options) for options in stages[:split]) < workers * 4:
+                split += 1
+            prefixes = [list(prefix) for prefix in itertools.product(*stages[:split])]
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(train_texts, train_classes, test_texts, test_classes)) as executor:
+                for prefix_results, prefix_stages in executor.map(sweep_prefix, prefixes, [stages[split:]] * len(prefixes)):
+                    results.extend(prefix_results)
+                    computed += prefix_stages
+                    for _ in prefix_results:
+                        bar()
+        else:
+            load_caches(os.path.join(MODEL_FOLDER, CACHE_NAME))
+            vocabulary = Vocabulary('')
+            test = test_corpus(test_texts, test_classes)
+            state, documents = root_state(train_texts, train_classes, test[0])
+            counter = Counter()
+            for result in sweep(vocabulary, state, [], stages, documents, test, counter):
+                results.append(result)
+                bar()
+            computed = counter['stages']
+            save_caches(os.path.join(MODEL_FOLDER, CACHE_NAME))
+    print(f'{len(results)} combinations, {computed} stages run instead of {naive}')
+    results.sort(key=lambda result: result['accuracy'], reverse=True)
+    print(f'{"parameters":<12}{"vocabulary":>12}{"accuracy":>10}')
+    for result in results[:top]:
+        key = ''.join(result['parameters'][name] for name in STAGES)
+        print(f'{key:<12}{result["vocabulary_size"]:>12}{result["accuracy"]:>10.2%}')
+    if output_filename:
+        with open(output_filename, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+
+if __name__ == '__main__':
+    main()
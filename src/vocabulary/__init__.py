@@ -6,4 +6,15 @@ Daniel Hernández de León - alu0101331720
 Vocabulary
 """
 from .constants import *
+from .tables import *
+from .pipeline import *
+from .cache import *
+from .profiler import *
+from .preprocessing import *
+from .corpus import *
+from .output import *
+from .counting import *
+from .tokenized import *
+from .index import *
+from .spell import *
 from .vocabulary import *
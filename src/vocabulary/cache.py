@@ -0,0 +1,156 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Token Cache
+"""
+
+import json
+import os
+from collections import OrderedDict
+if __package__:
+    from .output import write_text
+else:
+    from output import write_text
+
+MAX_SIZE = 100000
+# Name of the file of the caches, next to the parameters and the models
+CACHE_NAME = 'token_cache.json'
+# Most recent tokens of every stage that save_caches writes, parsing the
+# file costs about a microsecond a token at every start
+SAVE_SIZE = 20000
+
+class TokenCache:
+    """
+    class TokenCache:
+    LRU memoization of a function of one token with hit/miss counters
+    """
+    function = None
+    max_size = MAX_SIZE
+    hits = 0
+    misses = 0
+
+    def __init__(self, function, max_size: int = MAX_SIZE):
+        """
+        Constructor
+            :param function: function to memoize
+            :param max_size: maximum number of tokens to keep
+        """
+        self.function = function
+        self.max_size = max_size
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, token: str):
+        """
+        Return the cached value of the token, computing it on a miss
+            :param token: token to look up
+            :return: value of the function for the token
+        """
+        values = self.values
+        if token in values:
+            self.hits += 1
+            values.move_to_end(token)
+            return values[token]
+        self.misses += 1
+        value = self.function(token)
+        values[token] = value
+        if len(values) > self.max_size:
+            values.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def seed(self, values: dict) -> None:
+        """
+        Add precomputed values to the cache
+            :param values: dictionary token -> value
+        """
+        for token, value in values.items():
+            self.values[token] = tuple(value) if isinstance(value, list) else value
+        while len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Statistics of the cache
+            :return: dictionary with size, hits, misses and hit rate
+        """
+        total = self.hits + self.misses
+        return {
+            'size': len(self.values),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+CACHES = {}
+SEEDS = {}
+# Files given to load_caches that are not parsed yet
+PENDING = []
+
+def get_cache(name: str, factory, max_size: int = MAX_SIZE) -> TokenCache:
+    """
+    Get the shared cache of a stage, creating it the first time
+        :param name: name of the stage
+        :param factory: builds the function to memoize, only called once
+        :param max_size: maximum number of tokens to keep
+        :return: shared cache of the stage
+    """
+    if name not in CACHES:
+        parse_pending()
+        CACHES[name] = TokenCache(factory(), max_size)
+        if name in SEEDS:
+            CACHES[name].seed(SEEDS.pop(name))
+    return CACHES[name]
+
+def load_caches(filename: str, lazy: bool = True) -> bool:
+    """
+    Seed the caches from a json file written by save_caches. The file is
+    only parsed when the first cache is built, a run that does not
+    tokenize anything does not read it
+        :param filename: name of the file
+        :param lazy: wait for the first cache to parse the file
+        :return: True if the file was found
+    """
+    if not os.path.isfile(filename):
+        return False
+    PENDING.append(filename)
+    if not lazy:
+        parse_pending()
+    return True
+
+def parse_pending() -> None:
+    """
+    Parse the files given to load_caches and seed the caches with them
+    """
+    while PENDING:
+        with open(PENDING.pop(0), 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        for name, values in data.items():
+            if name in CACHES:
+                CACHES[name].seed(values)
+            else:
+                SEEDS[name] = values
+
+def save_caches(filename: str) -> None:
+    """
+    Write the most recent tokens of every cache in a json file. Nothing is
+    written if no cache was built, the file would not change
+        :param filename: name of the file
+    """
+    if not CACHES:
+        return
+    data = {name: dict(list(values.items())[-SAVE_SIZE:]) for name, values in SEEDS.items()}
+    data.update({name: dict(list(cache.values.items())[-SAVE_SIZE:]) for name, cache in CACHES.items()})
+    write_text(filename, json.dumps(data, ensure_ascii=False))
+
+def cache_stats() -> dict:
+    """
+    Statistics of every cache
+        :return: dictionary stage -> statistics
+    """
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -0,0 +1,287 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Corpus Reader
+"""
+
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from importlib.util import find_spec
+if __package__:
+    from .output import replace_file
+else:
+    from output import replace_file
+
+CHUNK_SIZE = 10000
+# Folder next to the data with the columnar copies of the excel files. The
+# chunks are parquet files when pyarrow is installed and pickled frames if
+# not, or if a column mixes types that parquet can not keep. Reading a
+# pickle runs the code in it, so the folder must only be writable by the
+# ones that run the scripts. It can be removed at any time to clear it
+CACHE_FOLDER = '.columnar'
+
+# Every format is read without header, the first column is the text and the
+# second one the class. Pandas, openpyxl and pyarrow are only imported when
+# a file that needs them is read, so importing the package stays fast.
+EXCEL = ('.xlsx', '.xls')
+CSV = ('.csv',)
+JSON_LINES = ('.jsonl', '.ndjson')
+PARQUET = ('.parquet',)
+ARROW = ('.arrow', '.feather')
+
+def file_format(filename: str) -> tuple:
+    """
+    Format of a file from its extension
+        :param filename: name of the file
+        :return: tuple with the extensions of the format
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    for extensions in (EXCEL, CSV, JSON_LINES, PARQUET, ARROW):
+        if extension in extensions:
+            return extensions
+    raise Exception(f'Unknown input format {extension}, use one of xlsx, csv, jsonl, parquet or arrow')
+
+def file_digest(filename: str) -> str:
+    """
+    Hash of the content of a file, it is only computed again when the
+    modification time or the size of the file change. The hash is not
+    kept if the folder of the file can not be written
+        :param filename: name of the file
+        :return: hexadecimal sha256
+    """
+    status = os.stat(filename)
+    index_filename = os.path.join(os.path.dirname(filename), CACHE_FOLDER, os.path.basename(filename) + '.json')
+    try:
+        with open(index_filename, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        if index['mtime'] == status.st_mtime_ns and index['size'] == status.st_size:
+            return index['sha256']
+    except (OSError, ValueError, KeyError, TypeError):
+        # A missing, truncated or foreign index is computed again
+        pass
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    try:
+        os.makedirs(os.path.dirname(index_filename), exist_ok=True)
+        with replace_file(index_filename) as file:
+            file.write(json.dumps({'mtime': status.st_mtime_ns, 'size': status.st_size, 'sha256': digest.hexdigest()}).encode('utf-8'))
+    except OSError:
+        pass
+    return digest.hexdigest()
+
+def cache_filename(filename: str) -> str:
+    """
+    Columnar copy of an excel file, a folder with a frame of CHUNK_SIZE
+    rows in every file
+        :param filename: excel file
+        :return: name of the copy, it changes with the content of the file
+    """
+    name = f'{os.path.basename(filename)}.{file_digest(filename)[:16]}'
+    return os.path.join(os.path.dirname(filename), CACHE_FOLDER, name)
+
+def cache_chunks(cached: str) -> list[str]:
+    """
+    Files of the columnar copy of an excel file
+        :param cached: folder of the copy
+        :return: names of the files in the order of the rows
+    """
+    return [os.path.join(cached, name) for name in sorted(os.listdir(cached)) if name.endswith(('.parquet', '.pkl'))]
+
+def write_chunks(frame: 'pandas.DataFrame', folder: str, suffix: str) -> None:
+    """
+    Write a frame in files of CHUNK_SIZE rows
+        :param frame: rows of the excel file
+        :param folder: folder of the files
+        :param suffix: .parquet or .pkl
+    """
+    for number, start in enumerate(range(0, max(len(frame), 1), CHUNK_SIZE)):
+        chunk = frame.iloc[start:start + CHUNK_SIZE]
+        name = os.path.join(folder, f'{number:08d}{suffix}')
+        if suffix == '.parquet':
+            # Parquet only keeps columns with a string name
+            chunk.rename(columns=str).to_parquet(name)
+        else:
+            chunk.to_pickle(name)
+
+def read_chunk(chunk: str) -> 'pandas.DataFrame':
+    """
+    Read a file of the columnar copy of an excel file
+        :param chunk: parquet or pickle file
+        :return: data frame with numbered columns
+    """
+    import pandas
+    if not chunk.endswith('.parquet'):
+        return pandas.read_pickle(chunk)
+    frame = pandas.read_parquet(chunk)
+    frame.columns = [int(column) for column in frame.columns]
+    return frame
+
+def write_cache(frame: 'pandas.DataFrame', cached: str) -> None:
+    """
+    Write the columnar copy of an excel file, the chunks are slices of the
+    whole frame so all of them have its types. The copies of an older
+    content of the file are removed. Nothing is written if the folder of
+    the file can not be written
+        :param frame: rows of the excel file
+        :param cached: folder of the copy
+    """
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        folder = tempfile.mkdtemp(dir=os.path.dirname(cached))
+    except OSError:
+        return
+    try:
+        try:
+            write_chunks(frame, folder, '.parquet' if find_spec('pyarrow') else '.pkl')
+        except (ValueError, TypeError, NotImplementedError):
+            # Columns with mixed types, the pickled frames keep them
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+            write_chunks(frame, folder, '.pkl')
+        os.replace(folder, cached)
+    except OSError:
+        shutil.rmtree(folder, ignore_errors=True)
+        return
+    parent, name = os.path.split(cached)
+    for other in os.listdir(parent):
+        if other != name and other.rsplit('.', 1)[0] == name.rsplit('.', 1)[0] and os.path.isdir(os.path.join(parent, other)):
+            shutil.rmtree(os.path.join(parent, other), ignore_errors=True)
+
+def read_frame(filename: str) -> 'pandas.DataFrame':
+    """
+    Read a whole file in a data frame with numbered columns, like
+    pandas.read_excel with header=None. Excel files are only parsed the
+    first time, then the columnar copy is read
+        :param filename: xlsx, csv, jsonl, parquet or arrow file
+        :return: data frame with the rows of the file
+    """
+    import pandas
+    extensions = file_format(filename)
+    if extensions == EXCEL:
+        cached = cache_filename(filename)
+        if os.path.isdir(cached):
+            return pandas.concat([read_chunk(chunk) for chunk in cache_chunks(cached)], ignore_index=True)
+        frame = pandas.read_excel(filename, header=None)
+        write_cache(frame, cached)
+        return frame
+    if extensions == CSV:
+        frame = pandas.read_csv(filename, header=None, dtype=object, keep_default_na=False, na_values=[''])
+    elif extensions == JSON_LINES:
+        frame = pandas.DataFrame([row for chunk in iter_rows(filename, CHUNK_SIZE) for row in chunk])
+    elif extensions == PARQUET:
+        frame = pandas.read_parquet(filename)
+    else:
+        frame = pandas.read_feather(filename)
+    frame.columns = range(len(frame.columns))
+    return frame
+
+def iter_rows(filename: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Read the rows of a file in chunks, without loading the whole file in
+    memory. Excel files already converted are read from the columnar copy
+    one chunk file at a time
+        :param filename: xlsx, csv, jsonl, parquet or arrow file
+        :param chunk_size: number of rows of every chunk
+        :return: generator of lists of rows
+    """
+    extensions = file_format(filename)
+    if extensions == EXCEL:
+        cached = cache_filename(filename)
+        rows = iter_cache(cached) if os.path.isdir(cached) else iter_excel(filename)
+    elif extensions == CSV:
+        rows = iter_csv(filename)
+    elif extensions == JSON_LINES:
+        rows = iter_json_lines(filename)
+    else:
+        rows = iter_arrow(filename, chunk_size, extensions == PARQUET)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_documents(filename: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Read the documents of a file in chunks
+        :param filename: xlsx, csv, jsonl, parquet or arrow file, without header
+        :param chunk_size: number of rows of every chunk
+        :return: generator of lists of (text, class) rows
+    """
+    for chunk in iter_rows(filename, chunk_size):
+        yield [(tuple(row) + (None, None))[:2] for row in chunk]
+
+def iter_excel(filename: str):
+    """
+    Rows of the first sheet of an excel file
+        :param filename: excel file, formulas are read as their cached value like pandas does
+        :return: generator of rows
+    """
+    from openpyxl import load_workbook
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def iter_cache(cached: str):
+    """
+    Rows of the columnar copy of an excel file, the missing cells are None
+    like openpyxl gives them
+        :param cached: folder of the copy
+        :return: generator of rows
+    """
+    for chunk in cache_chunks(cached):
+        frame = read_chunk(chunk).astype(object)
+        yield from frame.where(frame.notna(), None).values.tolist()
+
+def iter_csv(filename: str):
+    """
+    Rows of a csv file, the empty cells are None
+        :param filename: csv file
+        :return: generator of rows
+    """
+    with open(filename, 'r', encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            yield [value if value != '' else None for value in row]
+
+def iter_json_lines(filename: str):
+    """
+    Rows of a json lines file, every line is a list or an object whose
+    values are taken in order
+        :param filename: json lines file
+        :return: generator of rows
+    """
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                row = json.loads(line)
+                yield list(row.values()) if isinstance(row, dict) else row
+
+def iter_arrow(filename: str, chunk_size: int, parquet: bool):
+    """
+    Rows of a parquet or arrow file, read by record batches
+        :param filename: parquet or arrow file
+        :param chunk_size: number of rows of every batch
+        :param parquet: True for parquet, False for the arrow ipc format
+        :return: generator of rows
+    """
+    if parquet:
+        import pyarrow.parquet
+        batches = pyarrow.parquet.ParquetFile(filename).iter_batches(batch_size=chunk_size)
+    else:
+        import pyarrow.ipc
+        reader = pyarrow.ipc.open_file(filename)
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    for batch in batches:
+        yield from zip(*(column.to_pylist() for column in batch.columns))
@@ -0,0 +1,191 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Token Counting
+"""
+
+import zlib
+from collections import Counter
+if __package__:
+    from .corpus import iter_documents
+else:
+    from corpus import iter_documents
+
+SKETCH_WIDTH = 1 << 20
+SKETCH_DEPTH = 4
+CAPACITY = 100000
+
+COUNTING_OPTIONS = ['min-count=', 'sketch=', 'capacity=']
+
+class CountMinSketch:
+    """
+    class CountMinSketch:
+    Approximate counts of tokens in a fixed table. A count is never lower
+    than the real one, and with a width w it is at most e / w of the total
+    higher with a probability of 1 - exp(-depth)
+    """
+    width = SKETCH_WIDTH
+    depth = SKETCH_DEPTH
+    table = None
+    total = 0
+
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH):
+        """
+        Constructor
+            :param width: number of counters of every row
+            :param depth: number of rows, every row has its own hash
+        """
+        import numpy
+        if width < 1 or depth < 1:
+            raise Exception('The width and the depth of the sketch must be positive')
+        self.width = width
+        self.depth = depth
+        self.table = numpy.zeros((depth, width), dtype=numpy.int64)
+        self.total = 0
+
+    def positions(self, tokens: list[str]) -> 'numpy.ndarray':
+        """
+        Counter of every token in every row, the hashes do not change
+        between runs so the counts can be reproduced
+            :param tokens: tokens to hash
+            :return: array (depth, tokens) of columns
+        """
+        import numpy
+        encoded = [token.encode('utf-8') for token in tokens]
+        first = numpy.array([zlib.crc32(token) for token in encoded], dtype=numpy.uint64)
+        # An odd step visits different columns in every row
+        second = numpy.array([zlib.adler32(token) | 1 for token in encoded], dtype=numpy.uint64)
+        rows = numpy.arange(self.depth, dtype=numpy.uint64)[:, None]
+        return ((first + rows * second) % numpy.uint64(self.width)).astype(numpy.int64)
+
+    def add(self, tokens: list[str], counts) -> None:
+        """
+        Add the counts of some distinct tokens
+            :param tokens: distinct tokens
+            :param counts: count of every token
+        """
+        import numpy
+        counts = numpy.asarray(counts, dtype=numpy.int64)
+        rows = numpy.broadcast_to(numpy.arange(self.depth)[:, None], (self.depth, len(tokens)))
+        numpy.add.at(self.table, (rows, self.positions(tokens)), numpy.broadcast_to(counts, (self.depth, len(tokens))))
+        self.total += int(counts.sum())
+
+    def estimate(self, tokens: list[str]) -> 'numpy.ndarray':
+        """
+        Approximate counts of some tokens
+            :param tokens: tokens to look up
+            :return: array with the count of every token
+        """
+        import numpy
+        if not tokens:
+            return numpy.zeros(0, dtype=numpy.int64)
+        return self.table[numpy.arange(self.depth)[:, None], self.positions(tokens)].min(axis=0)
+
+class FrequentTokens:
+    """
+    class FrequentTokens:
+    Tokens that reach a minimum count, found with a Count-Min sketch. Only
+    the candidates are kept, at most capacity of them, so the memory does
+    not grow with the corpus
+    """
+    min_count = 1
+    capacity = CAPACITY
+    sketch = None
+    candidates = {}
+
+    def __init__(self, min_count: int = 1, capacity: int = CAPACITY, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH):
+        """
+        Constructor
+            :param min_count: minimum count of a token
+            :param capacity: maximum number of candidates, the ones with the lowest counts are dropped
+            :param width: number of counters of every row of the sketch
+            :param depth: number of rows of the sketch
+        """
+        self.min_count = min_count
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = {}
+
+    def update(self, counts: Counter) -> None:
+        """
+        Add the counts of a chunk
+            :param counts: counts of the tokens of the chunk
+        """
+        if not counts:
+            return
+        tokens = list(counts)
+        self.sketch.add(tokens, list(counts.values()))
+        for token, estimate in zip(tokens, self.sketch.estimate(tokens).tolist()):
+            if estimate >= self.min_count:
+                self.candidates[token] = estimate
+        if len(self.candidates) > self.capacity:
+            kept = sorted(self.candidates.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+            self.candidates = dict(kept)
+
+    def result(self) -> Counter:
+        """
+        Tokens that reached the minimum count
+            :return: approximate count of every token
+        """
+        tokens = list(self.candidates)
+        estimates = self.sketch.estimate(tokens).tolist()
+        return Counter({token: estimate for token, estimate in zip(tokens, estimates) if estimate >= self.min_count})
+
+def count_raw_tokens(filename: str) -> Counter:
+    """
+    Count the raw tokens of a file, reading it in chunks
+        :param filename: xlsx, csv, jsonl, parquet or arrow file
+        :return: count of every raw token
+    """
+    counts = Counter()
+    for chunk in iter_documents(filename):
+        for text, _ in chunk:
+            if isinstance(text, str):
+                counts.update(text.split())
+    return counts
+
+def normalize_counts(pipeline, raw_counts: Counter) -> Counter:
+    """
+    Normalize every distinct raw token once and add its count to the
+    tokens it becomes, like the training counts them
+        :param pipeline: compiled pipeline
+        :param raw_counts: count of every raw token
+        :return: count of every normalized token
+    """
+    counts = Counter()
+    stream = pipeline.stream
+    for raw, frequency in raw_counts.items():
+        for token in stream((raw,)):
+            counts[token] += frequency
+    return counts
+
+def count_vocabulary(pipeline, filename: str, min_count: int = 1) -> Counter:
+    """
+    Exact counts of the normalized tokens of a file
+        :param pipeline: compiled pipeline
+        :param filename: xlsx, csv, jsonl, parquet or arrow file
+        :param min_count: minimum count of a token
+        :return: count of every normalized token that reached the minimum
+    """
+    counts = normalize_counts(pipeline, count_raw_tokens(filename))
+    return Counter({token: frequency for token, frequency in counts.items() if frequency >= min_count})
+
+def sketch_vocabulary(pipeline, filename: str, min_count: int = 1, capacity: int = CAPACITY, width: int = SKETCH_WIDTH) -> Counter:
+    """
+    Approximate counts of the normalized tokens of a file in bounded memory.
+    Every chunk is normalized on its own, the caches of the stages avoid
+    repeating the expensive work between chunks
+        :param pipeline: compiled pipeline
+        :param filename: xlsx, csv, jsonl, parquet or arrow file
+        :param min_count: minimum count of a token
+        :param capacity: maximum number of tokens kept
+        :param width: number of counters of every row of the sketch
+        :return: approximate count of every normalized token that reached the minimum
+    """
+    frequent = FrequentTokens(min_count, capacity, width)
+    for chunk in iter_documents(filename):
+        raw_counts = Counter(word for text, _ in chunk if isinstance(text, str) for word in text.split())
+        frequent.update(normalize_counts(pipeline, raw_counts))
+    return frequent.result()
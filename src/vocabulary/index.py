@@ -0,0 +1,81 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Vocabulary Index
+"""
+
+from collections import Counter
+
+class VocabularyIndex:
+    """
+    class VocabularyIndex:
+    Dense integer ids of the tokens of a vocabulary in their order, the id
+    after the last token is the one of <UNK>
+    """
+    tokens = []
+    ids = {}
+    unknown = 0
+    size = 0
+
+    def __init__(self, tokens: list[str]):
+        """
+        Constructor
+            :param tokens: tokens of the vocabulary, the repeated ones keep their first id
+        """
+        self.ids = {}
+        for token in tokens:
+            self.ids.setdefault(token, len(self.ids))
+        self.tokens = list(self.ids)
+        self.unknown = len(self.tokens)
+        # The vocabulary file can repeat tokens, the smoothing of the models
+        # has always used its length with the repeated ones
+        self.size = len(tokens)
+
+    def __len__(self) -> int:
+        return self.unknown
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.ids
+
+    def id(self, token: str) -> int:
+        """
+        Id of a token
+            :param token: token to look up
+            :return: id of the token, the <UNK> id if it is not in the vocabulary
+        """
+        return self.ids.get(token, self.unknown)
+
+    def encode(self, tokens: list[str]) -> list[int]:
+        """
+        Ids of some tokens
+            :param tokens: tokens to look up
+            :return: list of ids, unknown tokens get the <UNK> id
+        """
+        ids = self.ids
+        unknown = self.unknown
+        return [ids.get(token, unknown) for token in tokens]
+
+    def count(self, tokens: list[str] | Counter) -> 'numpy.ndarray':
+        """
+        Count the tokens by id
+            :param tokens: list of tokens or their counts
+            :return: array with the frequency of every id, the last one is <UNK>
+        """
+        counts = tokens if isinstance(tokens, Counter) else Counter(tokens)
+        return self.count_table(list(counts.keys()), list(counts.values()))
+
+    def count_table(self, table: list[str], frequencies) -> 'numpy.ndarray':
+        """
+        Count by id the frequencies of a table of distinct tokens
+            :param table: distinct tokens
+            :param frequencies: frequency of every token of the table, or array (groups, table) with the ones of every group
+            :return: array with the frequency of every id, (groups, ids) for several groups, the last id is <UNK>
+        """
+        import numpy
+        frequencies = numpy.asarray(frequencies, dtype=numpy.int64)
+        result = numpy.zeros(frequencies.shape[:-1] + (self.unknown + 1,), dtype=numpy.int64)
+        ids = numpy.array(self.encode(table), dtype=numpy.int64)
+        numpy.add.at(numpy.moveaxis(result, -1, 0), ids, numpy.moveaxis(frequencies, -1, 0))
+        return result
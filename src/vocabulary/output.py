@@ -0,0 +1,128 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Output Files
+"""
+
+import gzip
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Compression of every suffix. Zstandard needs the zstandard library, it is
+# only imported when a .zst file is read or written.
+COMPRESSIONS = {'gz': '.gz', 'zst': '.zst'}
+
+COMPRESS_OPTIONS = ['compress=']
+
+# Folder of the vocabulary, the parameters, the models and their caches when
+# the scripts are not given another one
+MODEL_FOLDER = './out'
+
+# Permissions of a new file, mkstemp only gives them to the owner
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+def compression_suffix(compression: str) -> str:
+    """
+    Suffix of the files of a compression
+        :param compression: gz, zst or empty for no compression
+        :return: suffix to add to the file names
+    """
+    if not compression:
+        return ''
+    if compression not in COMPRESSIONS:
+        raise Exception(f'Unknown compression {compression}, use one of {", ".join(COMPRESSIONS)}')
+    return COMPRESSIONS[compression]
+
+def zstandard_module():
+    """
+    Import the zstandard library
+        :return: zstandard module
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception('The zstd compression needs the zstandard library, install it with pip install zstandard')
+    return zstandard
+
+def encode_output(filename: str, text: str) -> bytes:
+    """
+    Content of a file, compressed by the suffix of its name
+        :param filename: name of the file
+        :param text: text of the file
+        :return: bytes to write
+    """
+    data = text.encode('utf-8')
+    if filename.endswith(COMPRESSIONS['gz']):
+        # Without the modification time the same text always gives the same file
+        return gzip.compress(data, mtime=0)
+    if filename.endswith(COMPRESSIONS['zst']):
+        return zstandard_module().ZstdCompressor().compress(data)
+    return data
+
+@contextmanager
+def replace_file(filename: str):
+    """
+    Open a temporary file next to the final one, it is renamed to the final
+    name when the block ends, so a reader sees the old file or the new one,
+    never a part. Every writer gets its own temporary name and the file is
+    removed if the block fails
+        :param filename: name of the file
+        :return: binary file to write
+    """
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(filename) or '.', prefix=os.path.basename(filename) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            yield file
+        os.chmod(temporary, 0o666 & ~UMASK)
+        os.replace(temporary, filename)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+def write_text(filename: str, text: str) -> None:
+    """
+    Write a whole file at once with replace_file
+        :param filename: name of the file, .gz and .zst are compressed
+        :param text: text of the file
+    """
+    data = encode_output(filename, text)
+    with replace_file(filename) as file:
+        file.write(data)
+
+def write_lines(filename: str, lines: list[str]) -> None:
+    """
+    Write some lines in a file in one pass
+        :param filename: name of the file, .gz and .zst are compressed
+        :param lines: lines without the line break
+    """
+    write_text(filename, '\n'.join(lines) + '\n' if lines else '')
+
+def open_text(filename: str):
+    """
+    Open a text file for reading, decompressed by the suffix of its name
+        :param filename: name of the file
+        :return: text file
+    """
+    if filename.endswith(COMPRESSIONS['gz']):
+        return gzip.open(filename, 'rt', encoding='utf-8')
+    if filename.endswith(COMPRESSIONS['zst']):
+        return io.TextIOWrapper(zstandard_module().open(filename, 'rb'), encoding='utf-8')
+    return open(filename, 'r', encoding='utf-8')
+
+def find_output(filename: str) -> str:
+    """
+    Find a file that can be written compressed
+        :param filename: name of the file without the compression suffix
+        :return: the newest of the file and its compressed versions, None if there is none
+    """
+    candidates = [filename] + [filename + suffix for suffix in COMPRESSIONS.values()]
+    existing = [candidate for candidate in candidates if os.path.isfile(candidate)]
+    if not existing:
+        return None
+    return max(existing, key=os.path.getmtime)
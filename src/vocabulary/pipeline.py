@@ -0,0 +1,215 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Pipeline
+"""
+
+import time
+if __package__:
+    from .tables import STOP_WORDS_SET, LONG_WORD_LENGTH, has_number, remove_punctuation_marks, remove_url_html_hashtags
+    from .profiler import PROFILER
+else:
+    from tables import STOP_WORDS_SET, LONG_WORD_LENGTH, has_number, remove_punctuation_marks, remove_url_html_hashtags
+    from profiler import PROFILER
+
+STAGES = [
+    'numbers',
+    'long_words',
+    'lowercase',
+    'punctuation_marks',
+    'stopwords',
+    'emojis',
+    'url_html_hashtags',
+    'spell_check',
+    'stemming',
+    'lemmatization',
+]
+
+class Pipeline:
+    """
+    class Pipeline:
+    Compiled version of Vocabulary.tokenize, every token goes through all
+    the enabled stages in one pass
+    """
+    stages = []
+
+    def __init__(self, vocabulary):
+        """
+        Constructor
+            :param vocabulary: vocabulary with the parameters to compile
+        """
+        self.parameters = dict(vocabulary.parameters)
+        self.stages = []
+        for name in STAGES:
+            stage = Pipeline.stage(vocabulary, name, self.parameters.get(name, 'n'))
+            if stage is not None:
+                self.stages.append((name, stage, Pipeline.repeats(name)))
+
+    @staticmethod
+    def stage(vocabulary, name: str, option: str):
+        """
+        Function of a stage
+            :param vocabulary: vocabulary with the caches of the stage
+            :param name: name of the stage, one of STAGES
+            :param option: option of the stage
+            :return: function token -> tuple of tokens, None if the stage is disabled
+        """
+        return getattr(Pipeline, f'_{name}')(vocabulary, option)
+
+    @staticmethod
+    def repeats(name: str) -> bool:
+        """
+        Whether the set mode applies a stage twice
+            :param name: name of the stage
+            :return: True for every stage but spell check
+        """
+        # The spell check stage builds its result directly, the others are
+        # applied again over the deduplicated set
+        return name != 'spell_check'
+
+    def run(self, tokens: list[str], use_set: bool = True) -> list[str]:
+        """
+        Push every token through the enabled stages
+            :param tokens: tokens to normalize
+            :param use_set: remove duplicates after every stage
+            :return: list of tokens in alphabetic order
+        """
+        if use_set:
+            # The stages are interleaved in the set mode, the profiler only
+            # gets the whole pipeline
+            with PROFILER.stage('pipeline', len(tokens)) as record:
+                result = sorted(self._run_set(tokens))
+                record['tokens_out'] = len(result)
+            return result
+        result = self._run_profiled(tokens) if PROFILER.enabled else list(self.stream(tokens))
+        result.sort()
+        return result
+
+    def stream(self, tokens):
+        """
+        Push every token through the enabled stages lazily, keeping the
+        order and the duplicates
+            :param tokens: iterable of tokens to normalize
+            :return: generator of normalized tokens
+        """
+        stages = [stage for _, stage, _ in self.stages]
+        for token in tokens:
+            current = (token,)
+            for stage in stages:
+                if len(current) == 1:
+                    current = stage(current[0])
+                else:
+                    current = [new for old in current for new in stage(old)]
+                if not current:
+                    break
+            yield from current
+
+    def _run_profiled(self, tokens: list[str]) -> list[str]:
+        """
+        Same as stream but stage by stage, so the profiler gets the time and
+        the tokens in and out of every stage
+            :param tokens: tokens to normalize
+            :return: list of tokens in the order of stream
+        """
+        for name, stage, _ in self.stages:
+            start, cpu = time.perf_counter(), time.process_time()
+            result = [new for old in tokens for new in stage(old)]
+            PROFILER.add(name, time.perf_counter() - start, time.process_time() - cpu, len(tokens), len(result))
+            tokens = result
+        return list(tokens)
+
+    def _run_set(self, tokens: list[str]) -> list[str]:
+        """
+        Same as run but mimicking the deduplication of the set mode
+            :param tokens: tokens to normalize
+            :return: list of tokens
+        """
+        seen = [set() for _ in self.stages]
+        result = []
+        pending = [(token, 0) for token in tokens]
+        while pending:
+            token, index = pending.pop()
+            if index == len(self.stages):
+                result.append(token)
+                continue
+            _, stage, repeat = self.stages[index]
+            for new in stage(token):
+                if new in seen[index]:
+                    continue
+                seen[index].add(new)
+                if repeat:
+                    pending.extend((other, index + 1) for other in stage(new))
+                else:
+                    pending.append((new, index + 1))
+        return result
+
+    @staticmethod
+    def _numbers(_, option: str):
+        if option != 'y':
+            return None
+        return lambda token: () if has_number(token) else (token,)
+
+    @staticmethod
+    def _long_words(_, option: str):
+        if option != 'y':
+            return None
+        return lambda token: (token,) if len(token) < LONG_WORD_LENGTH else ()
+
+    @staticmethod
+    def _lowercase(_, option: str):
+        if option != 'y':
+            return None
+        return lambda token: (token.lower(),) if token else ()
+
+    @staticmethod
+    def _punctuation_marks(_, option: str):
+        if option != 'y':
+            return None
+        return lambda token: (remove_punctuation_marks(token),) if token else ()
+
+    @staticmethod
+    def _stopwords(_, option: str):
+        if option != 'y':
+            return None
+        return lambda token: () if token in STOP_WORDS_SET else (token,)
+
+    @staticmethod
+    def _emojis(_, option: str):
+        # No emoji is made only of ascii characters, those tokens are left as they are
+        if option == 'n':
+            return None
+        import emoji
+        if option == 'y':
+            return lambda token: ((token,) if token.isascii() else (emoji.replace_emoji(token, ''),)) if token else ()
+        if option == 'w':
+            return lambda token: ((token,) if token.isascii() else (emoji.demojize(token),)) if token else ()
+        return None
+
+    @staticmethod
+    def _url_html_hashtags(_, option: str):
+        if option != 'y':
+            return None
+        return lambda token: (remove_url_html_hashtags(token),) if token else ()
+
+    @staticmethod
+    def _spell_check(vocabulary, option: str):
+        if option != 'y':
+            return None
+        correct = vocabulary.correction_cache()
+        return lambda token: correct(token) if token else ()
+
+    @staticmethod
+    def _stemming(vocabulary, option: str):
+        if option != 'y':
+            return None
+        stem = vocabulary.stemming_cache()
+        return lambda token: (stem(token),) if token else ()
+
+    @staticmethod
+    def _lemmatization(vocabulary, option: str):
+        if option != 'y':
+            return None
+        lemmatize = vocabulary.lemmatization_cache()
+        return lambda token: (lemmatize(token),) if token else ()
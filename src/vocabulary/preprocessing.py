@@ -0,0 +1,166 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Preprocessing Profiles
+"""
+
+import json
+import os
+from collections.abc import Mapping
+
+# Every parameter with its question and its options, in the order of the
+# pipeline. The first option is the default
+PARAMETERS = {
+    'numbers': ('No numbers?', ('n', 'y')),
+    'long_words': ('No long words?', ('n', 'y')),
+    'lowercase': ('Lowercase?', ('n', 'y')),
+    'punctuation_marks': ('No punctuation marks?', ('n', 'y')),
+    'stopwords': ('No stopwords?', ('n', 'y')),
+    'emojis': ('No emojis?', ('n', 'y', 'w')),
+    'url_html_hashtags': ('No URLs and HTML hashtags?', ('n', 'y')),
+    'spell_check': ('Spell check?', ('n', 'y')),
+    'stemming': ('Stemming?', ('n', 'y')),
+    'lemmatization': ('Lemmatization?', ('n', 'y')),
+}
+
+ALIASES = {'yes': 'y', 'true': 'y', 'no': 'n', 'false': 'n', 'words': 'w'}
+
+PROFILES = {
+    'raw': {},
+    'fast': {'lowercase': 'y', 'punctuation_marks': 'y', 'url_html_hashtags': 'y', 'stemming': 'y'},
+    'default': {'lowercase': 'y', 'punctuation_marks': 'y', 'url_html_hashtags': 'y', 'spell_check': 'y', 'stemming': 'y'},
+}
+
+PREPROCESSING_OPTIONS = ['preprocessing=', 'set=']
+
+class Profile(Mapping):
+    """
+    class Profile:
+    Validated preprocessing parameters, they can not be changed once built.
+    It is read like the dictionary of parameters.json
+    """
+    __slots__ = ('_values',)
+
+    def __init__(self, parameters: dict = None, **changes):
+        """
+        Constructor
+            :param parameters: option of every parameter, the missing ones take the default
+            :param changes: options that replace the ones in parameters
+        """
+        given = dict(parameters or {})
+        given.update(changes)
+        for name in given:
+            if name not in PARAMETERS:
+                raise Exception(f'Unknown preprocessing parameter {name}, use one of {", ".join(PARAMETERS)}')
+        values = {}
+        for name, (_, options) in PARAMETERS.items():
+            value = str(given.get(name, options[0])).strip().lower()
+            value = ALIASES.get(value, value)
+            if value not in options:
+                raise Exception(f'Invalid option {given[name]!r} for {name}, use one of {"/".join(options)}')
+            values[name] = value
+        if values['stemming'] == 'y' and values['lemmatization'] == 'y':
+            raise Exception('Stemming and lemmatization can not be used together')
+        object.__setattr__(self, '_values', values)
+
+    def __getitem__(self, name: str) -> str:
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __hash__(self) -> int:
+        return hash(tuple(self._values.items()))
+
+    def __repr__(self) -> str:
+        return f'Profile({self._values})'
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError('A profile can not be changed, use replace')
+
+    def __reduce__(self):
+        return Profile, (self._values,)
+
+    def replace(self, **changes):
+        """
+        New profile with some options changed
+            :param changes: options to change
+            :return: new profile
+        """
+        return Profile(self._values, **changes)
+
+    def to_dict(self) -> dict:
+        """
+        Plain dictionary, to write it in json
+            :return: dictionary parameter -> option
+        """
+        return dict(self._values)
+
+def stage_error(error: Exception) -> str:
+    """
+    Short description of the error of a stage. A missing resource, like the
+    wordnet corpus, is explained by nltk in a box of many lines, only the
+    first line with text is kept
+        :param error: error raised by the stage
+        :return: name of the error and its first line
+    """
+    message = next((line for line in str(error).splitlines() if line.strip(' *')), '')
+    return f'{type(error).__name__} {message.strip()}'
+
+def load_profile(source: str) -> Profile:
+    """
+    Load a profile
+        :param source: name of a profile in PROFILES or json file with the parameters
+        :return: validated profile
+    """
+    if source in PROFILES:
+        return Profile(PROFILES[source])
+    if not os.path.isfile(source):
+        raise Exception(f'No profile {source} found, use a json file or one of {", ".join(PROFILES)}')
+    with open(source, 'r', encoding='utf-8') as file:
+        return Profile(json.load(file))
+
+def ask_profile() -> Profile:
+    """
+    Ask the user for every parameter
+        :return: validated profile
+    """
+    parameters = {}
+    for name, (question, options) in PARAMETERS.items():
+        if name == 'lemmatization' and parameters['stemming'] == 'y':
+            continue
+        shown = '/'.join(sorted(options, key='ynw'.index))
+        while True:
+            answer = input(f'{question} ({shown}): ').strip().lower() or options[0]
+            answer = ALIASES.get(answer, answer)
+            if answer in options:
+                break
+            print(f'Answer one of {shown}')
+        parameters[name] = answer
+    return Profile(parameters)
+
+def profile_from_options(options: list) -> Profile:
+    """
+    Profile given in the command line options in PREPROCESSING_OPTIONS, the
+    --set options change the profile given with --preprocessing
+        :param options: options returned by getopt, -p and -x are the short forms
+        :return: validated profile, None if there are no profile options
+    """
+    source = None
+    changes = {}
+    for option, argument in options:
+        if option in ('-p', '--preprocessing'):
+            source = argument
+        elif option in ('-x', '--set'):
+            name, separator, value = argument.partition('=')
+            if not separator:
+                raise Exception(f'Invalid option {argument}, use <parameter>=<option>')
+            changes[name.strip()] = value
+    if source is None and not changes:
+        return None
+    return Profile(load_profile(source) if source else {}, **changes)
@@ -0,0 +1,176 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Profiler
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+if __package__:
+    from .cache import cache_stats
+else:
+    from cache import cache_stats
+
+PROFILE_OPTIONS = ['profile=', 'trace=', 'cprofile=', 'tracemalloc']
+
+class Profiler:
+    """
+    class Profiler:
+    Records the wall time, cpu time, tokens in and out and cache hits of
+    every stage. It does nothing until it is enabled
+    """
+    enabled = False
+    records = []
+    totals = {}
+    profile_filename = ''
+    trace_filename = ''
+    cprofile_filename = ''
+    memory = False
+    cprofile = None
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.records = []
+        self.totals = {}
+        self.origin = time.perf_counter()
+
+    def configure(self, options: list) -> None:
+        """
+        Enable the profiler from the command line options in PROFILE_OPTIONS
+            :param options: options returned by getopt
+        """
+        for option, argument in options:
+            if option == '--profile':
+                self.profile_filename = argument
+            elif option == '--trace':
+                self.trace_filename = argument
+            elif option == '--cprofile':
+                self.cprofile_filename = argument
+            elif option == '--tracemalloc':
+                self.memory = True
+        self.enabled = bool(self.profile_filename or self.trace_filename or self.cprofile_filename or self.memory)
+        if self.memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if self.cprofile_filename:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    @contextmanager
+    def stage(self, name: str, tokens_in: int = None):
+        """
+        Measure a stage, the caller can set record['tokens_out'] inside
+            :param name: name of the stage
+            :param tokens_in: number of tokens that enter the stage
+            :return: record of the stage
+        """
+        if not self.enabled:
+            yield {}
+            return
+        record = {'name': name, 'tokens_in': tokens_in, 'tokens_out': None}
+        caches = cache_stats()
+        if self.memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['start'] = start - self.origin
+            record['wall'] = time.perf_counter() - start
+            record['cpu'] = time.process_time() - cpu
+            record['caches'] = {}
+            for cache, stats in cache_stats().items():
+                hits = stats['hits'] - caches.get(cache, {}).get('hits', 0)
+                misses = stats['misses'] - caches.get(cache, {}).get('misses', 0)
+                if hits or misses:
+                    record['caches'][cache] = {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses)}
+            if self.memory:
+                record['memory_peak'] = tracemalloc.get_traced_memory()[1]
+            self.records.append(record)
+
+    def add(self, name: str, wall: float, cpu: float, tokens_in: int = 0, tokens_out: int = 0) -> None:
+        """
+        Add a measure to the totals of a stage without recording an event,
+        for stages that run once per document
+            :param name: name of the stage
+            :param wall: seconds of wall time
+            :param cpu: seconds of cpu time
+            :param tokens_in: number of tokens that entered the stage
+            :param tokens_out: number of tokens that left the stage
+        """
+        total = self.totals.get(name)
+        if total is None:
+            total = self.totals[name] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'tokens_in': 0, 'tokens_out': 0}
+        total['calls'] += 1
+        total['wall'] += wall
+        total['cpu'] += cpu
+        total['tokens_in'] += tokens_in
+        total['tokens_out'] += tokens_out
+
+    def summary(self) -> dict:
+        """
+        Totals of every stage name and hit rates of the caches
+            :return: dictionary with the stages and the caches
+        """
+        stages = {name: dict(total) for name, total in self.totals.items()}
+        for record in self.records:
+            total = stages.setdefault(record['name'], {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'tokens_in': 0, 'tokens_out': 0})
+            total['calls'] += 1
+            total['wall'] += record['wall']
+            total['cpu'] += record['cpu']
+            total['tokens_in'] += record['tokens_in'] or 0
+            total['tokens_out'] += record['tokens_out'] or 0
+        return {'stages': stages, 'caches': cache_stats()}
+
+    def write_json(self, filename: str) -> None:
+        """
+        Write the records and the summary in a json file
+            :param filename: name of the file
+        """
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump({'summary': self.summary(), 'records': self.records}, file, indent=4)
+
+    def write_chrome_trace(self, filename: str) -> None:
+        """
+        Write the records in the Chrome trace format, it can be opened in
+        chrome://tracing or Perfetto
+            :param filename: name of the file
+        """
+        events = []
+        for record in self.records:
+            events.append({
+                'name': record['name'],
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': record['start'] * 1e6,
+                'dur': record['wall'] * 1e6,
+                'pid': os.getpid(),
+                'tid': 0,
+                'args': {key: value for key, value in record.items() if key not in ('name', 'start', 'wall')},
+            })
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}, file)
+
+    def export(self) -> None:
+        """
+        Write every file asked in configure
+        """
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_filename)
+            self.cprofile = None
+        if self.profile_filename:
+            self.write_json(self.profile_filename)
+        if self.trace_filename:
+            self.write_chrome_trace(self.trace_filename)
+
+PROFILER = Profiler()
@@ -0,0 +1,65 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Spell Checker
+"""
+
+import os
+
+SNAPSHOT_NAME = 'spell_checker.pickle'
+SNAPSHOT_FILENAME = './out/' + SNAPSHOT_NAME
+
+DICTIONARY = 'frequency_dictionary_en_82_765.txt'
+BIGRAM_DICTIONARY = 'frequency_bigramdictionary_en_243_342.txt'
+
+def dictionary_filenames() -> list[str]:
+    """
+    Paths of the symspellpy dictionaries
+        :return: unigram and bigram dictionary paths
+    """
+    from importlib import resources
+    package = resources.files('symspellpy')
+    return [str(package / DICTIONARY), str(package / BIGRAM_DICTIONARY)]
+
+def build_spell_checker() -> 'SymSpell':
+    """
+    Build the spell checker parsing the text dictionaries
+        :return: spell checker with the unigram and bigram dictionaries
+    """
+    from symspellpy import SymSpell
+    dictionary, bigram_dictionary = dictionary_filenames()
+    spell_checker = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+    spell_checker.load_dictionary(dictionary, term_index=0, count_index=1)
+    spell_checker.load_bigram_dictionary(bigram_dictionary, term_index=0, count_index=1)
+    return spell_checker
+
+def is_snapshot_valid(filename: str) -> bool:
+    """
+    Check if the snapshot exists and is newer than the dictionaries
+        :param filename: snapshot file
+        :return: True if the snapshot can be used
+    """
+    if not os.path.isfile(filename):
+        return False
+    modified = os.path.getmtime(filename)
+    return all(os.path.getmtime(dictionary) <= modified for dictionary in dictionary_filenames())
+
+def load_spell_checker(filename: str = SNAPSHOT_FILENAME) -> 'SymSpell':
+    """
+    Load the spell checker from the snapshot, building and saving the
+    snapshot the first time
+        :param filename: snapshot file, empty to always parse the dictionaries
+        :return: loaded spell checker
+    """
+    from symspellpy import SymSpell
+    if filename and is_snapshot_valid(filename):
+        spell_checker = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+        if spell_checker.load_pickle(filename, compressed=False):
+            return spell_checker
+    spell_checker = build_spell_checker()
+    if filename:
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        spell_checker.save_pickle(filename, compressed=False)
+    return spell_checker
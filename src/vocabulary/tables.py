@@ -0,0 +1,55 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Lookup Tables
+"""
+
+import re
+if __package__:
+    from .constants import PUNCTUATION_MARKS, STOP_WORDS
+else:
+    from constants import PUNCTUATION_MARKS, STOP_WORDS
+
+# The old pattern was rf"[{'|'.join(PUNCTUATION_MARKS)}]", so the '|' used
+# as separator is removed too
+PUNCTUATION_TABLE = str.maketrans('', '', ''.join(PUNCTUATION_MARKS) + '|')
+
+STOP_WORDS_SET = frozenset(STOP_WORDS)
+
+# Tokens come from str.split so they never contain line breaks and looking
+# for any digit is the same as matching r'.*\d.*'
+DIGIT_PATTERN = re.compile(r'\d')
+
+URL_HTML_HASHTAGS_PATTERN = re.compile(r'http.*|#.*|<.*>|@.*')
+URL_HTML_HASHTAGS_MARKS = ('http', '#', '<', '@')
+
+LONG_WORD_LENGTH = 20
+
+def has_number(token: str) -> bool:
+    """
+    Check if the token has a digit
+        :param token: token to check
+        :return: True if the token has a digit
+    """
+    return DIGIT_PATTERN.search(token) is not None
+
+def remove_punctuation_marks(token: str) -> str:
+    """
+    Remove the punctuation marks of a token
+        :param token: token to clean
+        :return: token without punctuation marks
+    """
+    return token.translate(PUNCTUATION_TABLE)
+
+def remove_url_html_hashtags(token: str) -> str:
+    """
+    Remove URLs, HTML tags, hashtags and mentions of a token
+        :param token: token to clean
+        :return: token without URLs, HTML tags, hashtags and mentions
+    """
+    for mark in URL_HTML_HASHTAGS_MARKS:
+        if mark in token:
+            return URL_HTML_HASHTAGS_PATTERN.sub('', token)
+    return token
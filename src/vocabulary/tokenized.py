@@ -0,0 +1,250 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Tokenized Corpus Cache
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+if __package__:
+    from .corpus import CACHE_FOLDER, file_digest
+    from .output import replace_file
+else:
+    from corpus import CACHE_FOLDER, file_digest
+    from output import replace_file
+
+# The tokens are cached in the CACHE_FOLDER next to the input file, in files
+# <input name>.<input hash>.tokens-<key>.npz. Writing one removes the ones
+# of an older content of the input and keeps the MAX_ENTRIES last used of
+# the current one. Removing the folder clears the cache, the tokens are
+# computed again in the next run
+
+# Bump it when the output of the pipeline changes for the same parameters
+CACHE_VERSION = 1
+MAX_ENTRIES = 8
+LIBRARIES = ['emoji', 'nltk', 'symspellpy']
+
+class TokenizedCorpus:
+    """
+    class TokenizedCorpus:
+    Tokens of every document as integer ids over a table of strings
+    """
+    table = []
+    ids = None
+    starts = None
+
+    def __init__(self, table: list[str], ids: 'numpy.ndarray', starts: 'numpy.ndarray'):
+        """
+        Constructor
+            :param table: string of every id
+            :param ids: ids of the tokens of all the documents, one after another
+            :param starts: start of every document in ids, plus the end of the last one
+        """
+        self.table = table
+        self.ids = ids
+        self.starts = starts
+
+    @staticmethod
+    def from_documents(documents: list[list[str]]):
+        """
+        Build the corpus from the tokens of every document
+            :param documents: list with the tokens of every document
+            :return: tokenized corpus
+        """
+        import numpy
+        index = {}
+        ids = [index.setdefault(token, len(index)) for tokens in documents for token in tokens]
+        starts = numpy.zeros(len(documents) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(tokens) for tokens in documents], out=starts[1:])
+        return TokenizedCorpus(list(index), numpy.array(ids, dtype=numpy.int32), starts)
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def document(self, index: int) -> list[str]:
+        """
+        Tokens of a document
+            :param index: position of the document
+            :return: list of tokens
+        """
+        table = self.table
+        return [table[token] for token in self.ids[self.starts[index]:self.starts[index + 1]].tolist()]
+
+    def counts(self, indices) -> Counter:
+        """
+        Count the tokens of some documents
+            :param indices: positions of the documents
+            :return: counts of the tokens
+        """
+        import numpy
+        selected = [self.ids[self.starts[index]:self.starts[index + 1]] for index in indices]
+        if not selected:
+            return Counter()
+        frequencies = numpy.bincount(numpy.concatenate(selected), minlength=len(self.table))
+        return Counter({self.table[token]: int(frequencies[token]) for token in numpy.flatnonzero(frequencies)})
+
+    def group_counts(self, groups: 'numpy.ndarray', number_groups: int) -> 'numpy.ndarray':
+        """
+        Count the tokens of every group of documents in one pass
+            :param groups: group of every document, -1 for the ones that are not counted
+            :param number_groups: number of groups
+            :return: array (groups, table) with the frequency of every token in every group
+        """
+        import numpy
+        token_groups = numpy.repeat(numpy.asarray(groups, dtype=numpy.int64), numpy.diff(self.starts))
+        counted = token_groups >= 0
+        keys = token_groups[counted] * len(self.table) + self.ids[counted]
+        return numpy.bincount(keys, minlength=number_groups * len(self.table)).reshape(number_groups, len(self.table))
+
+    def save(self, filename: str) -> None:
+        """
+        Write the corpus in a npz file
+            :param filename: name of the file
+        """
+        import numpy
+        encoded = [token.encode('utf-8') for token in self.table]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(token) for token in encoded], out=offsets[1:])
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with replace_file(filename) as file:
+            numpy.savez(
+                file,
+                strings=numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8),
+                offsets=offsets,
+                ids=self.ids,
+                starts=self.starts,
+            )
+
+    @staticmethod
+    def load(filename: str):
+        """
+        Read a corpus written by save
+            :param filename: name of the file
+            :return: tokenized corpus
+        """
+        import numpy
+        with numpy.load(filename) as data:
+            strings = data['strings'].tobytes()
+            offsets = data['offsets'].tolist()
+            table = [strings[offsets[index]:offsets[index + 1]].decode('utf-8') for index in range(len(offsets) - 1)]
+            return TokenizedCorpus(table, data['ids'], data['starts'])
+
+def library_versions() -> dict:
+    """
+    Versions of the libraries used by the pipeline
+        :return: dictionary library -> version
+    """
+    from importlib import metadata
+    versions = {}
+    for library in LIBRARIES:
+        try:
+            versions[library] = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            versions[library] = None
+    return versions
+
+def tokenized_filename(filename: str, kind: str, parameters: dict) -> str:
+    """
+    Name of the cached tokens of a file, it depends on the content of the
+    file, the parameters and the versions of the libraries
+        :param filename: input file
+        :param kind: what was tokenized, 'documents', 'sequences' or 'vocabulary'
+        :param parameters: preprocessing parameters
+        :return: name of the npz file
+    """
+    data = file_digest(filename)
+    key = json.dumps({
+        'data': data,
+        'kind': kind,
+        'parameters': dict(parameters),
+        'libraries': library_versions(),
+        'version': CACHE_VERSION,
+    }, sort_keys=True)
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(os.path.dirname(filename), CACHE_FOLDER, f'{os.path.basename(filename)}.{data[:16]}.tokens-{digest}.npz')
+
+def remove_old_entries(filename: str, cached: str) -> None:
+    """
+    Remove the cached tokens of an older content of an input file, and the
+    least recently used ones of its current content over MAX_ENTRIES
+        :param filename: input file
+        :param cached: cached tokens that were just written
+    """
+    folder = os.path.dirname(cached)
+    current = os.path.basename(cached).split('.tokens-')[0]
+    entries = []
+    for name in os.listdir(folder):
+        if name.startswith('tokens-') and name.endswith('.npz'):
+            # Named without the input file by the first version
+            os.remove(os.path.join(folder, name))
+            continue
+        if '.tokens-' not in name or not name.endswith('.npz') or name == os.path.basename(cached):
+            continue
+        entry = name.split('.tokens-')[0]
+        if entry.rsplit('.', 1)[0] != os.path.basename(filename):
+            continue
+        if entry != current:
+            os.remove(os.path.join(folder, name))
+        else:
+            entries.append((os.stat(os.path.join(folder, name)).st_mtime_ns, name))
+    for _, name in sorted(entries)[:max(0, len(entries) + 1 - MAX_ENTRIES)]:
+        os.remove(os.path.join(folder, name))
+
+def load_tokenized(filename: str, kind: str, parameters: dict) -> TokenizedCorpus:
+    """
+    Cached tokens of a file
+        :param filename: input file
+        :param kind: what was tokenized, 'documents', 'sequences' or 'vocabulary'
+        :param parameters: preprocessing parameters
+        :return: tokenized corpus, None if it is not cached
+    """
+    cached = tokenized_filename(filename, kind, parameters)
+    if not os.path.isfile(cached):
+        return None
+    try:
+        # The modification time tells remove_old_entries the last use
+        os.utime(cached)
+    except OSError:
+        pass
+    return TokenizedCorpus.load(cached)
+
+def save_tokenized(corpus: TokenizedCorpus, filename: str, kind: str, parameters: dict) -> None:
+    """
+    Cache the tokens of a file, nothing is cached if the folder of the
+    file can not be written. The old entries of the file are removed
+        :param corpus: tokenized corpus
+        :param filename: input file
+        :param kind: what was tokenized, 'documents', 'sequences' or 'vocabulary'
+        :param parameters: preprocessing parameters
+    """
+    cached = tokenized_filename(filename, kind, parameters)
+    try:
+        corpus.save(cached)
+        remove_old_entries(filename, cached)
+    except OSError:
+        pass
+
+def tokenize_texts(vocabulary, texts) -> list[list[str]]:
+    """
+    Tokenize every document on its own, like Vocabulary.tokenize without set
+        :param vocabulary: vocabulary with the parameters
+        :param texts: texts of the documents, the ones that are not a text get no tokens
+        :return: list with the tokens of every document in alphabetic order
+    """
+    pipeline = vocabulary.compile()
+    return [pipeline.run(text.split(), False) if isinstance(text, str) else [] for text in texts]
+
+def tokenize_sequences(vocabulary, texts) -> list[list[str]]:
+    """
+    Tokenize every document on its own keeping the order of its tokens,
+    the n-gram models need the neighbours of every token
+        :param vocabulary: vocabulary with the parameters
+        :param texts: texts of the documents, the ones that are not a text get no tokens
+        :return: list with the tokens of every document in the order of the text
+    """
+    stream = vocabulary.compile().stream
+    return [list(stream(text.split())) if isinstance(text, str) else [] for text in texts]
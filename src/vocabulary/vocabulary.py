@@ -11,18 +11,30 @@ Vocabulary
 import sys
 import os
 import getopt
-import re
 import json
-import pandas
-import emoji
-from symspellpy import SymSpell
-import pkg_resources
-from nltk.stem import PorterStemmer, WordNetLemmatizer
-from alive_progress import alive_bar
+from functools import partial
 if __name__ == '__main__':
-    from constants import PUNCTUATION_MARKS, STOP_WORDS
+    from tables import STOP_WORDS_SET, LONG_WORD_LENGTH, has_number, remove_punctuation_marks, remove_url_html_hashtags
+    from pipeline import Pipeline
+    from cache import CACHE_NAME, get_cache, load_caches, save_caches
+    from spell import SNAPSHOT_FILENAME, SNAPSHOT_NAME, load_spell_checker
+    from corpus import iter_documents
+    from tokenized import TokenizedCorpus, load_tokenized, save_tokenized
+    from profiler import PROFILE_OPTIONS, PROFILER
+    from preprocessing import PREPROCESSING_OPTIONS, ask_profile, profile_from_options
+    from output import COMPRESS_OPTIONS, compression_suffix, write_lines, write_text
+    from counting import COUNTING_OPTIONS, CAPACITY, count_vocabulary, sketch_vocabulary
 else:
-    from .constants import PUNCTUATION_MARKS, STOP_WORDS
+    from .tables import STOP_WORDS_SET, LONG_WORD_LENGTH, has_number, remove_punctuation_marks, remove_url_html_hashtags
+    from .pipeline import Pipeline
+    from .cache import CACHE_NAME, get_cache, load_caches, save_caches
+    from .spell import SNAPSHOT_FILENAME, SNAPSHOT_NAME, load_spell_checker
+    from .corpus import iter_documents
+    from .tokenized import TokenizedCorpus, load_tokenized, save_tokenized
+    from .profiler import PROFILE_OPTIONS, PROFILER
+    from .preprocessing import PREPROCESSING_OPTIONS, ask_profile, profile_from_options
+    from .output import COMPRESS_OPTIONS, compression_suffix, write_lines, write_text
+    from .counting import COUNTING_OPTIONS, CAPACITY, count_vocabulary, sketch_vocabulary
 
 class Vocabulary:
     """
@@ -31,9 +43,11 @@ class Vocabulary:
     parameters = {}
     output_filename = ''
     tokens = []
-    spell_checker = SymSpell(max_dictionary_edit_distance=1, prefix_length=7)
-    spell_check_loaded = False
+    spell_checker = None
+    spell_snapshot = SNAPSHOT_FILENAME
     use_set = False
+    pipeline = None
+    counts = None
 
     def __init__(self, output_filename: str, ask_for_parameters: bool = False):
         """
@@ -47,22 +61,10 @@ class Vocabulary:
     def ask_parameters(self) -> dict:
         """
         Ask the user for the parameters
-            :return: dictionary with the parameters
-        """
-        self.parameters = {}
-        self.parameters['numbers'] = input('No numbers? (y/n): ').lower()
-        self.parameters['long_words'] = input('No long words? (y/n): ').lower()
-        self.parameters['lowercase'] = input('Lowercase? (y/n): ').lower()
-        self.parameters['punctuation_marks'] = input('No punctuation marks? (y/n): ').lower()
-        self.parameters['stopwords'] = input('No stopwords? (y/n): ').lower()
-        self.parameters['emojis'] = input('No emojis? (y/n/w): ').lower()
-        self.parameters['url_html_hashtags'] = input('No URLs and HTML hashtags? (y/n): ').lower()
-        self.parameters['spell_check'] = input('Spell check? (y/n): ').lower()
-        self.parameters['stemming'] = input('Stemming? (y/n): ').lower()
-        if self.parameters['stemming'] != 'y':
-            self.parameters['lemmatization'] = input('Lemmatization? (y/n): ').lower()
-        else:
-            self.parameters['lemmatization'] = 'n'
+            :return: validated profile with the parameters
+        """
+        self.parameters = ask_profile()
+        return self.parameters
 
     def lowercase(self) -> set[str]:
         """
@@ -86,8 +88,8 @@ class Vocabulary:
         option = self.parameters['punctuation_marks']
         if option == 'y':
             if self.use_set:
-                self.tokens = {re.sub(rf"[{'|'.join(PUNCTUATION_MARKS)}]", '', token) for token in self.tokens if token}
-            self.tokens = [re.sub(rf"[{'|'.join(PUNCTUATION_MARKS)}]", '', token) for token in self.tokens if token]
+                self.tokens = {remove_punctuation_marks(token) for token in self.tokens if token}
+            self.tokens = [remove_punctuation_marks(token) for token in self.tokens if token]
 
     def stopwords(self) -> set[str]:
         """
@@ -98,8 +100,8 @@ class Vocabulary:
         """
         option = self.parameters['stopwords']
         if self.use_set:
-            self.tokens = {token for token in self.tokens if token not in STOP_WORDS} if option == 'y' else self.tokens
-        self.tokens = [token for token in self.tokens if token not in STOP_WORDS] if option == 'y' else self.tokens
+            self.tokens = {token for token in self.tokens if token not in STOP_WORDS_SET} if option == 'y' else self.tokens
+        self.tokens = [token for token in self.tokens if token not in STOP_WORDS_SET] if option == 'y' else self.tokens
 
     def emojis(self) -> set[str]:
         """
@@ -109,6 +111,8 @@ class Vocabulary:
             :return: set without emojis
         """
         option = self.parameters['emojis']
+        if option != 'n':
+            import emoji
         if option == 'y':
             if self.use_set:
                 self.tokens = {emoji.replace_emoji(token, '') for token in self.tokens if token}
@@ -128,17 +132,14 @@ class Vocabulary:
         option = self.parameters['url_html_hashtags']
         if option == 'y':
             if self.use_set:
-                self.tokens = {re.sub(r'http.*|#.*|<.*>|@.*', '', token) for token in self.tokens if token}
-            self.tokens = [re.sub(r'http.*|#.*|<.*>|@.*', '', token) for token in self.tokens if token]
+                self.tokens = {remove_url_html_hashtags(token) for token in self.tokens if token}
+            self.tokens = [remove_url_html_hashtags(token) for token in self.tokens if token]
 
     def load_spell_check(self):
         """
-        Load the spell checker
+        Load the spell checker from its snapshot, it is shared by every vocabulary
         """
-        self.spell_checker = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
-        self.spell_checker.load_dictionary(pkg_resources.resource_filename('symspellpy', 'frequency_dictionary_en_82_765.txt'), term_index=0, count_index=1)
-        self.spell_checker.load_bigram_dictionary(pkg_resources.resource_filename('symspellpy', 'frequency_bigramdictionary_en_243_342.txt'), term_index=0, count_index=1)
-
+        Vocabulary.spell_checker = load_spell_checker(self.spell_snapshot)
 
     def spell_check(self) -> set[str]:
         """
@@ -149,32 +150,61 @@ class Vocabulary:
         """
         option = self.parameters['spell_check']
         if option == 'y':
-            if not self.spell_check_loaded:
-                self.load_spell_check()
-                self.spell_check_loaded = True
+            correct = self.correction_cache()
             result = set()
             if not self.use_set:
                 result = []
             for token in self.tokens:
                 if token:
-                    suggestions = self.spell_checker.lookup_compound(token, max_edit_distance=1)
-                    if suggestions:
-                        term = suggestions[0].term
-                        splitted = term.split(' ')
-                        if self.use_set:
-                            if len(splitted) > 1:
-                                result.add(splitted[0])
-                                result.add(splitted[1])
-                            else:
-                                result.add(term)
-                        else:
-                            if len(splitted) > 1:
-                                result.append(splitted[0])
-                                result.append(splitted[1])
-                            else:
-                                result.append(term)
+                    if self.use_set:
+                        result.update(correct(token))
+                    else:
+                        result.extend(correct(token))
             self.tokens = result
 
+    def correct(self, token: str) -> tuple:
+        """
+        Spell check a token
+            :param token: token to correct
+            :return: first two words of the best suggestion, empty if there is none
+        """
+        if self.spell_checker is None:
+            self.load_spell_check()
+        suggestions = self.spell_checker.lookup_compound(token, max_edit_distance=1)
+        if not suggestions:
+            return ()
+        return tuple(suggestions[0].term.split(' ')[:2])
+
+    def correction_cache(self):
+        """
+        Shared cache of the spell checker, the checker itself is only loaded
+        on the first miss
+            :return: memoized version of correct
+        """
+        return get_cache('spell_check', lambda: self.correct)
+
+    @staticmethod
+    def stemming_cache():
+        """
+        Shared cache of the Porter stemmer
+            :return: memoized version of PorterStemmer.stem
+        """
+        def build():
+            from nltk.stem import PorterStemmer
+            return PorterStemmer().stem
+        return get_cache('stemming', build)
+
+    @staticmethod
+    def lemmatization_cache():
+        """
+        Shared cache of the WordNet lemmatizer
+            :return: memoized version of WordNetLemmatizer.lemmatize for verbs
+        """
+        def build():
+            from nltk.stem import WordNetLemmatizer
+            return partial(WordNetLemmatizer().lemmatize, pos='v')
+        return get_cache('lemmatization', build)
+
     def stemming(self) -> set[str]:
         """
         Stemming the tokens
@@ -184,10 +214,10 @@ class Vocabulary:
         """
         option = self.parameters['stemming']
         if option == 'y':
-            stemmer = PorterStemmer()
+            stem = self.stemming_cache()
             if self.use_set:
-                self.tokens = {stemmer.stem(word) for word in self.tokens if word}
-            self.tokens = [stemmer.stem(word) for word in self.tokens if word]
+                self.tokens = {stem(word) for word in self.tokens if word}
+            self.tokens = [stem(word) for word in self.tokens if word]
 
     def lemmatization(self) -> list[str]:
         """
@@ -198,10 +228,10 @@ class Vocabulary:
         """
         option = self.parameters['lemmatization']
         if option == 'y':
-            lemmatizer = WordNetLemmatizer()
+            lemmatize = self.lemmatization_cache()
             if self.use_set:
-                self.tokens = sorted({lemmatizer.lemmatize(word, pos='v') for word in self.tokens if word})
-            self.tokens = sorted([lemmatizer.lemmatize(word, pos='v') for word in self.tokens if word])
+                self.tokens = sorted({lemmatize(word) for word in self.tokens if word})
+            self.tokens = sorted([lemmatize(word) for word in self.tokens if word])
         self.tokens = sorted(self.tokens)
 
     def numbers(self):
@@ -212,8 +242,8 @@ class Vocabulary:
         """
         if self.parameters['numbers'] == 'y':
             if self.use_set:
-                self.tokens = {token for token in self.tokens if re.match(r'.*\d.*', token) is None}
-            self.tokens = [token for token in self.tokens if re.match(r'.*\d.*', token) is None]
+                self.tokens = {token for token in self.tokens if not has_number(token)}
+            self.tokens = [token for token in self.tokens if not has_number(token)]
 
     def long_words(self) -> set[str]:
         """
@@ -223,56 +253,104 @@ class Vocabulary:
         """
         if self.parameters['long_words'] == 'y':
             if self.use_set:
-                self.tokens = {token for token in self.tokens if len(token) < 20}
-            self.tokens = [token for token in self.tokens if len(token) < 20]
+                self.tokens = {token for token in self.tokens if len(token) < LONG_WORD_LENGTH}
+            self.tokens = [token for token in self.tokens if len(token) < LONG_WORD_LENGTH]
+
+    def compile(self) -> Pipeline:
+        """
+        Compile the pipeline for the current parameters, it is only rebuilt
+        when the parameters change
+            :return: compiled pipeline
+        """
+        if self.pipeline is None or self.pipeline.parameters != self.parameters:
+            self.pipeline = Pipeline(self)
+        return self.pipeline
 
-    def tokenize(self, tokens: list[str], use_set: bool = True) -> list[str]:
+    def tokenize(self, tokens: list[str], use_set: bool = True, compiled: bool = False) -> list[str]:
         """
         Tokenize the text
             :param tokens: text to tokenize
+            :param use_set: remove duplicated tokens
+            :param compiled: run all the stages in a single pass over the tokens
             :return: list of tokens in alphabetic order
         """
-        self.tokens = tokens
         self.use_set = use_set
-        self.numbers()
+        if compiled:
+            pipeline = self.compile()
+            yield 'Pipeline compiled.'
+            self.tokens = pipeline.run(tokens, use_set)
+            yield 'Tokens normalized.'
+            return
+        self.tokens = tokens
+        self.run_stage('numbers')
         yield 'Numbers filtered.'
-        self.long_words()
+        self.run_stage('long_words')
         yield 'Long words filtered.'
-        self.lowercase()
+        self.run_stage('lowercase')
         yield 'Lowercase done.'
-        self.punctuation_marks()
+        self.run_stage('punctuation_marks')
         yield 'Punctuation marks done.'
-        self.stopwords()
+        self.run_stage('stopwords')
         yield 'Stopwords done.'
-        self.emojis()
+        self.run_stage('emojis')
         yield 'Emojis done.'
-        self.url_html_hashtags()
+        self.run_stage('url_html_hashtags')
         yield 'URL-HTML-# done.'
-        self.spell_check()
+        self.run_stage('spell_check')
         yield 'Spell check done.'
-        self.stemming()
+        self.run_stage('stemming')
         yield 'Stemming done.'
-        self.lemmatization()
+        self.run_stage('lemmatization')
         yield 'Lemmatization done.'
 
+    def count(self, filename: str, min_count: int = 1, sketch_width: int = 0, capacity: int = CAPACITY) -> list[str]:
+        """
+        Build the vocabulary from the counts of the normalized tokens, every
+        distinct raw token is normalized once and the rare tokens are dropped.
+        The set mode of tokenize applies every stage twice (stemming takes
+        abrasive to abras and then to abra), here every stage is applied
+        once, so even with a minimum count of 1 the vocabulary is not the
+        one of the default build
+            :param filename: xlsx, csv, jsonl, parquet or arrow file
+            :param min_count: minimum count of a token
+            :param sketch_width: width of the Count-Min sketch, 0 for exact counts
+            :param capacity: maximum number of tokens kept with the sketch
+            :return: list of tokens in alphabetic order
+        """
+        pipeline = self.compile()
+        yield 'Pipeline compiled.'
+        with PROFILER.stage('count_tokens') as record:
+            if sketch_width > 0:
+                self.counts = sketch_vocabulary(pipeline, filename, min_count, capacity, sketch_width)
+            else:
+                self.counts = count_vocabulary(pipeline, filename, min_count)
+            self.tokens = sorted(self.counts)
+            record['tokens_out'] = len(self.tokens)
+        yield 'Tokens counted.'
+
+    def run_stage(self, name: str) -> None:
+        """
+        Run a stage over the tokens, measured by the profiler
+            :param name: name of the stage method
+        """
+        with PROFILER.stage(name, len(self.tokens)) as record:
+            getattr(self, name)()
+            record['tokens_out'] = len(self.tokens)
+
     def write_file(self, filename: str) -> None:
         """
         Write the tokens in a file
-            :param filename: name of the file
+            :param filename: name of the file, .gz and .zst are compressed
             :param tokens: list of tokens
         """
-        with open(filename, 'w', encoding='utf-8') as file:
-            file.write(f'Number_of_words: {len(self.tokens)}\n')
-            for token in self.tokens:
-                file.write(f'{token}\n')
+        write_lines(filename, [f'Number_of_words: {len(self.tokens)}', *self.tokens])
 
     
     def write_json_parameters(self, filename: str) -> None:
         """
         Write the parameters in a json file
         """
-        with open(filename, 'w', encoding='utf-8') as file:
-            json.dump(self.parameters, file, indent=4)
+        write_text(filename, json.dumps(dict(self.parameters), indent=4))
 
     
     def write(self) -> None:
@@ -291,45 +369,87 @@ def parse_arguments(argument_list: list[str]) -> dict:
     """
     input_filename = ''
     output_filename = ''
-    options, arguments = getopt.getopt(argument_list, 'i:o:', ['ifile=', 'ofile='])
-    if len(arguments) != 0 or len(options) != 2:
-        print('vocabulary.py -i <inputfile> -o <outputfile>')
-        sys.exit(2)
+    compression = ''
+    counting = {'min_count': 0, 'sketch_width': 0, 'capacity': CAPACITY}
+    options, arguments = getopt.getopt(argument_list, 'i:o:p:x:z:m:', ['ifile=', 'ofile='] + PREPROCESSING_OPTIONS + PROFILE_OPTIONS + COMPRESS_OPTIONS + COUNTING_OPTIONS)
     for option, argument in options:
         if option in ('-i'):
             input_filename = argument
         elif option in ('-o'):
             output_filename = argument
-    return input_filename, output_filename
+        elif option in ('-z', '--compress'):
+            compression = argument
+        elif option in ('-m', '--min-count'):
+            counting['min_count'] = int(argument)
+        elif option == '--sketch':
+            counting['sketch_width'] = int(argument)
+        elif option == '--capacity':
+            counting['capacity'] = int(argument)
+    if len(arguments) != 0 or not input_filename or not output_filename:
+        print('vocabulary.py -i <inputfile> -o <outputfile> [-z <gz|zst>] [-m <mincount>] [--sketch <width>] [--capacity <tokens>] [-p <profile>] [-x <parameter>=<option>] [--profile <jsonfile>] [--trace <tracefile>] [--cprofile <statsfile>] [--tracemalloc]')
+        print('  -m and --sketch count the tokens and apply every stage once, the default build applies them twice,')
+        print('  so even -m 1 gives a different vocabulary from the default build')
+        sys.exit(2)
+    # The sketch is a way of counting, it implies a minimum count of 1
+    if counting['sketch_width'] > 0:
+        counting['min_count'] = max(counting['min_count'], 1)
+    PROFILER.configure(options)
+    return input_filename, output_filename + compression_suffix(compression), profile_from_options(options), counting
 
 def main() -> None:
     """
     Main function
     - Parse the arguments
-    - Ask the user for the parameters
-    - Read the input file
-    - Tokenize the text
+    - Take the parameters from the profile, or ask the user for them
+    - Read the distinct words of the input file in chunks
+    - Tokenize the text, unless it was already tokenized with the same parameters
+    - With a minimum count, count the normalized tokens and drop the rare ones instead,
+      every stage is applied once so it is not the vocabulary of the default build
     - Write the tokens in a output file
     """
+    from alive_progress import alive_bar
     YELLOW = '\033[33m'
     GREEN = '\033[32m'
     RESET = '\033[0m'
-    MAX = 10
-    input_filename, output_filename = parse_arguments(sys.argv[1:])
-    vocabulary = Vocabulary(output_filename, True)
-    data_frame = pandas.read_excel(input_filename, header=None)
-    all_text = data_frame.iloc[:, 0].str.cat(sep=' ')
+    MAX = 2
+    input_filename, output_filename, profile, counting = parse_arguments(sys.argv[1:])
+    vocabulary = Vocabulary(output_filename, profile is None)
+    if profile is not None:
+        vocabulary.parameters = profile
+    vocabulary.spell_snapshot = os.path.join(os.path.dirname(output_filename), SNAPSHOT_NAME)
+    cache_filename = os.path.join(os.path.dirname(output_filename), CACHE_NAME)
+    load_caches(cache_filename)
+    # The tokenized vocabulary is the one of the set mode, the counted one is built every time
+    counted = counting['min_count'] > 0
+    corpus = None if counted else load_tokenized(input_filename, 'vocabulary', vocabulary.parameters)
+    if counted:
+        messages = vocabulary.count(input_filename, **counting)
+    elif corpus is None:
+        words = set()
+        with PROFILER.stage('read_corpus') as record:
+            for chunk in iter_documents(input_filename):
+                words.update(word for text, _ in chunk if isinstance(text, str) for word in text.split())
+            record['tokens_out'] = len(words)
+        messages = vocabulary.tokenize(words, compiled=True)
+    else:
+        vocabulary.tokens = corpus.document(0)
+        messages = iter(['Tokenized vocabulary found.', 'Tokens normalized.'])
     print(YELLOW, end='')
     with alive_bar(MAX) as bar:
         count = 1
-        for message in vocabulary.tokenize(set(all_text.split())):
+        for message in messages:
             if message == 'NO PRINT': pass
             elif (count < MAX): print(RESET + message + YELLOW)
             else: print(RESET + message + GREEN)
             bar()
             count += 1
     print(RESET)
-    vocabulary.write()
+    with PROFILER.stage('write_vocabulary', len(vocabulary.tokens)):
+        vocabulary.write()
+    save_caches(cache_filename)
+    if corpus is None and not counted:
+        save_tokenized(TokenizedCorpus.from_documents([vocabulary.tokens]), input_filename, 'vocabulary', vocabulary.parameters)
+    PROFILER.export()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,62 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Batch Classifier Tests
+"""
+
+import math
+import random
+from batch_classifier import BatchClassifier, UNKNOWN
+from model_file import LanguageModel
+
+def random_models(seed: int, number_models: int = 2) -> list:
+    """
+    Models with random log-probabilities over overlapping vocabularies
+        :param seed: seed of the random numbers
+        :param number_models: number of models
+        :return: list of models like process_language_models returns
+    """
+    generator = random.Random(seed)
+    models = []
+    for _ in range(number_models):
+        words = generator.sample([f'word{index}' for index in range(300)], 200) + [UNKNOWN]
+        log_probs = [math.log(generator.random()) for _ in words]
+        models.append({'probability': math.log(generator.random()), 'words': LanguageModel(words, [1] * len(words), log_probs)})
+    return models
+
+def random_documents(seed: int) -> list[list[str]]:
+    """
+    Documents with known and unknown tokens, and an empty one
+        :param seed: seed of the random numbers
+        :return: list of tokenized documents
+    """
+    generator = random.Random(seed)
+    documents = [[f'word{generator.randrange(400)}' for _ in range(generator.randrange(60))] for _ in range(200)]
+    return documents + [[]]
+
+def score_loop(models: list, documents: list[list[str]]) -> list[list[float]]:
+    """
+    Score the documents one token at a time, like the classifier did
+        :param models: list of models
+        :param documents: list of tokenized documents
+        :return: log-probability of every document for every model
+    """
+    dictionaries = [dict(zip(model['words'].words, model['words'].log_probs.tolist())) for model in models]
+    scores = []
+    for tokens in documents:
+        row = []
+        for model, words in zip(models, dictionaries):
+            total = model['probability']
+            for token in tokens:
+                total += words.get(token, words[UNKNOWN])
+            row.append(total)
+        scores.append(row)
+    return scores
+
+def test_score_is_bit_identical_to_the_loop():
+    for seed in range(3):
+        models = random_models(seed, 2 + seed)
+        documents = random_documents(seed)
+        assert BatchClassifier(models).score(documents).tolist() == score_loop(models, documents)
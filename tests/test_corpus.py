@@ -0,0 +1,100 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Corpus Reader Tests
+"""
+
+import json
+import os
+import pytest
+from vocabulary import CACHE_FOLDER, cache_chunks, cache_filename, file_digest, iter_documents, read_frame
+
+ROWS = [
+    ['Masks work', 'Positive'],
+    ['Nothing, works "here"', 'Negative'],
+    ['', 'Negative'],
+    ['Stay home', None],
+]
+
+def write_rows(folder, extension: str) -> str:
+    """
+    Write the rows in a file without header
+        :param folder: folder of the file
+        :param extension: format of the file
+        :return: name of the file
+    """
+    import pandas
+    filename = str(folder / f'corpus{extension}')
+    frame = pandas.DataFrame(ROWS)
+    if extension == '.csv':
+        frame.to_csv(filename, header=False, index=False)
+    elif extension == '.jsonl':
+        with open(filename, 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(row) + '\n' for row in ROWS)
+    elif extension == '.parquet':
+        frame.rename(columns=str).to_parquet(filename)
+    else:
+        frame.to_excel(filename, header=False, index=False)
+    return filename
+
+def frame_rows(frame) -> list:
+    """
+    Rows of a frame with the missing cells as None and the empty texts as ''
+        :param frame: data frame
+        :return: list of rows
+    """
+    frame = frame.astype(object)
+    return [[value if isinstance(value, str) else None for value in row] for row in frame.values.tolist()]
+
+EXPECTED = [[text or None, label] for text, label in ROWS]
+
+@pytest.mark.parametrize('extension', ['.csv', '.jsonl', '.parquet', '.xlsx'])
+def test_read_frame(tmp_path, extension):
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+    filename = write_rows(tmp_path, extension)
+    # Json and parquet keep the empty text, csv and excel give an empty cell
+    expected = [[text if extension in ('.jsonl', '.parquet') else text or None, label] for text, label in ROWS]
+    frame = read_frame(filename)
+    assert list(frame.columns) == [0, 1]
+    assert frame_rows(frame) == expected
+    assert [list(row) for chunk in iter_documents(filename, 3) for row in chunk] == expected
+
+def test_excel_columnar_copy(tmp_path):
+    filename = write_rows(tmp_path, '.xlsx')
+    first = frame_rows(read_frame(filename))
+    chunks = cache_chunks(cache_filename(filename))
+    assert chunks
+    assert frame_rows(read_frame(filename)) == first == EXPECTED
+    assert [list(row) for chunk in iter_documents(filename) for row in chunk] == EXPECTED
+
+def test_excel_columnar_copy_of_an_older_content_is_removed(tmp_path):
+    import pandas
+    filename = write_rows(tmp_path, '.xlsx')
+    read_frame(filename)
+    old = cache_filename(filename)
+    pandas.DataFrame(ROWS[:2]).to_excel(filename, header=False, index=False)
+    assert frame_rows(read_frame(filename)) == EXPECTED[:2]
+    assert not os.path.exists(old)
+    assert os.path.isdir(cache_filename(filename))
+
+def test_excel_columnar_copy_without_pyarrow(tmp_path, monkeypatch):
+    import vocabulary.corpus
+    monkeypatch.setattr(vocabulary.corpus, 'find_spec', lambda name: None)
+    filename = write_rows(tmp_path, '.xlsx')
+    read_frame(filename)
+    assert all(chunk.endswith('.pkl') for chunk in cache_chunks(cache_filename(filename)))
+    assert frame_rows(read_frame(filename)) == EXPECTED
+
+def test_unreadable_index_is_a_miss(tmp_path):
+    filename = write_rows(tmp_path, '.csv')
+    digest = file_digest(filename)
+    index_filename = os.path.join(tmp_path, CACHE_FOLDER, 'corpus.csv.json')
+    for content in ['{"mtime": 1', '[]', '{}']:
+        with open(index_filename, 'w', encoding='utf-8') as file:
+            file.write(content)
+        assert file_digest(filename) == digest
+        with open(index_filename, 'r', encoding='utf-8') as file:
+            assert json.load(file)['sha256'] == digest
@@ -0,0 +1,78 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Approximate Counting Tests
+"""
+
+import random
+from collections import Counter
+import pytest
+from vocabulary import CountMinSketch, FrequentTokens, Profile, Vocabulary, count_vocabulary, sketch_vocabulary
+
+def zipf_counts(number_tokens: int, seed: int) -> Counter:
+    """
+    Counts with a few frequent tokens and many rare ones
+        :param number_tokens: number of distinct tokens
+        :param seed: seed of the generator
+        :return: count of every token
+    """
+    generator = random.Random(seed)
+    return Counter({f'token{rank}': max(1, int(5000 / (rank + 1))) + generator.randint(0, 3) for rank in range(number_tokens)})
+
+@pytest.mark.parametrize('width', [16, 256, 1 << 16])
+def test_sketch_never_undercounts(width):
+    counts = zipf_counts(2000, width)
+    sketch = CountMinSketch(width, 4)
+    tokens = list(counts)
+    # The counts arrive in several chunks, like the chunks of a file
+    for start in range(0, len(tokens), 300):
+        sketch.add(tokens[start:start + 300], [counts[token] for token in tokens[start:start + 300]])
+    sketch.add(tokens[:10], [1] * 10)
+    counts.update(tokens[:10])
+    estimates = sketch.estimate(tokens).tolist()
+    assert sketch.total == sum(counts.values())
+    assert all(estimate >= counts[token] for token, estimate in zip(tokens, estimates))
+    # The error is bounded by e / width of the total with a high probability
+    errors = [estimate - counts[token] for token, estimate in zip(tokens, estimates)]
+    assert sum(error > 2.72 * sketch.total / width for error in errors) <= len(tokens) * 0.05
+    if width == 1 << 16:
+        assert sum(error > 0 for error in errors) <= len(tokens) * 0.01
+
+def test_sketch_is_reproducible():
+    first, second = CountMinSketch(64, 3), CountMinSketch(64, 3)
+    first.add(['covid', 'masks'], [3, 4])
+    second.add(['covid', 'masks'], [3, 4])
+    assert (first.table == second.table).all()
+    assert first.estimate([]).tolist() == []
+    with pytest.raises(Exception, match='must be positive'):
+        CountMinSketch(0, 4)
+
+@pytest.mark.parametrize('width', [32, 1 << 12])
+def test_frequent_tokens_keep_every_frequent_token(width):
+    counts = zipf_counts(1500, 7)
+    frequent = FrequentTokens(min_count=20, capacity=len(counts), width=width)
+    tokens = list(counts)
+    generator = random.Random(3)
+    generator.shuffle(tokens)
+    for start in range(0, len(tokens), 200):
+        frequent.update(Counter({token: counts[token] for token in tokens[start:start + 200]}))
+    result = frequent.result()
+    assert {token for token, count in counts.items() if count >= 20} <= set(result)
+    assert all(estimate >= counts[token] >= 1 for token, estimate in result.items())
+    assert all(estimate >= 20 for estimate in result.values())
+
+def test_sketch_vocabulary_against_exact_counts(tmp_path):
+    generator = random.Random(5)
+    words = ['Masks', 'masks!', 'MASKS', 'vaccine', 'Vaccine.', 'home', 'stay', 'the', 'virus', 'covid19'] + [f'rare{number}' for number in range(300)]
+    filename = tmp_path / 'corpus.csv'
+    filename.write_text(''.join(f'{" ".join(generator.choices(words, k=8))},Positive\n' for _ in range(400)), encoding='utf-8')
+    vocabulary = Vocabulary('')
+    vocabulary.parameters = Profile({'lowercase': 'y', 'punctuation_marks': 'y'})
+    pipeline = vocabulary.compile()
+    exact = count_vocabulary(pipeline, str(filename), min_count=3)
+    approximate = sketch_vocabulary(pipeline, str(filename), min_count=3, capacity=10000, width=64)
+    assert set(exact) <= set(approximate)
+    assert all(approximate[token] >= frequency for token, frequency in exact.items())
+    assert sketch_vocabulary(pipeline, str(filename), min_count=3, capacity=10000) == exact
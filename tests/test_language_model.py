@@ -0,0 +1,95 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Language Model Training Tests
+"""
+
+import csv
+import os
+import random
+import subprocess
+import sys
+import pytest
+from conftest import SRC
+
+WORDS = ['Vaccine', 'vaccines', 'mask', 'masks!', 'lockdown', 'COVID19', '#covid', 'hospital', 'hospitals', 'stay', 'home', 'good', 'bad', 'news', 'https://t.co/x', 'running', 'ran', 'cases', 'case', '2020']
+
+def write_corpus(filename: str, rows: list[tuple]) -> None:
+    """
+    Write a corpus without header
+        :param filename: csv file
+        :param rows: (text, class) rows
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'w', encoding='utf-8', newline='') as file:
+        csv.writer(file).writerows(rows)
+
+def run(folder: str, script: str, *arguments: str) -> None:
+    """
+    Run a script of src in a folder, it reads and writes its out folder
+        :param folder: working folder
+        :param script: script relative to src
+        :param arguments: arguments of the script
+    """
+    subprocess.run([sys.executable, os.path.join(SRC, script), *arguments], cwd=folder, check=True, capture_output=True)
+
+def read(filename: str) -> bytes:
+    with open(filename, 'rb') as file:
+        return file.read()
+
+@pytest.fixture(scope='module')
+def workspace(tmp_path_factory):
+    """
+    Folder with a random corpus split in two parts, its vocabulary and the
+    models trained serially on the whole corpus
+        :return: path of the folder
+    """
+    folder = str(tmp_path_factory.mktemp('workspace'))
+    os.makedirs(os.path.join(folder, 'out'))
+    generator = random.Random(0)
+    rows = [(' '.join(generator.choices(WORDS, k=generator.randrange(1, 15))), generator.choice(['Positive', 'Negative'])) for _ in range(400)]
+    write_corpus(os.path.join(folder, 'data', 'full.csv'), rows)
+    write_corpus(os.path.join(folder, 'part1', 'train.csv'), rows[:250])
+    write_corpus(os.path.join(folder, 'part2', 'train.csv'), rows[250:])
+    write_corpus(os.path.join(folder, 'workers', 'full.csv'), rows)
+    run(folder, 'vocabulary/vocabulary.py', '-i', 'data/full.csv', '-o', 'out/vocabulary.txt', '-p', 'fast')
+    run(folder, 'language_model.py', '-i', 'data/full.csv', '-o', 'out/serial')
+    return folder
+
+def assert_same_models(folder: str, prefix: str) -> None:
+    for class_doc in ('positive', 'negative'):
+        assert read(os.path.join(folder, 'out', f'{prefix}_{class_doc}.txt')) == read(os.path.join(folder, 'out', f'serial_{class_doc}.txt'))
+
+def test_workers_match_serial(workspace):
+    # A copy in another folder has no cached tokens, so the workers tokenize it
+    run(workspace, 'language_model.py', '-i', 'workers/full.csv', '-o', 'out/workers', '-w', '2')
+    assert_same_models(workspace, 'workers')
+
+def test_stream_matches_serial(workspace):
+    run(workspace, 'language_model.py', '-i', 'data/full.csv', '-o', 'out/stream', '-s', '37')
+    assert_same_models(workspace, 'stream')
+
+def test_update_matches_full_training(workspace):
+    run(workspace, 'language_model.py', '-i', 'part1/train.csv', '-o', 'out/update')
+    run(workspace, 'language_model.py', '-i', 'part2/train.csv', '-o', 'out/update', '-u')
+    assert_same_models(workspace, 'update')
+
+def test_three_classes(workspace):
+    generator = random.Random(1)
+    classes = ['Positive', 'Negative', 'Neutral']
+    rows = [(' '.join(generator.choices(WORDS, k=generator.randrange(1, 15))), classes[number % 3]) for number in range(90)]
+    write_corpus(os.path.join(workspace, 'three', 'train.csv'), rows)
+    output = subprocess.run([sys.executable, os.path.join(SRC, 'language_model.py'), '-i', 'three/train.csv', '-o', 'out/three'], cwd=workspace, check=True, capture_output=True, text=True).stdout
+    assert '(!)' not in output
+    for class_doc in classes:
+        with open(os.path.join(workspace, 'out', f'three_{class_doc.lower()}.txt'), encoding='utf-8') as file:
+            assert file.readline() == 'Number_of_documents: 30\n'
+
+def test_classes_that_only_differ_in_case(workspace):
+    write_corpus(os.path.join(workspace, 'case', 'train.csv'), [('good news', 'Positive'), ('bad news', 'positive')])
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        run(workspace, 'language_model.py', '-i', 'case/train.csv', '-o', 'out/case')
+    assert b'only differ in case' in error.value.stderr
+    assert not os.path.exists(os.path.join(workspace, 'out', 'case_positive.txt'))
@@ -0,0 +1,51 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Model File Tests
+"""
+
+import pytest
+from batch_classifier import BatchClassifier
+from model_file import UNKNOWN, LanguageModel, BinaryModel, convert, read_text_model, write_binary_model, write_text_model
+from test_batch_classifier import random_documents, random_models, score_loop
+
+# The trained models have the words in alphabetic order and <UNK> last
+MODEL = LanguageModel(
+    ['Word:colon', 'covid', 'vaccin', 'word with spaces', 'ñandú', UNKNOWN],
+    [2, 12, 5, 2, 3, 40],
+    [-6.0001, -3.25, -4.125, -6.0001, -5.5, -1.75],
+)
+
+@pytest.mark.parametrize('suffix', ['', '.gz'])
+def test_text_binary_round_trip(tmp_path, suffix):
+    text_filename = str(tmp_path / f'model.txt{suffix}')
+    binary_filename = str(tmp_path / 'model.bin')
+    copy_filename = str(tmp_path / f'copy.txt{suffix}')
+    write_text_model(text_filename, 7, MODEL)
+    convert(text_filename, binary_filename)
+    binary_model = BinaryModel(binary_filename)
+    assert binary_model.number_documents == 7
+    for word, log_prob in zip(MODEL.words, MODEL.log_probs.tolist()):
+        assert binary_model[word] == log_prob
+    assert 'missing' not in binary_model
+    binary_model.close()
+    convert(binary_filename, copy_filename)
+    number_documents, model = read_text_model(copy_filename)
+    assert number_documents == 7
+    assert model.words == MODEL.words
+    assert model.frecs.tolist() == MODEL.frecs.tolist()
+    assert model.log_probs.tolist() == MODEL.log_probs.tolist()
+    if not suffix:
+        assert open(copy_filename, 'rb').read() == open(text_filename, 'rb').read()
+
+def test_score_with_binary_models(tmp_path):
+    models = random_models(7)
+    documents = random_documents(7)
+    binary_models = []
+    for number, model in enumerate(models):
+        filename = str(tmp_path / f'model_{number}.bin')
+        write_binary_model(filename, 10, model['words'])
+        binary_models.append({'probability': model['probability'], 'words': BinaryModel(filename)})
+    assert BatchClassifier(binary_models).score(documents).tolist() == score_loop(models, documents)
@@ -0,0 +1,81 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+N-gram Model Tests
+"""
+
+import pickle
+import numpy
+import pytest
+from ngram_model import MAX_ORDER, NgramModel
+
+TOKENS = sorted(['covid', 'masks', 'vaccine', 'stay', 'home', 'virus', 'ñandú', 'good', 'bad'])
+CLASSES = ['Positive', 'Negative', 'Neutral']
+
+def train(order: int, seed: int = 0) -> NgramModel:
+    """
+    Train the models of the classes over random documents
+        :param order: number of tokens of the longest n-grams
+        :param seed: seed of the generator
+        :return: n-gram model
+    """
+    generator = numpy.random.default_rng(seed)
+    lengths = generator.integers(0, 12, 60)
+    starts = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+    numpy.cumsum(lengths, out=starts[1:])
+    # The ids go up to <UNK>, the id after the last token
+    ids = generator.integers(0, len(TOKENS) + 1, int(starts[-1]))
+    groups = generator.integers(-1, len(CLASSES), len(lengths))
+    unigram = numpy.log(generator.dirichlet(numpy.ones(len(TOKENS) + 2), len(CLASSES)))
+    priors = numpy.log(numpy.array([0.5, 0.3, 0.2]))
+    return NgramModel.train(order, CLASSES, TOKENS, priors, unigram, ids, starts, groups)
+
+DOCUMENTS = [
+    ['covid', 'masks', 'masks', 'home'],
+    [],
+    ['unknown', 'ñandú', 'good', 'unknown', 'bad', 'virus', 'stay', 'home'],
+    ['vaccine'],
+]
+
+@pytest.mark.parametrize('order', [1, 2, 3, MAX_ORDER])
+def test_save_load_score(tmp_path, order):
+    model = train(order)
+    scores = model.score(DOCUMENTS)
+    assert scores.shape == (len(DOCUMENTS), len(CLASSES))
+    assert numpy.isfinite(scores).all()
+    assert scores[1].tolist() == model.priors.tolist()
+    filename = str(tmp_path / 'models' / 'language_model_ngrams.npz')
+    model.save(filename)
+    loaded = NgramModel.load(filename)
+    assert (loaded.order, loaded.classes, loaded.index.tokens) == (order, CLASSES, TOKENS)
+    for keys, loaded_keys in zip(model.keys, loaded.keys):
+        assert keys.tolist() == loaded_keys.tolist()
+    assert loaded.score(DOCUMENTS).tolist() == scores.tolist()
+    assert pickle.loads(pickle.dumps(model)).score(DOCUMENTS).tolist() == scores.tolist()
+
+def test_unigram_scores():
+    model = train(1)
+    for document, scores in zip(DOCUMENTS, model.score(DOCUMENTS).tolist()):
+        ids = model.index.encode(document)
+        expected = [prior + sum(unigram[ids]) for prior, unigram in zip(model.priors.tolist(), model.unigram)]
+        assert scores == pytest.approx(expected)
+    # The longer n-grams change the scores of the documents with more than one token
+    assert train(3).score(DOCUMENTS)[0].tolist() != model.score(DOCUMENTS)[0].tolist()
+
+def test_select_classes(tmp_path):
+    model = train(3)
+    scores = model.score(DOCUMENTS)
+    model.save(str(tmp_path / 'model.npz'))
+    selected = NgramModel.load(str(tmp_path / 'model.npz')).select(['negative', 'POSITIVE'])
+    assert selected.classes == ['Negative', 'Positive']
+    assert selected.score(DOCUMENTS).tolist() == scores[:, [1, 0]].tolist()
+    with pytest.raises(Exception, match='No n-gram model of the classes other'):
+        selected.select(['other'])
+
+def test_errors(tmp_path):
+    with pytest.raises(Exception, match='order of the n-grams'):
+        train(MAX_ORDER + 1)
+    with pytest.raises(Exception, match='No n-gram model file'):
+        NgramModel.load(str(tmp_path / 'missing.npz'))
@@ -0,0 +1,61 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Output Files Tests
+"""
+
+import os
+import pytest
+from vocabulary import UMASK, compression_suffix, find_output, open_text, replace_file, write_lines, write_text
+
+LINES = ['Palabras: 3', 'ñandú Frec: 2 LogProb: -1.5', '😷', '']
+
+@pytest.mark.parametrize('compression', ['', 'gz', 'zst'])
+def test_round_trip(tmp_path, compression):
+    if compression == 'zst':
+        pytest.importorskip('zstandard')
+    filename = str(tmp_path / 'model.txt') + compression_suffix(compression)
+    write_lines(filename, LINES)
+    with open_text(filename) as file:
+        assert file.read().split('\n')[:-1] == LINES
+    first = open(filename, 'rb').read()
+    write_lines(filename, LINES)
+    # The same text always gives the same file
+    assert open(filename, 'rb').read() == first
+    write_lines(filename, [])
+    with open_text(filename) as file:
+        assert file.read() == ''
+
+def test_replace_file_is_atomic(tmp_path):
+    filename = str(tmp_path / 'vocabulary.txt')
+    write_text(filename, 'old\n')
+    with replace_file(filename) as file:
+        file.write(b'new\n')
+        file.flush()
+        # Until the block ends the readers see the old file
+        assert open(filename, 'r', encoding='utf-8').read() == 'old\n'
+    assert open(filename, 'r', encoding='utf-8').read() == 'new\n'
+    assert os.stat(filename).st_mode & 0o777 == 0o666 & ~UMASK
+    with pytest.raises(RuntimeError):
+        with replace_file(filename) as file:
+            file.write(b'part')
+            raise RuntimeError('the writer failed')
+    # A failed writer keeps the old file and leaves no temporary file
+    assert open(filename, 'r', encoding='utf-8').read() == 'new\n'
+    assert os.listdir(tmp_path) == ['vocabulary.txt']
+
+def test_find_output(tmp_path):
+    filename = str(tmp_path / 'language_model_positive.txt')
+    assert find_output(filename) is None
+    write_text(filename + '.gz', 'compressed\n')
+    assert find_output(filename) == filename + '.gz'
+    write_text(filename, 'plain\n')
+    os.utime(filename + '.gz', (0, 0))
+    assert find_output(filename) == filename
+
+def test_unknown_compression():
+    assert compression_suffix('') == ''
+    with pytest.raises(Exception, match='Unknown compression'):
+        compression_suffix('bz2')
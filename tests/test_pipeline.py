@@ -0,0 +1,50 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Compiled Pipeline Tests
+"""
+
+import pytest
+from vocabulary import Vocabulary, Profile
+
+TEXT = (
+    'Running RUNNERS ran 2020 covid19 #COVID19 https://t.co/abc <b>bold</b> the and a of '
+    '😷 masks masks!! abrasive abrasive supercalifragilisticexpialidociousness Ok ok OK helo wrld'
+)
+
+PROFILES = [
+    {'numbers': 'y', 'long_words': 'y', 'lowercase': 'y', 'punctuation_marks': 'y', 'stopwords': 'y', 'emojis': 'y', 'url_html_hashtags': 'y', 'stemming': 'y'},
+    {'lowercase': 'y', 'emojis': 'w'},
+    {'lowercase': 'y', 'punctuation_marks': 'y', 'url_html_hashtags': 'y', 'spell_check': 'y', 'stemming': 'y'},
+]
+
+def tokenize(parameters: dict, use_set: bool, compiled: bool, snapshot: str) -> list[str]:
+    """
+    Tokens of the text with a new vocabulary
+        :param parameters: preprocessing parameters
+        :param use_set: remove duplicated tokens
+        :param compiled: use the compiled pipeline
+        :param snapshot: snapshot of the spell checker
+        :return: list of tokens
+    """
+    vocabulary = Vocabulary('')
+    vocabulary.parameters = Profile(parameters)
+    vocabulary.spell_snapshot = snapshot
+    for _ in vocabulary.tokenize(TEXT.split(), use_set, compiled):
+        pass
+    return vocabulary.tokens
+
+@pytest.mark.parametrize('parameters', PROFILES)
+@pytest.mark.parametrize('use_set', [True, False])
+def test_compiled_matches_step_by_step(parameters, use_set, tmp_path):
+    snapshot = str(tmp_path / 'spell_checker.pickle')
+    expected = tokenize(parameters, use_set, False, snapshot)
+    assert tokenize(parameters, use_set, True, snapshot) == expected
+
+def test_stream_keeps_the_order_of_the_text():
+    vocabulary = Vocabulary('')
+    vocabulary.parameters = Profile(PROFILES[0])
+    tokens = list(vocabulary.compile().stream(TEXT.split()))
+    assert sorted(tokens) == tokenize(PROFILES[0], False, True, '')
@@ -0,0 +1,67 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Preprocessing Profile Tests
+"""
+
+import json
+import pickle
+import pytest
+from vocabulary import PARAMETERS, PROFILES, Profile, load_profile, profile_from_options
+
+def test_defaults_and_aliases():
+    profile = Profile({'lowercase': 'Yes', 'emojis': ' words ', 'stopwords': True})
+    assert list(profile) == list(PARAMETERS)
+    assert profile['lowercase'] == 'y'
+    assert profile['emojis'] == 'w'
+    assert profile['stopwords'] == 'y'
+    assert all(profile[name] == options[0] for name, (_, options) in PARAMETERS.items() if name not in ('lowercase', 'emojis', 'stopwords'))
+    assert Profile(profile) == profile
+    assert hash(Profile(profile.to_dict())) == hash(profile)
+
+@pytest.mark.parametrize('parameters, message', [
+    ({'lowercas': 'y'}, 'Unknown preprocessing parameter lowercas'),
+    ({'lowercase': 'w'}, "Invalid option 'w' for lowercase"),
+    ({'emojis': 'maybe'}, "Invalid option 'maybe' for emojis"),
+    ({'stemming': 'y', 'lemmatization': 'y'}, 'Stemming and lemmatization can not be used together'),
+])
+def test_invalid_parameters(parameters, message):
+    with pytest.raises(Exception, match=message):
+        Profile(parameters)
+
+def test_immutable():
+    profile = Profile({'lowercase': 'y'})
+    with pytest.raises(AttributeError):
+        profile.lowercase = 'n'
+    with pytest.raises(AttributeError):
+        profile._values = {}
+    with pytest.raises(TypeError):
+        profile['lowercase'] = 'n'
+    values = profile.to_dict()
+    values['lowercase'] = 'n'
+    assert profile['lowercase'] == 'y'
+    changed = profile.replace(lowercase='n', stemming='y')
+    assert (profile['lowercase'], profile['stemming']) == ('y', 'n')
+    assert (changed['lowercase'], changed['stemming']) == ('n', 'y')
+    with pytest.raises(Exception, match='Stemming and lemmatization'):
+        changed.replace(lemmatization='y')
+    assert pickle.loads(pickle.dumps(profile)) == profile
+
+def test_load_profile(tmp_path):
+    for name, parameters in PROFILES.items():
+        assert load_profile(name) == Profile(parameters)
+    filename = tmp_path / 'parameters.json'
+    filename.write_text(json.dumps({'lowercase': 'y', 'numbers': 'yes'}), encoding='utf-8')
+    assert load_profile(str(filename)) == Profile(lowercase='y', numbers='y')
+    with pytest.raises(Exception, match='No profile'):
+        load_profile(str(tmp_path / 'missing.json'))
+
+def test_profile_from_options():
+    assert profile_from_options([('-w', '2')]) is None
+    source = next(iter(PROFILES))
+    profile = profile_from_options([('-p', source), ('-x', 'stemming=n'), ('--set', 'lowercase=y')])
+    assert profile == Profile(PROFILES[source], stemming='n', lowercase='y')
+    with pytest.raises(Exception, match='Invalid option lowercase'):
+        profile_from_options([('-x', 'lowercase')])
@@ -0,0 +1,87 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Batch Scheduler Tests
+"""
+
+import asyncio
+import threading
+import pytest
+from scheduler import BatchScheduler
+
+async def serve(scheduler: BatchScheduler, requests: list[list[str]]) -> list:
+    """
+    Submit the requests at the same time and wait for all of them
+        :param scheduler: scheduler to test
+        :param requests: texts of every request
+        :return: results of every request, or its exception
+    """
+    dispatcher = asyncio.create_task(scheduler.run())
+    try:
+        return await asyncio.gather(*(scheduler.submit(texts) for texts in requests), return_exceptions=True)
+    finally:
+        dispatcher.cancel()
+
+def test_batches_keep_the_results_of_every_request():
+    batches = []
+    def function(texts):
+        batches.append(list(texts))
+        return [text.upper() for text in texts]
+    requests = [[f'text {number} {index}' for index in range(number % 3 + 1)] for number in range(40)]
+    scheduler = BatchScheduler(function, max_batch_size=8, max_wait=0.01)
+    results = asyncio.run(serve(scheduler, requests))
+    assert results == [[text.upper() for text in texts] for texts in requests]
+    assert sorted(text for batch in batches for text in batch) == sorted(text for texts in requests for text in texts)
+    # A request is never split, so a batch only goes over the size with its last request
+    assert all(len(batch) < 8 + 3 for batch in batches)
+    assert len(batches) < len(requests)
+    metrics = scheduler.metrics()
+    assert metrics['requests'] == len(requests)
+    assert metrics['batches'] == len(batches)
+    assert metrics['failed_requests'] == 0
+    assert metrics['queue_depth'] == 0
+    assert metrics['mean_batch_size'] == sum(map(len, requests)) / len(batches)
+    assert metrics['latency_p50_ms'] <= metrics['latency_p99_ms']
+
+def test_failed_requests_are_counted():
+    def function(texts):
+        raise ValueError('broken model')
+    scheduler = BatchScheduler(function, max_batch_size=4)
+    results = asyncio.run(serve(scheduler, [['a'], ['b', 'c'], ['d']]))
+    assert all(isinstance(result, ValueError) for result in results)
+    metrics = scheduler.metrics()
+    assert metrics['requests'] == metrics['failed_requests'] == 3
+    assert metrics['latency_p99_ms'] > 0
+    assert metrics['in_flight'] == 0
+
+@pytest.mark.parametrize('max_in_flight', [1, 2])
+def test_next_batch_is_collected_while_scoring(max_in_flight):
+    release = threading.Event()
+    started = threading.Semaphore(0)
+    batches = []
+    def function(texts):
+        batches.append(list(texts))
+        started.release()
+        release.wait(5)
+        return texts
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        scheduler = BatchScheduler(function, max_batch_size=4, max_in_flight=max_in_flight)
+        dispatcher = asyncio.create_task(scheduler.run())
+        first = asyncio.create_task(scheduler.submit(['a']))
+        await loop.run_in_executor(None, started.acquire)
+        second = asyncio.create_task(scheduler.submit(['b']))
+        # The second batch starts while the first one is still scored
+        scoring = await loop.run_in_executor(None, started.acquire, True, 0.5)
+        release.set()
+        results = await asyncio.gather(first, second)
+        dispatcher.cancel()
+        return scoring, results
+
+    scoring, results = asyncio.run(scenario())
+    assert scoring == (max_in_flight > 1)
+    assert results == [['a'], ['b']]
+    assert batches == [['a'], ['b']]
@@ -0,0 +1,84 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Classification Server Tests
+"""
+
+import asyncio
+import json
+import os
+import pytest
+from vocabulary import Profile, Vocabulary
+from model_file import UNKNOWN, LanguageModel, write_binary_model, write_text_model
+from batch_classifier import BatchClassifier
+from clasificator import CLASSES, classify, process_language_models, search_language_model, tokenize_document
+from scheduler import BatchScheduler
+from server import Classifier, handle_request
+
+PARAMETERS = {'lowercase': 'y', 'punctuation_marks': 'y'}
+
+MODELS = {
+    'positive': (30, LanguageModel(['good', 'masks', 'vaccine', UNKNOWN], [9, 4, 6, 1], [-1.2, -2.0, -1.6, -4.0])),
+    'negative': (10, LanguageModel(['bad', 'masks', 'virus', UNKNOWN], [7, 2, 5, 1], [-1.1, -2.3, -1.4, -3.5])),
+}
+
+TEXTS = ['Good vaccine!', 'BAD virus, bad masks', 'nothing known here', '']
+
+@pytest.fixture
+def folder(tmp_path):
+    """
+    Model folder that is not ./out
+    """
+    with open(tmp_path / 'parameters.json', 'w', encoding='utf-8') as file:
+        json.dump(dict(Profile(PARAMETERS)), file)
+    for class_doc, (number_documents, model) in MODELS.items():
+        write_text_model(str(tmp_path / f'language_model_{class_doc}.txt'), number_documents, model)
+        write_binary_model(str(tmp_path / f'language_model_{class_doc}.bin'), number_documents, model)
+    return str(tmp_path)
+
+def expected_results(folder: str) -> list[dict]:
+    """
+    Results of the command line classifier for the texts
+        :param folder: model folder
+        :return: class and log-probabilities of every text
+    """
+    vocabulary = Vocabulary('')
+    vocabulary.parameters = Profile(PARAMETERS)
+    results, documents = [], []
+    for text in TEXTS:
+        result, tokens = tokenize_document(vocabulary, text)
+        results.append(result)
+        documents.append(tokens)
+    classify(results, BatchClassifier(process_language_models(search_language_model(folder))).score(documents).tolist())
+    return [{'class': result['class'], 'log_probabilities': {'positive': result['prob_model_0'], 'negative': result['prob_model_1']}} for result in results]
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_classify_from_the_model_folder(folder, binary):
+    classifier = Classifier(binary, folder)
+    assert all(os.path.dirname(filename) == folder for filename in classifier.files())
+    results = classifier.classify(TEXTS)
+    assert results == expected_results(folder)
+    assert all(list(result['log_probabilities']) == CLASSES for result in results)
+    assert [result['class'] for result in results[:2]] == ['positive', 'negative']
+
+def test_handle_request(folder):
+    classifier = Classifier(False, folder)
+
+    async def scenario():
+        scheduler = BatchScheduler(classifier.classify)
+        dispatcher = asyncio.create_task(scheduler.run())
+        responses = await asyncio.gather(
+            handle_request(scheduler, json.dumps({'texts': TEXTS}).encode('utf-8')),
+            handle_request(scheduler, json.dumps({'text': TEXTS[0]}).encode('utf-8')),
+            handle_request(scheduler, b'{"texts": [1]}'),
+        )
+        dispatcher.cancel()
+        return responses
+
+    expected = expected_results(folder)
+    many, one, error = asyncio.run(scenario())
+    assert many == {'results': expected}
+    assert one == {'result': expected[0]}
+    assert 'error' in error
@@ -0,0 +1,85 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Parameter Sweep Tests
+"""
+
+import math
+import random
+from collections import Counter
+import pytest
+from vocabulary import Profile, Vocabulary, VocabularyIndex, stage_error, tokenize_texts
+from language_model import token_probabilities
+from batch_classifier import BatchClassifier
+from clasificator import tokenize_document
+import sweep
+
+WORDS = [
+    'the', 'and', 'of', 'Masks', 'masks', 'MASKS!!', 'vaccine', 'vaccines,', 'running', 'runner', 'ran',
+    '2020', 'covid19', '#COVID19', '@who', 'https://t.co/abc', '<b>bold</b>', '😷', 'ok', 'OK',
+    'supercalifragilisticexpialidociousness', 'stay', 'home', 'Home.', 'bad', 'good', 'virus',
+]
+
+# The spell checker and the lemmatizer load big resources, the sweep of the
+# other stages is enough to compare the shared prefixes with a single run
+FIXED = {'long_words': 'n', 'spell_check': 'n', 'lemmatization': 'n'}
+
+def corpus(number_documents: int, seed: int) -> tuple:
+    """
+    Random documents with a class that depends on some of their words
+        :param number_documents: number of documents
+        :param seed: seed of the generator
+        :return: texts and classes
+    """
+    generator = random.Random(seed)
+    texts, classes = [], []
+    for _ in range(number_documents):
+        tokens = generator.choices(WORDS, k=generator.randint(3, 12))
+        texts.append(' '.join(tokens))
+        positive = sum(token.lower().strip('.,!') in ('good', 'vaccine', 'home') for token in tokens)
+        classes.append('Positive' if positive * 2 >= len(tokens) / 4 else 'Negative')
+    return texts, classes
+
+def single_run(parameters: Profile, train: tuple, test: tuple) -> dict:
+    """
+    Build the vocabulary, train and classify like the scripts do for one combination
+        :param parameters: preprocessing parameters
+        :param train: texts and classes of the training corpus
+        :param test: texts and classes of the test corpus
+        :return: size of the vocabulary and accuracy
+    """
+    vocabulary = Vocabulary('')
+    vocabulary.parameters = parameters
+    for _ in vocabulary.tokenize({word for text in train[0] for word in text.split()}, compiled=True):
+        pass
+    index = VocabularyIndex(sorted(vocabulary.tokens))
+    documents = tokenize_texts(vocabulary, train[0])
+    models = []
+    for class_doc in sweep.CLASSES:
+        counts = Counter(token for tokens, current in zip(documents, train[1]) if current == class_doc for token in tokens)
+        *_, model = token_probabilities(index, index.count(counts))
+        models.append({'probability': math.log(train[1].count(class_doc) / len(train[1])), 'words': model})
+    scores = BatchClassifier(models).score([tokenize_document(vocabulary, text)[1] for text in test[0]]).tolist()
+    predicted = ['positive' if positive > negative else 'negative' for positive, negative in scores]
+    accuracy = sum(label == current.lower() for label, current in zip(predicted, test[1])) / len(test[1])
+    return {'vocabulary_size': index.size, 'accuracy': accuracy}
+
+def test_sweep_matches_single_runs():
+    train, test = corpus(120, 1), corpus(40, 2)
+    state, documents = sweep.root_state(*train, sweep.test_corpus(*test)[0])
+    counter = Counter()
+    results = list(sweep.sweep(Vocabulary(''), state, [], sweep.choices(FIXED), documents, sweep.test_corpus(*test), counter))
+    assert len(results) == sweep.count_leaves(sweep.choices(FIXED))[0]
+    assert counter['failed'] == 0
+    # The prefixes are shared, so the sweep runs far fewer stages than a run per combination
+    assert counter['stages'] < sweep.count_leaves(sweep.choices(FIXED))[1]
+    for result in results:
+        expected = single_run(Profile(result['parameters']), train, test)
+        assert result['vocabulary_size'] == expected['vocabulary_size'], result['parameters']
+        assert result['accuracy'] == pytest.approx(expected['accuracy']), result['parameters']
+
+def test_stage_error_keeps_the_first_line():
+    error = LookupError('\n**********\n  Resource wordnet not found.\n  Please use the NLTK Downloader\n**********\n')
+    assert stage_error(error) == 'LookupError Resource wordnet not found.'
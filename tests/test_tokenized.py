@@ -0,0 +1,72 @@
+"""
+Universidad de La Laguna
+Grado en Ingeniería Informática
+Inteligencia Artificial Avanzada - Proyecto
+Daniel Hernández de León - alu0101331720
+Tokenized Corpus Cache Tests
+"""
+
+import os
+import vocabulary.tokenized
+from vocabulary import CACHE_FOLDER, Profile, TokenizedCorpus, load_tokenized, save_tokenized
+
+DOCUMENTS = [['covid', 'masks', 'masks'], [], ['ñandú', 'covid']]
+
+def write_corpus(folder, name: str, text: str) -> str:
+    """
+    Write a csv file
+        :param folder: folder of the file
+        :param name: name of the file
+        :param text: content of the file
+        :return: path of the file
+    """
+    filename = str(folder / name)
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return filename
+
+def cached_files(folder) -> list[str]:
+    """
+    Cached tokens in the cache folder
+        :param folder: folder of the input files
+        :return: sorted names of the npz files
+    """
+    return sorted(name for name in os.listdir(folder / CACHE_FOLDER) if name.endswith('.npz'))
+
+def test_hit_and_invalidation(tmp_path):
+    filename = write_corpus(tmp_path, 'train.csv', 'Masks work,Positive\n')
+    parameters = Profile({'lowercase': 'y'})
+    assert load_tokenized(filename, 'documents', parameters) is None
+    save_tokenized(TokenizedCorpus.from_documents(DOCUMENTS), filename, 'documents', parameters)
+    corpus = load_tokenized(filename, 'documents', parameters)
+    assert [corpus.document(index) for index in range(len(corpus))] == DOCUMENTS
+    # Other parameters, another kind or another content are not the same tokens
+    assert load_tokenized(filename, 'documents', Profile({'lowercase': 'n'})) is None
+    assert load_tokenized(filename, 'sequences', parameters) is None
+    write_corpus(tmp_path, 'train.csv', 'Masks do not work,Negative\n')
+    assert load_tokenized(filename, 'documents', parameters) is None
+
+def test_old_entries_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(vocabulary.tokenized, 'MAX_ENTRIES', 2)
+    filename = write_corpus(tmp_path, 'train.csv', 'Masks work,Positive\n')
+    other = write_corpus(tmp_path, 'test.csv', 'Stay home,Positive\n')
+    corpus = TokenizedCorpus.from_documents(DOCUMENTS)
+    save_tokenized(corpus, other, 'documents', Profile({}))
+    save_tokenized(corpus, filename, 'documents', Profile({}))
+    save_tokenized(corpus, filename, 'sequences', Profile({}))
+    assert len(cached_files(tmp_path)) == 3
+    # The clock of the file system can be coarser than the saves
+    for seconds, name in enumerate(cached_files(tmp_path)):
+        os.utime(tmp_path / CACHE_FOLDER / name, (seconds, seconds))
+    # The least recently used entry of the file goes over the limit
+    load_tokenized(filename, 'documents', Profile({}))
+    save_tokenized(corpus, filename, 'documents', Profile({'lowercase': 'y'}))
+    assert load_tokenized(filename, 'sequences', Profile({})) is None
+    assert load_tokenized(filename, 'documents', Profile({})) is not None
+    assert len(cached_files(tmp_path)) == 3
+    # A new content of the file removes the entries of the old one, not the ones of other files
+    write_corpus(tmp_path, 'train.csv', 'Masks do not work,Negative\n')
+    save_tokenized(corpus, filename, 'documents', Profile({}))
+    names = cached_files(tmp_path)
+    assert len(names) == 2
+    assert sum(name.startswith('train.csv.') for name in names) == sum(name.startswith('test.csv.') for name in names) == 1